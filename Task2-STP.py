@@ -1,23 +1,532 @@
+import abc
+import argparse
+import bisect
 import csv
+import functools
+import gzip
+import io
+import itertools
+import json
+import mmap
+import multiprocessing.util
+import os
+import shutil
+import sys
+import tempfile
+import time
+import operator
+import pickle
+import random
+import re
+import struct
+import timeit
+import zipfile
+from array import array
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from decimal import ROUND_HALF_EVEN, Decimal
+from multiprocessing import shared_memory
 
-def stock_portfolio_tracker():
-    # Hardcoded stock prices dictionary
-    stock_prices = {
-        "AAPL": 180.50,    # Apple Inc.
-        "TSLA": 250.75,    # Tesla Inc.
-        "GOOGL": 135.20,   # Alphabet Inc.
-        "MSFT": 420.30,    # Microsoft Corp.
-        "AMZN": 145.80,    # Amazon.com Inc.
-        "NVDA": 875.40,    # NVIDIA Corp.
-        "META": 315.25,    # Meta Platforms Inc.
-        "NFLX": 485.60,    # Netflix Inc.
-        "AMD": 125.90,     # Advanced Micro Devices
-        "INTC": 35.45      # Intel Corp.
-    }
+try:
+    import numpy
+except ImportError:
+    numpy = None  # Valuation falls back to Python ints, just slower
+
+# Money is kept as whole cents in int64 columns, so valuation is exact
+ONE_CENT = Decimal(1)
+
+def to_cents(price):
+    """
+    Dollars (int, float, str or Decimal) -> whole cents, rounded to the
+    nearest cent (ties to even, like round())
+    Text and Decimal prices are parsed as decimals, so "0.29" is exactly 29
+    cents and never passes through a binary float; a float is read back
+    from its shortest repr. Raises ValueError for something that isn't a price
+    """
+    if isinstance(price, int):
+        return price * 100
+    try:
+        return int(Decimal(str(price).strip()).scaleb(2).quantize(ONE_CENT, ROUND_HALF_EVEN))
+    except ArithmeticError:
+        raise ValueError(f"not a price: {price!r}") from None
+
+def int64_views(quantities, cents):
+    """
+    NumPy int64 views of a quantity and a cents column (no copying), or
+    None if NumPy isn't installed or the sum of their products could
+    overflow int64 - then the caller multiplies Python ints instead
+    """
+    if numpy is None or not quantities:
+        return None
+    left = numpy.frombuffer(quantities, dtype=numpy.int64)
+    right = numpy.frombuffer(cents, dtype=numpy.int64)
+    largest = (max(-int(left.min()), int(left.max())) * max(-int(right.min()), int(right.max())))
+    return (left, right) if largest * len(left) < 2 ** 63 else None
+
+def dollars_column(cents):
+    """Convert a column of cents back to float dollars for display and export"""
+    return array('d', map(operator.truediv, cents, itertools.repeat(100)))
+
+class Portfolio:
+    """
+    Stock holdings stored column by column
+    Symbols live in a list, quantities and prices (in cents) in int64 arrays,
+    so valuation works on whole columns instead of a Python loop over a dict
+    (with NumPy the total is one int64 dot product), and it is exact:
+    quantity * cents is an integer, and so is the total, however many
+    positions we add up. The values and total are cached until holdings
+    change, so the summary and the file export share one valuation
+    """
+
+    def __init__(self):
+        self.symbols = []
+        self.rows = {}                  # symbol -> row number
+        self.quantities = array('q')    # shares held
+        self.cents = array('q')         # price per share, in cents
+        self.cached_values = None       # value of each position, in cents
+        self.cached_total = None        # total value, in cents
+        self.on_invalidate = None       # called when the cache is thrown away (see LivePortfolios)
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def __contains__(self, symbol):
+        return symbol in self.rows
+
+    def add(self, symbol, quantity, price):
+        """
+        Add shares of a stock (on top of an existing position if we hold it)
+        price is in dollars. Returns the new number of shares
+        """
+        row = self.rows.get(symbol)
+        if row is None:
+            self.rows[symbol] = len(self.symbols)
+            self.symbols.append(symbol)
+            self.quantities.append(quantity)
+            self.cents.append(to_cents(price))
+        else:
+            self.quantities[row] += quantity
+            self.cents[row] = to_cents(price)
+        self.invalidate()
+        return self.quantities[self.rows[symbol]]
+
+    def quantity(self, symbol):
+        """Shares held of a symbol (0 if we don't hold it)"""
+        row = self.rows.get(symbol)
+        return 0 if row is None else self.quantities[row]
+
+    @property
+    def prices(self):
+        """Price per share of every position, in dollars"""
+        return dollars_column(self.cents)
+
+    def invalidate(self):
+        """Forget the cached valuation after a change"""
+        self.cached_values = None
+        self.cached_total = None
+        if self.on_invalidate is not None:
+            self.on_invalidate()
+
+    def value_cents(self):
+        """Exact value of every position in cents, computed in one pass"""
+        if self.cached_values is None:
+            views = int64_views(self.quantities, self.cents)
+            if views is None:
+                # The products are Python ints, so nothing can overflow or round
+                self.cached_values = list(map(operator.mul, self.quantities, self.cents))
+            else:
+                self.cached_values = (views[0] * views[1]).tolist()
+            if self.cached_total is None:
+                self.cached_total = sum(self.cached_values)
+        return self.cached_values
+
+    def total_cents(self):
+        """
+        Exact total value of the portfolio, in cents
+        Doesn't need the per-position values, so with NumPy this is a single
+        dot product over the two columns
+        """
+        if self.cached_total is None:
+            views = int64_views(self.quantities, self.cents)
+            if views is not None:
+                self.cached_total = int(numpy.dot(*views))
+            elif self.cached_values is not None:
+                self.cached_total = sum(self.cached_values)
+            else:
+                self.cached_total = sum(map(operator.mul, self.quantities, self.cents))
+        return self.cached_total
+
+    def values(self):
+        """Value of every position, in dollars"""
+        return dollars_column(self.value_cents())
+
+    def total_value(self):
+        """Total value of the portfolio, in dollars"""
+        return self.total_cents() / 100
+
+    def positions(self):
+        """Iterate (symbol, quantity, price, value) for every position, in dollars"""
+        return zip(self.symbols, self.quantities, self.prices, self.values())
+
+    def set_price(self, row, price):
+        """
+        Change the price (dollars) of one position and patch the cached
+        valuation in place instead of throwing it away
+        Returns the change in value, in cents (also when nothing is cached)
+        """
+        cents = to_cents(price)
+        delta = self.quantities[row] * (cents - self.cents[row])
+        self.cents[row] = cents
+        if self.cached_values is not None:
+            self.cached_values[row] += delta
+        if self.cached_total is not None:
+            self.cached_total += delta
+        return delta
+
+    def apply_prices(self, updates):
+        """
+        Apply {symbol: price} updates, touching only the positions we hold
+        Returns the change in total value, in cents
+        """
+        self.total_cents()
+        rows = self.rows
+        delta = 0
+        for symbol, price in updates.items():
+            row = rows.get(symbol)
+            if row is not None:
+                delta += self.set_price(row, price)
+        return delta
+
+    def revalue(self, provider):
+        """
+        Refresh every price from a price provider with one batched lookup
+        Symbols the provider doesn't know keep their last price
+        Returns the new total value
+        """
+        latest = provider.get_prices(self.symbols)
+        self.cents = array('q', [to_cents(latest[symbol]) if symbol in latest else cents
+                                 for symbol, cents in zip(self.symbols, self.cents)])
+        self.invalidate()
+        return self.total_value()
+
+    @classmethod
+    def from_holdings(cls, holdings, stock_prices):
+        """Build a portfolio from {symbol: quantity} and a price table"""
+        portfolio = cls()
+        for symbol, quantity in holdings.items():
+            portfolio.add(symbol, quantity, stock_prices[symbol])
+        return portfolio
+
+class LivePortfolios:
+    """
+    Many portfolios kept valued against a stream of price ticks
+    A reverse index maps each symbol to the (portfolio, row) positions that
+    hold it, so a tick only touches those positions, their portfolio totals
+    and the grand total - the work is O(changed), not O(all holdings)
+    A portfolio whose valuation was thrown away since we last counted it
+    (add() on a held symbol, revalue()...) reports itself as stale, and is
+    recounted before it takes another tick or the grand total is read, so
+    the grand total never drifts from the real one and reading it only
+    costs the stale portfolios
+    """
+
+    def __init__(self, portfolios=()):
+        self.portfolios = []
+        self.index = {}     # symbol -> [(portfolio number, portfolio, row), ...]
+        self.counted = []   # each portfolio's total as included in running_total_cents
+        self.stale = set()  # numbers of portfolios invalidated since they were counted
+        self.running_total_cents = 0
+        self.ticks = 0
+        self.positions_updated = 0
+        for portfolio in portfolios:
+            self.add(portfolio)
+
+    def __len__(self):
+        return len(self.portfolios)
+
+    def add(self, portfolio):
+        """
+        Start tracking a portfolio. Its set of symbols should not change
+        afterwards (prices may) - call reindex() if it does
+        Returns the portfolio number
+        """
+        number = len(self.portfolios)
+        self.portfolios.append(portfolio)
+        for row, symbol in enumerate(portfolio.symbols):
+            self.index.setdefault(symbol, []).append((number, portfolio, row))
+        total = portfolio.total_cents()
+        self.counted.append(total)
+        self.running_total_cents += total
+        portfolio.on_invalidate = functools.partial(self.stale.add, number)
+        return number
+
+    def recount(self, number):
+        """Bring one portfolio's share of the grand total up to date"""
+        self.stale.discard(number)
+        total = self.portfolios[number].total_cents()
+        self.running_total_cents += total - self.counted[number]
+        self.counted[number] = total
+
+    def reindex(self):
+        """Rebuild the reverse index and totals from scratch"""
+        portfolios = self.portfolios
+        self.portfolios = []
+        self.index = {}
+        self.counted = []
+        self.stale.clear()
+        self.running_total_cents = 0
+        for portfolio in portfolios:
+            portfolio.on_invalidate = None
+            portfolio.invalidate()
+            self.add(portfolio)
+
+    def apply_ticks(self, updates):
+        """
+        Apply a batch of {symbol: price} ticks
+        Returns the set of portfolio numbers whose value changed
+        """
+        index = self.index
+        counted = self.counted
+        changed = set()
+        delta = 0
+        for symbol, price in updates.items():
+            holders = index.get(symbol)
+            if holders is None:
+                continue
+            for number, portfolio, row in holders:
+                if portfolio.cached_total is None:
+                    self.recount(number)
+                change = portfolio.set_price(row, price)
+                counted[number] += change
+                delta += change
+                changed.add(number)
+            self.positions_updated += len(holders)
+        self.ticks += len(updates)
+        self.running_total_cents += delta
+        return changed
+
+    @property
+    def grand_total_cents(self):
+        """Exact total value of every portfolio together, in cents"""
+        while self.stale:
+            self.recount(self.stale.pop())
+        return self.running_total_cents
+
+    @property
+    def grand_total(self):
+        """Total value of every portfolio together, in dollars"""
+        return self.grand_total_cents / 100
+
+    def totals(self):
+        """Current total value of every portfolio"""
+        return [portfolio.total_value() for portfolio in self.portfolios]
+
+def read_ticks(path, batch_size=1000):
+    """
+    Stream a tick file (CSV rows of symbol,price) in batches of {symbol: price}
+    Within a batch a later tick for the same symbol replaces the earlier one
+    """
+    with open(path, newline='', encoding='utf-8') as file:
+        batch = {}
+        for row in csv.reader(file):
+            if len(row) < 2:
+                continue
+            try:
+                batch[row[0].strip().upper()] = float(row[1])
+            except ValueError:
+                continue  # Header or a bad price
+            if len(batch) >= batch_size:
+                yield batch
+                batch = {}
+        if batch:
+            yield batch
+
+# Hardcoded stock prices dictionary
+STOCK_PRICES = {
+    "AAPL": 180.50,    # Apple Inc.
+    "TSLA": 250.75,    # Tesla Inc.
+    "GOOGL": 135.20,   # Alphabet Inc.
+    "MSFT": 420.30,    # Microsoft Corp.
+    "AMZN": 145.80,    # Amazon.com Inc.
+    "NVDA": 875.40,    # NVIDIA Corp.
+    "META": 315.25,    # Meta Platforms Inc.
+    "NFLX": 485.60,    # Netflix Inc.
+    "AMD": 125.90,     # Advanced Micro Devices
+    "INTC": 35.45      # Intel Corp.
+}
+
+# Price sources
+class PriceProvider(abc.ABC):
+    """
+    Where prices come from
+    Lookups are batched: get_prices() takes every symbol a caller needs and
+    returns {symbol: price} for the ones the provider knows. A provider
+    that leaves out either method can't be created at all
+    """
+
+    @abc.abstractmethod
+    def get_prices(self, symbols):
+        """{symbol: price} for the given symbols the provider knows"""
+
+    @abc.abstractmethod
+    def symbols(self):
+        """Every symbol the provider can price"""
+
+    def get_price(self, symbol):
+        """Single-symbol convenience wrapper (None if unknown)"""
+        return self.get_prices([symbol]).get(symbol)
+
+class StaticPriceProvider(PriceProvider):
+    """Prices from a dict, like the built-in STOCK_PRICES table"""
+
+    def __init__(self, prices):
+        self.prices = prices
+
+    def get_prices(self, symbols):
+        prices = self.prices
+        return {symbol: prices[symbol] for symbol in symbols if symbol in prices}
+
+    def symbols(self):
+        return list(self.prices)
+
+class FilePriceProvider(PriceProvider):
+    """
+    Mock price feed read from a local file, for offline use and testing
+    Accepts a JSON object {"AAPL": 180.5, ...} or CSV rows of symbol,price.
+    The file is re-read whenever it changes, and latency (seconds) can be
+    set to make every batch call as slow as a remote feed would be
+    """
+
+    def __init__(self, path, latency=0.0):
+        self.path = path
+        self.latency = latency
+        self.prices = {}
+        self.loaded_mtime = None
+        self.calls = 0
+
+    def refresh(self):
+        mtime = os.stat(self.path).st_mtime_ns
+        if mtime == self.loaded_mtime:
+            return
+        with open(self.path, newline='', encoding='utf-8') as file:
+            if self.path.lower().endswith(".json"):
+                raw = json.load(file)
+                if not isinstance(raw, dict):
+                    raise ValueError(f"{self.path} must hold a JSON object of symbol: price, "
+                                     f"not {type(raw).__name__}")
+            else:
+                raw = {row[0]: row[1] for row in csv.reader(file)
+                       if len(row) >= 2 and row[0].strip().lower() != "symbol"}
+        prices = {}
+        for symbol, price in raw.items():
+            try:
+                prices[symbol.strip().upper()] = float(price)
+            except (TypeError, ValueError):
+                continue  # Skip rows without a usable price
+        self.prices = prices
+        self.loaded_mtime = mtime
+
+    def get_prices(self, symbols):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        self.refresh()
+        prices = self.prices
+        return {symbol: prices[symbol] for symbol in symbols if symbol in prices}
+
+    def symbols(self):
+        self.refresh()
+        return list(self.prices)
+
+class CachedPriceProvider(PriceProvider):
+    """
+    In-process TTL + LRU cache in front of another provider
+    Every get_prices() call answers what it can from the cache and fetches
+    all the missing symbols in one batched call. Unknown symbols are cached
+    too, so a bad symbol doesn't go back to the source on every lookup
+    """
+
+    def __init__(self, source, ttl=60.0, max_entries=100000):
+        self.source = source
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries = OrderedDict()    # symbol -> (price or None, expires at)
+        self.lookups = 0
+        self.hits = 0
+        self.misses = 0
+        self.batches = 0
+        self.lookup_seconds = 0.0
+        self.fetch_seconds = 0.0
+
+    def get_prices(self, symbols):
+        start = time.perf_counter()
+        now = time.monotonic()
+        entries = self.entries
+        prices = {}
+        missing = []
+        for symbol in symbols:
+            entry = entries.get(symbol)
+            if entry is not None and entry[1] > now:
+                entries.move_to_end(symbol)
+                if entry[0] is not None:
+                    prices[symbol] = entry[0]
+            else:
+                missing.append(symbol)
+        self.lookups += len(symbols)
+        self.hits += len(symbols) - len(missing)
+        self.misses += len(missing)
+
+        if missing:
+            fetch_start = time.perf_counter()
+            fetched = self.source.get_prices(missing)
+            self.fetch_seconds += time.perf_counter() - fetch_start
+            self.batches += 1
+            expires = now + self.ttl
+            for symbol in missing:
+                price = fetched.get(symbol)
+                entries[symbol] = (price, expires)
+                entries.move_to_end(symbol)
+                if price is not None:
+                    prices[symbol] = price
+            while len(entries) > self.max_entries:
+                entries.popitem(last=False)
+
+        self.lookup_seconds += time.perf_counter() - start
+        return prices
+
+    def symbols(self):
+        return self.source.symbols()
+
+    def clear(self):
+        self.entries.clear()
+
+    def stats(self):
+        """Cache counters: hit rate and lookup latency"""
+        return {
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / self.lookups if self.lookups else 0.0,
+            "source_batches": self.batches,
+            "us_per_lookup": self.lookup_seconds * 1e6 / self.lookups if self.lookups else 0.0,
+            "source_seconds": self.fetch_seconds,
+            "cached_symbols": len(self.entries),
+        }
+
+def as_price_provider(prices):
+    """Accept either a PriceProvider or a plain {symbol: price} dict"""
+    return prices if isinstance(prices, PriceProvider) else StaticPriceProvider(prices)
+
+# Default price source: the built-in table behind a cache
+PRICE_PROVIDER = CachedPriceProvider(StaticPriceProvider(STOCK_PRICES))
+
+def stock_portfolio_tracker(provider=None, history=None):
+    # Fetch the whole price table in one batched lookup
+    provider = provider or PRICE_PROVIDER
+    stock_prices = provider.get_prices(provider.symbols())
     
-    portfolio = {}
-    total_value = 0
+    portfolio = Portfolio()
     
     print("="*50)
     print("      STOCK PORTFOLIO TRACKER")
@@ -57,10 +566,10 @@ def stock_portfolio_tracker():
         
         # Add to portfolio (if stock already exists, add to existing quantity)
         if stock_symbol in portfolio:
-            portfolio[stock_symbol] += quantity
-            print(f"Added {quantity} more shares of {stock_symbol}. Total: {portfolio[stock_symbol]} shares")
+            total_shares = portfolio.add(stock_symbol, quantity, stock_prices[stock_symbol])
+            print(f"Added {quantity} more shares of {stock_symbol}. Total: {total_shares} shares")
         else:
-            portfolio[stock_symbol] = quantity
+            portfolio.add(stock_symbol, quantity, stock_prices[stock_symbol])
             print(f"Added {quantity} shares of {stock_symbol} to your portfolio.")
     
     # Calculate and display portfolio summary
@@ -68,92 +577,578 @@ def stock_portfolio_tracker():
         print("\nNo stocks added to portfolio. Goodbye!")
         return
     
-    print("\n" + "="*60)
-    print("                PORTFOLIO SUMMARY")
-    print("="*60)
-    print(f"{'Stock':<8} {'Shares':<8} {'Price':<10} {'Total Value':<12}")
-    print("-" * 60)
-    
-    for stock_symbol, quantity in portfolio.items():
-        price = stock_prices[stock_symbol]
-        stock_value = quantity * price
-        total_value += stock_value
-        
-        print(f"{stock_symbol:<8} {quantity:<8} ${price:<9.2f} ${stock_value:<11.2f}")
-    
-    print("-" * 60)
-    print(f"{'TOTAL PORTFOLIO VALUE:':<38} ${total_value:.2f}")
-    print("="*60)
+    print_portfolio_summary(portfolio)
+    record_snapshot(history, portfolio)
     
     # Ask if user wants to save to file
     save_option = input("\nWould you like to save this portfolio to a file? (y/n): ").lower()
     
     if save_option in ['y', 'yes']:
-        file_format = input("Save as (1) Text file or (2) CSV file? Enter 1 or 2: ")
+        file_format = input("Save as (1) Text file, (2) CSV file or (3) Columnar .npz file? Enter 1, 2 or 3: ")
         
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         
         if file_format == "1":
-            save_to_txt(portfolio, stock_prices, total_value, timestamp)
+            save_to_txt(portfolio, timestamp)
         elif file_format == "2":
-            save_to_csv(portfolio, stock_prices, total_value, timestamp)
+            save_to_csv(portfolio, timestamp)
+        elif file_format == "3":
+            save_to_npz(portfolio, timestamp)
         else:
             print("Invalid option. Portfolio not saved.")
 
-def save_to_txt(portfolio, stock_prices, total_value, timestamp):
-    """Save portfolio to a text file"""
-    filename = f"portfolio_{timestamp}.txt"
+def print_portfolio_summary(portfolio):
+    """Print the summary table of a portfolio"""
+    print("\n" + "="*60)
+    print("                PORTFOLIO SUMMARY")
+    print("="*60)
+    print(f"{'Stock':<8} {'Shares':<8} {'Price':<10} {'Total Value':<12}")
+    print("-" * 60)
+    
+    for stock_symbol, quantity, price, stock_value in portfolio.positions():
+        print(f"{stock_symbol:<8} {quantity:<8} ${price:<9.2f} ${stock_value:<11.2f}")
     
+    print("-" * 60)
+    print(f"{'TOTAL PORTFOLIO VALUE:':<38} ${portfolio.total_value():.2f}")
+    print("="*60)
+
+# Bulk import
+IMPORT_CHUNK_ROWS = 50000
+MAX_REJECT_SAMPLES = 20
+SYMBOL_COLUMNS = ("symbol", "stock", "stock symbol", "ticker")
+QUANTITY_COLUMNS = ("quantity", "shares", "qty")
+
+class ImportReport:
+    """What happened during a bulk import"""
+
+    def __init__(self):
+        self.rows = 0
+        self.accepted = 0
+        self.rejected = 0
+        self.reasons = {}       # reason -> count
+        self.samples = []       # first few (line, reason, row) rejects
+
+    def reject(self, line_number, reason, row, reject_writer=None):
+        self.rejected += 1
+        self.reasons[reason] = self.reasons.get(reason, 0) + 1
+        if len(self.samples) < MAX_REJECT_SAMPLES:
+            self.samples.append((line_number, reason, row))
+        if reject_writer is not None:
+            reject_writer.writerow([line_number, reason, row])
+
+    def print_summary(self):
+        print(f"Rows read: {self.rows:,}   accepted: {self.accepted:,}   rejected: {self.rejected:,}")
+        for reason, count in sorted(self.reasons.items(), key=lambda item: -item[1]):
+            print(f"  {count:>10,}  {reason}")
+        for line_number, reason, row in self.samples[:5]:
+            print(f"  line {line_number}: {reason}: {row!r}")
+
+def detect_import_format(path):
+    """Guess the format of a holdings file from its name"""
+    name = path.lower()
+    if name.endswith((".jsonl", ".ndjson", ".json")):
+        return "jsonl"
+    return "csv"
+
+def read_csv_holdings(file):
+    """
+    Yield (line_number, symbol, quantity) from a CSV holdings file
+    A header row is optional - without one the first two columns are used
+    """
+    reader = csv.reader(file)
+    symbol_column, quantity_column = 0, 1
+    for row in reader:
+        if not row:
+            continue
+        header = [cell.strip().lower() for cell in row]
+        if reader.line_num == 1 and any(name in header for name in SYMBOL_COLUMNS):
+            symbol_column = next(header.index(n) for n in SYMBOL_COLUMNS if n in header)
+            quantity_column = next((header.index(n) for n in QUANTITY_COLUMNS if n in header), 1)
+            continue
+        if len(row) <= max(symbol_column, quantity_column):
+            yield reader.line_num, None, row
+        else:
+            yield reader.line_num, row[symbol_column], row[quantity_column]
+
+def read_jsonl_holdings(file):
+    """Yield (line_number, symbol, quantity) from a JSONL holdings file"""
+    for line_number, line in enumerate(file, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+            # Quantities go through str() so 2.5 or true fail int() like typed input would
+            yield line_number, record["symbol"], str(record["quantity"])
+        except (ValueError, KeyError, TypeError):
+            yield line_number, None, line.rstrip("\n")
+
+def import_holdings(path, prices, portfolio=None, file_format=None,
+                    chunk_rows=IMPORT_CHUNK_ROWS, reject_writer=None):
+    """
+    Stream a CSV/JSONL holdings file into a portfolio
+    Rows are validated like the interactive prompt (known symbol, positive
+    whole number of shares) and handled a chunk at a time: each chunk is
+    priced with one batched lookup, summed per symbol in a dict and then
+    merged, so duplicate symbols add up and memory only depends on the
+    chunk size and the number of symbols
+    prices is a PriceProvider or a {symbol: price} dict
+    Returns (portfolio, report)
+    """
+    provider = as_price_provider(prices)
+    if portfolio is None:
+        portfolio = Portfolio()
+    report = ImportReport()
+    file_format = file_format or detect_import_format(path)
+
+    with open(path, newline='', encoding='utf-8') as file:
+        rows = read_jsonl_holdings(file) if file_format == "jsonl" else read_csv_holdings(file)
+        while True:
+            chunk = list(itertools.islice(rows, chunk_rows))
+            if not chunk:
+                break
+            report.rows += len(chunk)
+
+            chunk = [(line_number, None if symbol is None else str(symbol).upper().strip(), quantity)
+                     for line_number, symbol, quantity in chunk]
+            stock_prices = provider.get_prices({symbol for _, symbol, _ in chunk if symbol is not None})
+
+            totals = {}
+            for line_number, symbol, quantity in chunk:
+                if symbol is None:
+                    report.reject(line_number, "malformed row", quantity, reject_writer)
+                    continue
+                if symbol not in stock_prices:
+                    report.reject(line_number, "unknown symbol", symbol, reject_writer)
+                    continue
+                try:
+                    shares = int(quantity)
+                except (ValueError, TypeError):
+                    report.reject(line_number, "invalid quantity", quantity, reject_writer)
+                    continue
+                if shares <= 0:
+                    report.reject(line_number, "quantity not positive", quantity, reject_writer)
+                    continue
+                totals[symbol] = totals.get(symbol, 0) + shares
+                report.accepted += 1
+
+            for symbol, shares in totals.items():
+                portfolio.add(symbol, shares, stock_prices[symbol])
+
+    return portfolio, report
+
+# Report writers
+REPORT_EXTENSIONS = {"txt": ".txt", "csv": ".csv", "npz": ".npz"}
+GZIP_LEVEL = 1           # Fast compression: reports are big, disk is cheap
+WRITE_BUFFER = 1 << 20
+REPORT_CHUNK_ROWS = 4096
+CSV_SPECIAL = re.compile(r'[,"\r\n]')
+
+def formatted_rows(row_format, columns, chunk_rows=REPORT_CHUNK_ROWS):
+    """
+    Format rows taken across columns, chunk_rows at a time: each chunk's
+    columns are interleaved into one flat list by slice assignment and go
+    through a single % with the row format repeated, so there is no tuple,
+    format call or write per row. Yields one string per chunk
+    """
+    count = len(columns[0])
+    width = len(columns)
+    for start in range(0, count, chunk_rows):
+        rows = min(chunk_rows, count - start)
+        flat = [None] * (rows * width)
+        for offset, column in enumerate(columns):
+            flat[offset::width] = column[start:start + rows]
+        yield (row_format * rows) % tuple(flat)
+
+def write_txt_report(portfolio, stream):
+    """The text summary, with the position rows formatted and written in chunks"""
+    stream.write("STOCK PORTFOLIO SUMMARY\n")
+    stream.write("=" * 50 + "\n")
+    stream.write(f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
+    stream.write(f"{'Stock':<8} {'Shares':<8} {'Price':<10} {'Total Value':<12}\n")
+    stream.write("-" * 50 + "\n")
+    # Same layout as the f-string rows
+    columns = (portfolio.symbols, portfolio.quantities, portfolio.prices, portfolio.values())
+    stream.writelines(formatted_rows("%-8s %-8d $%-9.2f $%-11.2f\n", columns))
+    stream.write("-" * 50 + "\n")
+    stream.write(f"TOTAL PORTFOLIO VALUE: ${portfolio.total_value():.2f}\n")
+
+def write_csv_report(portfolio, stream):
+    """The CSV report, written in bulk instead of one writerow() per position"""
+    writer = csv.writer(stream)
+    writer.writerow(['Stock Symbol', 'Shares', 'Price per Share', 'Total Value'])
+    if CSV_SPECIAL.search("\0".join(portfolio.symbols)):
+        # Some symbol needs quoting, so let the csv module handle every row
+        writer.writerows((stock_symbol, quantity, f"${price:.2f}", f"${stock_value:.2f}")
+                         for stock_symbol, quantity, price, stock_value in portfolio.positions())
+    else:
+        # Nothing to quote: format the rows directly, the same as csv.writer would
+        columns = (portfolio.symbols, portfolio.quantities, portfolio.prices, portfolio.values())
+        stream.writelines(formatted_rows("%s,%d,$%.2f,$%.2f\r\n", columns))
+    writer.writerow(['', '', 'TOTAL:', f"${portfolio.total_value():.2f}"])
+
+def npy_bytes(descr, count, data):
+    """A complete .npy file (format version 1.0) for a 1-D array"""
+    header = f"{{'descr': '{descr}', 'fortran_order': False, 'shape': ({count},), }}"
+    # Magic (6) + version (2) + length (2) + header + newline, padded to 64 bytes
+    padding = -(10 + len(header) + 1) % 64
+    header = (header + " " * padding + "\n").encode('latin-1')
+    return b"\x93NUMPY\x01\x00" + struct.pack("<H", len(header)) + header + data
+
+def little_endian(column):
+    """Raw bytes of an array column in little-endian order"""
+    if sys.byteorder == "big":
+        column = array(column.typecode, column)
+        column.byteswap()
+    return column.tobytes()
+
+def write_npz_report(portfolio, stream, compress=False):
+    """
+    Columnar report for analytics: a .npz archive with one .npy per column
+    (symbol, quantity, price, value) - numpy.load() reads it directly, and
+    every column is a plain typed array rather than formatted text
+    """
+    count = len(portfolio)
+    width = max(map(len, portfolio.symbols), default=1)
+    symbols = "".join(symbol.ljust(width, "\0") for symbol in portfolio.symbols).encode('utf-32-le')
+    columns = [
+        ("symbol", f"<U{width}", symbols),
+        ("quantity", "<i8", little_endian(portfolio.quantities)),
+        ("price", "<f8", little_endian(portfolio.prices)),
+        ("value", "<f8", little_endian(array('d', portfolio.values()))),
+    ]
+    method = zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED
+    with zipfile.ZipFile(stream, 'w', compression=method, compresslevel=GZIP_LEVEL,
+                         allowZip64=True) as archive:
+        for name, descr, data in columns:
+            archive.writestr(name + ".npy", npy_bytes(descr, count, data))
+
+def claim_report_path(temp_path, directory, base, extension):
+    """
+    Publish a finished temp file under base + extension, or base_1, base_2...
+    if that name is taken. os.link() fails instead of overwriting, so two
+    runs in the same second can't clobber each other's reports
+    Returns the final path
+    """
+    for attempt in itertools.count():
+        suffix = f"_{attempt}" if attempt else ""
+        path = os.path.join(directory, f"{base}{suffix}{extension}")
+        try:
+            os.link(temp_path, path)
+        except FileExistsError:
+            continue
+        except OSError:
+            # No hard links on this file system: reserve the name, then replace it
+            try:
+                os.close(os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL))
+            except FileExistsError:
+                continue
+            os.replace(temp_path, path)
+            return path
+        os.unlink(temp_path)
+        return path
+
+def write_report(portfolio, base, fmt="csv", compress=False, directory="."):
+    """
+    Write a portfolio report atomically: the data goes to a temp file in the
+    target directory, which only gets its real name once it is complete
+    fmt is "txt", "csv" or "npz"; compress gzips txt/csv and deflates npz
+    Returns the path written
+    """
+    extension = REPORT_EXTENSIONS[fmt] + (".gz" if compress and fmt != "npz" else "")
+    temp_path = os.path.join(directory, f".{base}.{os.getpid()}.{os.urandom(4).hex()}.tmp")
     try:
-        with open(filename, 'w') as file:
-            file.write("STOCK PORTFOLIO SUMMARY\n")
-            file.write("=" * 50 + "\n")
-            file.write(f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
-            
-            file.write(f"{'Stock':<8} {'Shares':<8} {'Price':<10} {'Total Value':<12}\n")
-            file.write("-" * 50 + "\n")
-            
-            for stock_symbol, quantity in portfolio.items():
-                price = stock_prices[stock_symbol]
-                stock_value = quantity * price
-                file.write(f"{stock_symbol:<8} {quantity:<8} ${price:<9.2f} ${stock_value:<11.2f}\n")
-            
-            file.write("-" * 50 + "\n")
-            file.write(f"TOTAL PORTFOLIO VALUE: ${total_value:.2f}\n")
-        
-        print(f"Portfolio saved successfully to {filename}")
-        
-    except Exception as e:
-        print(f"Error saving file: {e}")
+        with open(temp_path, 'xb', buffering=WRITE_BUFFER) as raw:
+            if fmt == "npz":
+                write_npz_report(portfolio, raw, compress)
+            else:
+                binary = gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=GZIP_LEVEL) if compress else raw
+                stream = io.TextIOWrapper(binary, encoding='utf-8', newline='' if fmt == "csv" else None)
+                if fmt == "csv":
+                    write_csv_report(portfolio, stream)
+                else:
+                    write_txt_report(portfolio, stream)
+                # Flush the text layer but leave closing to the gzip/file layers
+                stream.flush()
+                stream.detach()
+                if compress:
+                    binary.close()
+        return claim_report_path(temp_path, directory, base, extension)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
 
-def save_to_csv(portfolio, stock_prices, total_value, timestamp):
-    """Save portfolio to a CSV file"""
-    filename = f"portfolio_{timestamp}.csv"
-    
+def save_report(portfolio, timestamp, fmt, compress=False):
+    """Save a portfolio report in the current directory and tell the user"""
     try:
-        with open(filename, 'w', newline='') as file:
-            writer = csv.writer(file)
-            
-            # Write header
-            writer.writerow(['Stock Symbol', 'Shares', 'Price per Share', 'Total Value'])
-            
-            # Write portfolio data
-            for stock_symbol, quantity in portfolio.items():
-                price = stock_prices[stock_symbol]
-                stock_value = quantity * price
-                writer.writerow([stock_symbol, quantity, f"${price:.2f}", f"${stock_value:.2f}"])
-            
-            # Write total
-            writer.writerow(['', '', 'TOTAL:', f"${total_value:.2f}"])
-        
+        filename = write_report(portfolio, f"portfolio_{timestamp}", fmt, compress)
         print(f"Portfolio saved successfully to {filename}")
-        
+        return filename
     except Exception as e:
         print(f"Error saving file: {e}")
 
-def main():
+def save_to_txt(portfolio, timestamp, compress=False):
+    """Save portfolio to a text file (reusing the portfolio's cached valuation)"""
+    return save_report(portfolio, timestamp, "txt", compress)
+
+def save_to_csv(portfolio, timestamp, compress=False):
+    """Save portfolio to a CSV file (reusing the portfolio's cached valuation)"""
+    return save_report(portfolio, timestamp, "csv", compress)
+
+def save_to_npz(portfolio, timestamp, compress=False):
+    """Save portfolio as a columnar .npz file for analytics"""
+    return save_report(portfolio, timestamp, "npz", compress)
+
+# Snapshot history
+SNAPSHOT_MAGIC = b"PFSNAP01"
+SNAPSHOT_RECORD = struct.Struct("<q16sqqq")   # timestamp, symbol, quantity, price, value (cents)
+SNAPSHOT_INDEX = struct.Struct("<qqqq")       # timestamp, first record, record count, total (cents)
+
+class SnapshotStore:
+    """
+    Append-only history of portfolio valuations
+    Every snapshot adds one fixed-width record per position to the data
+    file and one fixed-width entry (timestamp, first record, count, total)
+    to a .idx file next to it. Both are read back through mmap, so queries
+    only touch the pages they need: totals over time read just the index,
+    and a timestamp lookup is a binary search over the index timestamps
+    Timestamps are whole seconds since the epoch and must not go backwards
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.index_path = path + ".idx"
+        self.data_map = None
+        self.index_map = None
+        self.index = None       # int64 view of the index file, 4 per snapshot
+        self.mapped_size = -1
+
+    def __len__(self):
+        self.refresh()
+        return len(self.index) // 4 if self.index is not None else 0
+
+    def append(self, portfolio, timestamp=None):
+        """Record a valuation of the portfolio. Returns the snapshot timestamp"""
+        timestamp = int(time.time() if timestamp is None else timestamp)
+        records = []
+        for symbol, quantity, cents, value in zip(portfolio.symbols, portfolio.quantities,
+                                                  portfolio.cents, portfolio.value_cents()):
+            name = symbol.encode('utf-8')
+            if len(name) > 16:
+                raise ValueError(f"symbol {symbol!r} is longer than 16 bytes")
+            records.append(SNAPSHOT_RECORD.pack(timestamp, name, quantity, cents, value))
+
+        # Never write over a file that isn't ours: anything non-empty must
+        # already be a snapshot file, and records with no index at all are
+        # an orphan we can't tell from a torn write, so leave them alone
+        try:
+            with open(self.path, 'rb') as data:
+                head = data.read(len(SNAPSHOT_MAGIC) + 1)
+        except FileNotFoundError:
+            head = b""
+        if head and not head.startswith(SNAPSHOT_MAGIC):
+            raise ValueError(f"{self.path} is not a snapshot file")
+        if len(head) > len(SNAPSHOT_MAGIC) and not os.path.exists(self.index_path):
+            raise ValueError(f"{self.path} has snapshots but no index at {self.index_path}")
+
+        # Only what complete index entries point at is committed. A torn
+        # write from a crash (a partial entry, or records no entry points
+        # at) is cut off before we add to either file
+        self.close()
+        with open(self.index_path, 'a+b') as index:
+            index.seek(0, os.SEEK_END)
+            entries = index.tell() // SNAPSHOT_INDEX.size
+            first = 0
+            if entries:
+                index.seek((entries - 1) * SNAPSHOT_INDEX.size)
+                last, last_first, last_count, _ = SNAPSHOT_INDEX.unpack(index.read(SNAPSHOT_INDEX.size))
+                if timestamp < last:
+                    raise ValueError(f"snapshot at {timestamp} is older than the last one")
+                first = last_first + last_count
+            index.truncate(entries * SNAPSHOT_INDEX.size)
+
+        # Data first, then the index entry that points at it, so a crash in
+        # between leaves unreferenced records rather than a dangling entry
+        offset = len(SNAPSHOT_MAGIC) + first * SNAPSHOT_RECORD.size
+        with open(self.path, 'a+b') as data:    # appends only, never truncates on open
+            data.seek(0)
+            magic = data.read(len(SNAPSHOT_MAGIC))
+            if not magic and not entries:
+                data.write(SNAPSHOT_MAGIC)
+            elif magic != SNAPSHOT_MAGIC:
+                raise ValueError(f"{self.path} is not a snapshot file")
+            if data.seek(0, os.SEEK_END) < offset:
+                raise ValueError(f"{self.path} is shorter than its index says")
+            data.truncate(offset)
+            data.seek(offset)
+            data.write(b"".join(records))
+        with open(self.index_path, 'ab') as index:
+            index.write(SNAPSHOT_INDEX.pack(timestamp, first, len(records), portfolio.total_cents()))
+        return timestamp
+
+    def refresh(self):
+        """(Re)map the files if they grew since we last looked"""
+        try:
+            size = os.path.getsize(self.index_path)
+        except FileNotFoundError:
+            size = 0
+        if size == self.mapped_size:
+            return
+        self.close()
+        if size:
+            with open(self.path, 'rb') as data:
+                if data.read(len(SNAPSHOT_MAGIC)) != SNAPSHOT_MAGIC:
+                    raise ValueError(f"{self.path} is not a snapshot file")
+                self.data_map = mmap.mmap(data.fileno(), 0, access=mmap.ACCESS_READ)
+            with open(self.index_path, 'rb') as index:
+                self.index_map = mmap.mmap(index.fileno(), 0, access=mmap.ACCESS_READ)
+            usable = size - size % SNAPSHOT_INDEX.size
+            self.index = memoryview(self.index_map)[:usable].cast('q')
+        self.mapped_size = size
+
+    def close(self):
+        if self.index is not None:
+            self.index.release()
+            self.index = None
+        for mapped in (self.data_map, self.index_map):
+            if mapped is not None:
+                mapped.close()
+        self.data_map = self.index_map = None
+        self.mapped_size = -1
+
+    def timestamps(self):
+        """Every snapshot timestamp (a strided view of the index, not a copy)"""
+        self.refresh()
+        return self.index[0::4] if self.index is not None else []
+
+    def find(self, timestamp):
+        """
+        Number of the last snapshot taken at or before timestamp (None if
+        there is none) - a binary search over the mapped index
+        """
+        number = bisect.bisect_right(self.timestamps(), int(timestamp)) - 1
+        return number if number >= 0 else None
+
+    def range(self, start=None, end=None):
+        """Snapshot numbers with start <= timestamp <= end"""
+        timestamps = self.timestamps()
+        first = 0 if start is None else bisect.bisect_left(timestamps, int(start))
+        last = len(timestamps) if end is None else bisect.bisect_right(timestamps, int(end))
+        return range(first, last)
+
+    def totals(self, start=None, end=None):
+        """(timestamp, total value in cents) for every snapshot in a time range"""
+        numbers = self.range(start, end)
+        if not numbers:
+            return []
+        index = self.index
+        return list(zip(index[numbers.start * 4:numbers.stop * 4:4].tolist(),
+                        index[numbers.start * 4 + 3:numbers.stop * 4:4].tolist()))
+
+    def positions(self, number):
+        """{symbol: (quantity, price cents, value cents)} stored in one snapshot"""
+        if not 0 <= number < len(self):
+            raise IndexError(f"no snapshot number {number}")
+        timestamp, first, count, total = self.index[number * 4:number * 4 + 4].tolist()
+        offset = len(SNAPSHOT_MAGIC) + first * SNAPSHOT_RECORD.size
+        chunk = self.data_map[offset:offset + count * SNAPSHOT_RECORD.size]
+        return {name.rstrip(b"\0").decode('utf-8'): (quantity, cents, value)
+                for _, name, quantity, cents, value in SNAPSHOT_RECORD.iter_unpack(chunk)}
+
+    def at(self, timestamp):
+        """Positions of the latest snapshot at or before timestamp ({} if none)"""
+        number = self.find(timestamp)
+        return {} if number is None else self.positions(number)
+
+    def symbol_history(self, symbol, start=None, end=None):
+        """(timestamp, quantity, price cents, value cents) of one symbol across a time range"""
+        name = symbol.encode('utf-8').ljust(16, b"\0")
+        history = []
+        for number in self.range(start, end):
+            timestamp, first, count, total = self.index[number * 4:number * 4 + 4].tolist()
+            offset = len(SNAPSHOT_MAGIC) + first * SNAPSHOT_RECORD.size
+            # Find the symbol's record with a C-level search instead of unpacking them all
+            chunk = self.data_map[offset:offset + count * SNAPSHOT_RECORD.size]
+            position = chunk.find(name, 8)
+            while position != -1 and (position - 8) % SNAPSHOT_RECORD.size:
+                position = chunk.find(name, position + 1)
+            if position != -1:
+                record = SNAPSHOT_RECORD.unpack_from(chunk, position - 8)
+                history.append((timestamp, record[2], record[3], record[4]))
+        return history
+
+    def profit_and_loss(self, start=None, end=None):
+        """
+        Per-symbol change in value from the first to the last snapshot in a time range
+        Returns {symbol: (start value, end value, change)} in cents
+        """
+        numbers = self.range(start, end)
+        if not numbers:
+            return {}
+        before = self.positions(numbers[0])
+        after = self.positions(numbers[-1])
+        changes = {}
+        for symbol in before.keys() | after.keys():
+            old = before.get(symbol, (0, 0, 0))[2]
+            new = after.get(symbol, (0, 0, 0))[2]
+            changes[symbol] = (old, new, new - old)
+        return changes
+
+def parse_when(text):
+    """A --since/--until value: epoch seconds or an ISO date/time"""
+    if text is None:
+        return None
+    try:
+        return int(text)
+    except ValueError:
+        return int(datetime.fromisoformat(text).timestamp())
+
+def format_when(timestamp):
+    return datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M:%S")
+
+def run_history(path, since=None, until=None, symbol=None):
+    """Print total value over time, plus per-symbol P&L (or one symbol's history)"""
+    store = SnapshotStore(path)
+    try:
+        start, end = parse_when(since), parse_when(until)
+        totals = store.totals(start, end)
+        if not totals:
+            print("No snapshots in that range.")
+            return
+        if symbol:
+            print(f"{'Snapshot':<20} {'Shares':>10} {'Price':>12} {'Value':>16}")
+            for timestamp, quantity, cents, value in store.symbol_history(symbol.upper(), start, end):
+                print(f"{format_when(timestamp):<20} {quantity:>10,} "
+                      f"{f'${cents / 100:,.2f}':>12} {f'${value / 100:,.2f}':>16}")
+            return
+
+        print(f"{'Snapshot':<20} {'Total Value':>18}")
+        for timestamp, total in totals:
+            print(f"{format_when(timestamp):<20} {f'${total / 100:,.2f}':>18}")
+
+        print(f"\nP&L by symbol, {format_when(totals[0][0])} -> {format_when(totals[-1][0])}")
+        changes = store.profit_and_loss(start, end)
+        for name, (old, new, change) in sorted(changes.items(), key=lambda item: item[1][2]):
+            print(f"{name:<8} {f'${old / 100:,.2f}':>16} {f'${new / 100:,.2f}':>16} {f'{change / 100:+,.2f}':>14}")
+    except (OSError, ValueError) as e:
+        print(f"Error reading history: {e}")
+        sys.exit(1)
+    finally:
+        store.close()
+
+def record_snapshot(history, portfolio):
+    """Append a portfolio valuation to the history store, if there is one"""
+    if history is None:
+        return
+    try:
+        history.append(portfolio)
+        print(f"Snapshot recorded in {history.path}")
+    except (OSError, ValueError) as e:
+        print(f"Error recording snapshot: {e}")
+
+def main(provider=None, history=None):
     while True:
-        stock_portfolio_tracker()
+        stock_portfolio_tracker(provider, history)
         
         another_portfolio = input("\nWould you like to create another portfolio? (y/n): ").lower()
         if another_portfolio not in ['y', 'yes']:
@@ -161,6 +1156,689 @@ def main():
             break
         print("\n" + "="*70 + "\n")
 
+def run_import(path, file_format=None, rejects_path=None, save_format=None, provider=None,
+               compress=False, history=None):
+    """Non-interactive import: load a holdings file and show the summary"""
+    provider = provider or PRICE_PROVIDER
+    reject_file = None
+    try:
+        reject_writer = None
+        if rejects_path:
+            reject_file = open(rejects_path, 'w', newline='', encoding='utf-8')
+            reject_writer = csv.writer(reject_file)
+            reject_writer.writerow(['line', 'reason', 'row'])
+        portfolio, report = import_holdings(path, provider, file_format=file_format,
+                                            reject_writer=reject_writer)
+    except OSError as e:
+        print(f"Error reading holdings: {e}")
+        sys.exit(1)
+    finally:
+        if reject_file is not None:
+            reject_file.close()
+
+    report.print_summary()
+    if not portfolio:
+        print("No valid holdings found.")
+        return
+    print_portfolio_summary(portfolio)
+    record_snapshot(history, portfolio)
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    if save_format:
+        save_report(portfolio, timestamp, save_format, compress)
+
+def run_replay(tick_path, holdings_paths, batch_size=1000, provider=None):
+    """Load holdings files as live portfolios and replay a tick file against them"""
+    provider = provider or PRICE_PROVIDER
+    live = LivePortfolios()
+    try:
+        for path in holdings_paths:
+            portfolio, report = import_holdings(path, provider)
+            live.add(portfolio)
+            print(f"{path}: {len(portfolio)} positions, ${portfolio.total_value():,.2f}")
+        start_total = live.grand_total
+        start = time.perf_counter()
+        for batch in read_ticks(tick_path, batch_size):
+            live.apply_ticks(batch)
+        seconds = time.perf_counter() - start
+    except OSError as e:
+        print(f"Error reading file: {e}")
+        sys.exit(1)
+
+    print(f"\nReplayed {live.ticks:,} ticks ({live.positions_updated:,} position updates) "
+          f"in {seconds * 1000:.1f} ms")
+    for path, total in zip(holdings_paths, live.totals()):
+        print(f"{path}: ${total:,.2f}")
+    print(f"{'TOTAL:':<12} ${start_total:,.2f} -> ${live.grand_total:,.2f}")
+
+# Batch valuation across processes
+class SharedPriceTable(PriceProvider):
+    """
+    Read-only price table in shared memory
+    The parent packs every price (float64), where each symbol name ends
+    (int64 offsets) and the names themselves into one block. With the
+    offsets any symbol comes back intact, whatever characters it holds.
+    Workers attach to it by name once, when they start, instead of getting
+    a pickled copy of the prices with every task
+    """
+    HEADER = struct.Struct("<qq")   # number of symbols, size of the names
+
+    def __init__(self, block, owner=False):
+        self.block = block
+        self.owner = owner
+        count, names_size = self.HEADER.unpack_from(block.buf)
+        start = self.HEADER.size
+        ends_start = start + count * 8
+        names_start = ends_start + count * 8
+        self.raw_prices = block.buf[start:ends_start]
+        self.prices = self.raw_prices.cast('d')
+        ends = array('q', bytes(block.buf[ends_start:names_start]))
+        names = bytes(block.buf[names_start:names_start + names_size])
+        self.rows = {names[begin:end].decode('utf-8'): row
+                     for row, (begin, end) in enumerate(zip(itertools.chain((0,), ends), ends))}
+
+    @classmethod
+    def create(cls, stock_prices):
+        """Copy a {symbol: price} dict into a new shared memory block"""
+        prices = array('d', stock_prices.values())
+        encoded = [symbol.encode('utf-8') for symbol in stock_prices]
+        ends = array('q', itertools.accumulate(map(len, encoded)))
+        names = b"".join(encoded)
+        start = cls.HEADER.size
+        ends_start = start + len(prices) * 8
+        names_start = ends_start + len(ends) * 8
+        block = shared_memory.SharedMemory(create=True, size=max(names_start + len(names), 1))
+        cls.HEADER.pack_into(block.buf, 0, len(prices), len(names))
+        block.buf[start:ends_start] = prices.tobytes()
+        block.buf[ends_start:names_start] = ends.tobytes()
+        block.buf[names_start:names_start + len(names)] = names
+        return cls(block, owner=True)
+
+    @classmethod
+    def attach(cls, name):
+        """Open a table another process created"""
+        return cls(shared_memory.SharedMemory(name=name))
+
+    @property
+    def name(self):
+        return self.block.name
+
+    def get_prices(self, symbols):
+        rows = self.rows
+        prices = self.prices
+        return {symbol: prices[rows[symbol]] for symbol in symbols if symbol in rows}
+
+    def symbols(self):
+        return list(self.rows)
+
+    def close(self):
+        """Detach (and free the block if we created it). Closing twice is fine"""
+        if self.block is None:
+            return
+        self.prices.release()
+        self.raw_prices.release()
+        self.block.close()
+        if self.owner:
+            self.block.unlink()
+        self.block = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+# Set in each worker process by attach_worker_prices()
+WORKER_PRICES = None
+
+def attach_worker_prices(name):
+    """
+    Process pool initializer: attach to the shared price table once
+    Pool workers leave through os._exit(), which skips atexit, so the
+    table is closed by a multiprocessing finalizer as the worker exits
+    """
+    global WORKER_PRICES
+    WORKER_PRICES = SharedPriceTable.attach(name)
+    multiprocessing.util.Finalize(WORKER_PRICES, WORKER_PRICES.close, exitpriority=10)
+
+def portfolio_files(directory):
+    """Holdings files (.csv/.jsonl) in a directory, sorted by name"""
+    with os.scandir(directory) as entries:
+        return sorted(entry.path for entry in entries
+                      if entry.is_file() and entry.name.lower().endswith((".csv", ".jsonl")))
+
+def value_portfolio_file(path, prices=None):
+    """
+    Import and value one holdings file (runs in a worker process)
+    Returns (path, total, accepted, rejected, [(symbol, quantity, value), ...])
+    with the total and values in cents
+    """
+    portfolio, report = import_holdings(path, prices or WORKER_PRICES)
+    positions = list(zip(portfolio.symbols, portfolio.quantities, portfolio.value_cents()))
+    return path, portfolio.total_cents(), report.accepted, report.rejected, positions
+
+def value_portfolio_directory(directory, stock_prices, workers=1):
+    """
+    Value every holdings file in a directory, in parallel when workers > 1
+    Returns (per-portfolio results, firm-wide {symbol: [quantity, value in cents]})
+    """
+    paths = portfolio_files(directory)
+    with SharedPriceTable.create(stock_prices) as table:
+        if workers <= 1 or len(paths) <= 1:
+            results = [value_portfolio_file(path, table) for path in paths]
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=attach_worker_prices,
+                                     initargs=(table.name,)) as executor:
+                chunksize = max(1, len(paths) // (workers * 4))
+                results = list(executor.map(value_portfolio_file, paths, chunksize=chunksize))
+
+    firm = {}
+    for path, total, accepted, rejected, positions in results:
+        for symbol, quantity, value in positions:
+            entry = firm.get(symbol)
+            if entry is None:
+                firm[symbol] = [quantity, value]
+            else:
+                entry[0] += quantity
+                entry[1] += value
+    return results, firm
+
+def run_batch(directory, workers=None, provider=None):
+    """Value a directory of portfolio files and print totals plus the firm-wide aggregate"""
+    provider = provider or PRICE_PROVIDER
+    workers = workers or os.cpu_count() or 1
+    stock_prices = provider.get_prices(provider.symbols())
+    start = time.perf_counter()
+    try:
+        results, firm = value_portfolio_directory(directory, stock_prices, workers)
+    except OSError as e:
+        print(f"Error reading portfolios: {e}")
+        sys.exit(1)
+    seconds = time.perf_counter() - start
+    if not results:
+        print("No portfolio files (.csv/.jsonl) found.")
+        return
+
+    print("=" * 60)
+    print("                PORTFOLIO TOTALS")
+    print("=" * 60)
+    for path, total, accepted, rejected, positions in results:
+        note = f"  ({rejected} rows rejected)" if rejected else ""
+        print(f"{os.path.basename(path):<30} {f'${total / 100:,.2f}':>20}{note}")
+
+    print("\n" + "=" * 60)
+    print("                FIRM-WIDE HOLDINGS")
+    print("=" * 60)
+    print(f"{'Stock':<8} {'Shares':>14} {'Total Value':>20}")
+    print("-" * 60)
+    for symbol, (quantity, value) in sorted(firm.items(), key=lambda item: -item[1][1]):
+        print(f"{symbol:<8} {quantity:>14,} {f'${value / 100:,.2f}':>20}")
+    print("-" * 60)
+    firm_total = sum(value for quantity, value in firm.values()) / 100
+    print(f"{'FIRM TOTAL:':<23} {f'${firm_total:,.2f}':>20}")
+    print(f"\nValued {len(results)} portfolios with {workers} worker(s) in {seconds:.2f} s")
+
+# Benchmarks
+def make_sample_portfolio(count, seed=0):
+    """A synthetic portfolio of count positions, plus its price table"""
+    rng = random.Random(seed)
+    stock_prices = {f"S{i:06d}": round(rng.uniform(1, 1000), 2) for i in range(count)}
+    holdings = {symbol: rng.randint(1, 10000) for symbol in stock_prices}
+    return holdings, stock_prices
+
+def legacy_portfolio_value(holdings, stock_prices):
+    """The old valuation: a Python loop over the holdings dict"""
+    total_value = 0
+    for stock_symbol, quantity in holdings.items():
+        price = stock_prices[stock_symbol]
+        stock_value = quantity * price
+        total_value += stock_value
+    return total_value
+
+def report_timing(label, seconds, count=None):
+    """Print one benchmark result line"""
+    line = f"  {label:<44} {seconds * 1000:10.2f} ms"
+    if count:
+        line += f"   {count / seconds:14,.0f} rows/s"
+    print(line)
+
+def benchmark_valuation(count=100000, seed=0):
+    """Column valuation vs the old dict loop"""
+    holdings, stock_prices = make_sample_portfolio(count, seed)
+    portfolio = Portfolio.from_holdings(holdings, stock_prices)
+
+    def fresh_total():
+        portfolio.invalidate()
+        return portfolio.total_value()
+
+    def fresh_values():
+        portfolio.invalidate()
+        return portfolio.value_cents()
+
+    def python_total():
+        return sum(map(operator.mul, portfolio.quantities, portfolio.cents))
+
+    engine = "NumPy int64" if numpy is not None else "Python ints, NumPy not installed"
+    print(f"Valuing a portfolio of {count} positions ({engine})")
+    for label, func, rows in [("dict loop (old)", lambda: legacy_portfolio_value(holdings, stock_prices), count),
+                              ("map(mul) over columns", python_total, count),
+                              ("column total", fresh_total, count),
+                              ("column values", fresh_values, count),
+                              ("cached valuation", portfolio.total_value, None)]:
+        report_timing(label, min(timeit.repeat(func, number=1, repeat=5)), rows)
+    print(f"  totals: old ${legacy_portfolio_value(holdings, stock_prices):,.2f}  "
+          f"new ${portfolio.total_value():,.2f}")
+
+def benchmark_money(count=100000, seed=0):
+    """Float vs Decimal vs integer-cents valuation: speed and rounding drift"""
+    rng = random.Random(seed)
+    cents = array('q', (rng.randint(1, 100000) for _ in range(count)))
+    quantities = array('q', (rng.randint(1, 10000) for _ in range(count)))
+    prices = dollars_column(cents)
+    decimal_prices = [Decimal(price) / 100 for price in cents]
+
+    def float_loop():
+        total_value = 0
+        for quantity, price in zip(quantities, prices):
+            total_value += quantity * price
+        return total_value
+
+    columns = Portfolio()
+    columns.symbols = [f"S{row:07d}" for row in range(count)]
+    columns.quantities, columns.cents = quantities, cents
+
+    def column_total():
+        columns.invalidate()
+        return columns.total_cents()
+
+    engine = "NumPy int64" if int64_views(quantities, cents) is not None else "NumPy not installed"
+    print(f"Valuing {count:,} positions")
+    results = {}
+    for label, func in [("float += loop (old)", float_loop),
+                        ("float columns", lambda: sum(map(operator.mul, quantities, prices))),
+                        ("Decimal", lambda: sum(map(operator.mul, quantities, decimal_prices))),
+                        ("cents columns, Python ints", lambda: sum(map(operator.mul, quantities, cents))),
+                        (f"Portfolio.total_cents ({engine})", column_total)]:
+        results[label] = func()
+        report_timing(label, min(timeit.repeat(func, number=1, repeat=5)), count)
+
+    exact = results["cents columns, Python ints"]
+    print(f"  Portfolio.total_cents agrees: {results[f'Portfolio.total_cents ({engine})'] == exact}")
+    print(f"  exact total (cents): ${exact / 100:,.2f}, Decimal agrees: "
+          f"{results['Decimal'] * 100 == exact}")
+    for label in ("float += loop (old)", "float columns"):
+        print(f"  {label} is off by {round(Decimal(results[label]) * 100) - exact:+,} cents")
+
+    # Drift of a running total kept up to date tick by tick
+    portfolio = Portfolio()
+    for row in range(count):
+        portfolio.add(f"S{row:07d}", quantities[row], prices[row])
+    float_total = sum(map(operator.mul, quantities, prices))
+    float_prices = array('d', prices)
+    portfolio.total_cents()
+    for _ in range(count):
+        row = rng.randrange(count)
+        price = rng.randint(1, 100000) / 100
+        float_total += quantities[row] * (price - float_prices[row])
+        float_prices[row] = price
+        portfolio.set_price(row, price)
+    running = portfolio.total_cents()
+    portfolio.invalidate()
+    print(f"  after {count:,} ticks: cents running total off by {running - portfolio.total_cents()} cents, "
+          f"float running total off by {round(Decimal(float_total) * 100) - portfolio.total_cents():+,} cents")
+
+def benchmark_snapshots(count=100000, seed=0):
+    """Ten years of daily snapshots: append speed and mmap queries vs reading everything"""
+    rng = random.Random(seed)
+    days = 3650
+    positions = max(10, count // days)
+    portfolio = Portfolio()
+    for row in range(positions):
+        portfolio.add(f"S{row:05d}", rng.randint(1, 1000), round(rng.uniform(1, 1000), 2))
+    start_time = int(datetime(2015, 1, 1).timestamp())
+
+    directory = tempfile.mkdtemp(prefix="portfolio_history_")
+    try:
+        path = os.path.join(directory, "history.snap")
+        store = SnapshotStore(path)
+        print(f"{days:,} daily snapshots x {positions} positions ({days * positions:,} records)")
+        start = time.perf_counter()
+        for day in range(days):
+            for row in rng.sample(range(positions), max(1, positions // 10)):
+                portfolio.set_price(row, rng.uniform(1, 1000))
+            store.append(portfolio, start_time + day * 86400)
+        report_timing("append snapshots", time.perf_counter() - start, days * positions)
+        print(f"  file size {os.path.getsize(path) / 1e6:.1f} MB + index {os.path.getsize(store.index_path) / 1e3:.0f} KB")
+
+        def load_everything():
+            with open(path, 'rb') as file:
+                data = file.read()[len(SNAPSHOT_MAGIC):]
+            totals = {}
+            for timestamp, name, quantity, cents, value in SNAPSHOT_RECORD.iter_unpack(data):
+                totals[timestamp] = totals.get(timestamp, 0) + value
+            return sorted(totals.items())
+
+        one_year = (start_time + 5 * 365 * 86400, start_time + 6 * 365 * 86400)
+        for label, func in [("totals over time, full read + unpack", load_everything),
+                            ("totals over time, mmap index", store.totals),
+                            ("totals for one year, mmap index", lambda: store.totals(*one_year)),
+                            ("lookup by timestamp", lambda: store.at(one_year[0] + 12345)),
+                            ("one symbol across one year", lambda: store.symbol_history("S00003", *one_year)),
+                            ("per-symbol P&L over one year", lambda: store.profit_and_loss(*one_year))]:
+            report_timing(label, min(timeit.repeat(func, number=1, repeat=3)))
+        print(f"  totals agree: {load_everything() == store.totals()}")
+        store.close()
+    finally:
+        shutil.rmtree(directory)
+
+def write_sample_holdings(path, count, seed=0, file_format="csv", bad_fraction=0.01):
+    """Write a synthetic holdings file with a few bad rows mixed in"""
+    rng = random.Random(seed)
+    symbols = list(STOCK_PRICES) + ["FAKE"]
+    with open(path, 'w', newline='', encoding='utf-8') as file:
+        if file_format == "csv":
+            file.write("symbol,quantity\n")
+        for _ in range(count):
+            symbol = rng.choice(symbols)
+            quantity = rng.randint(1, 500) if rng.random() > bad_fraction else "lots"
+            if file_format == "csv":
+                file.write(f"{symbol},{quantity}\n")
+            else:
+                file.write(json.dumps({"symbol": symbol, "quantity": quantity}) + "\n")
+
+def benchmark_import(count=1000000, seed=0):
+    """Rows/sec of the streaming holdings import"""
+    directory = tempfile.mkdtemp(prefix="portfolio_import_")
+    try:
+        print(f"Importing {count:,} holdings rows")
+        for file_format in ("csv", "jsonl"):
+            path = os.path.join(directory, f"holdings.{file_format}")
+            write_sample_holdings(path, count, seed, file_format)
+            start = time.perf_counter()
+            portfolio, report = import_holdings(path, STOCK_PRICES)
+            seconds = time.perf_counter() - start
+            report_timing(f"{file_format} ({report.rejected:,} rejected)", seconds, count)
+    finally:
+        shutil.rmtree(directory)
+
+def write_sample_price_feed(path, symbols, seed=0):
+    """Write a mock price feed (JSON) for the given symbols"""
+    rng = random.Random(seed)
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump({symbol: round(rng.uniform(1, 1000), 2) for symbol in symbols}, file)
+
+def benchmark_prices(count=100000, seed=0):
+    """Revalue many portfolios against one universe, with and without the cache"""
+    rng = random.Random(seed)
+    universe = [f"S{i:05d}" for i in range(min(count, 5000))]
+    portfolios = []
+    for _ in range(200):
+        portfolio = Portfolio()
+        for symbol in rng.sample(universe, 500):
+            portfolio.add(symbol, rng.randint(1, 1000), 0.0)
+        portfolios.append(portfolio)
+
+    directory = tempfile.mkdtemp(prefix="portfolio_prices_")
+    try:
+        path = os.path.join(directory, "feed.json")
+        write_sample_price_feed(path, universe, seed)
+        # 1 ms per batch call stands in for a remote feed
+        print(f"Revaluing {len(portfolios)} portfolios x 500 positions "
+              f"against {len(universe)} symbols (1 ms per feed call)")
+
+        # One call per symbol is far too slow to run in full, so time the
+        # first few portfolios and scale up
+        sample = portfolios[:5]
+        feed = FilePriceProvider(path, latency=0.001)
+        start = time.perf_counter()
+        for portfolio in sample:
+            for symbol in portfolio.symbols:
+                feed.get_price(symbol)
+        seconds = (time.perf_counter() - start) * len(portfolios) / len(sample)
+        calls = feed.calls * len(portfolios) // len(sample)
+        report_timing(f"one call per symbol (~{calls:,} calls, est.)", seconds)
+
+        feed = FilePriceProvider(path, latency=0.001)
+        start = time.perf_counter()
+        for portfolio in portfolios:
+            portfolio.revalue(feed)
+        report_timing(f"one batch per portfolio ({feed.calls} calls)", time.perf_counter() - start)
+
+        feed = FilePriceProvider(path, latency=0.001)
+        cache = CachedPriceProvider(feed)
+        start = time.perf_counter()
+        for portfolio in portfolios:
+            portfolio.revalue(cache)
+        report_timing(f"batched + cache ({feed.calls} calls)", time.perf_counter() - start)
+
+        stats = cache.stats()
+        print(f"  cache: {stats['lookups']:,} lookups, hit rate {stats['hit_rate']:.1%}, "
+              f"{stats['us_per_lookup']:.2f} us/lookup, {stats['source_batches']} source batches")
+    finally:
+        shutil.rmtree(directory)
+
+def write_sample_ticks(path, symbols, count, seed=0):
+    """Write a synthetic tick file: count rows of symbol,price"""
+    rng = random.Random(seed)
+    with open(path, 'w', newline='', encoding='utf-8') as file:
+        file.write("symbol,price\n")
+        for _ in range(count):
+            file.write(f"{rng.choice(symbols)},{rng.uniform(1, 1000):.2f}\n")
+
+def benchmark_ticks(count=100000, seed=0):
+    """Replay a tick file against thousands of portfolios, incremental vs full revaluation"""
+    rng = random.Random(seed)
+    universe = [f"S{i:05d}" for i in range(5000)]
+    portfolios = []
+    for _ in range(2000):
+        portfolio = Portfolio()
+        for symbol in rng.sample(universe, 50):
+            portfolio.add(symbol, rng.randint(1, 1000), round(rng.uniform(1, 1000), 2))
+        portfolios.append(portfolio)
+    batch_size = 100
+
+    directory = tempfile.mkdtemp(prefix="portfolio_ticks_")
+    try:
+        path = os.path.join(directory, "ticks.csv")
+        write_sample_ticks(path, universe, count, seed)
+        batches = list(read_ticks(path, batch_size))
+        print(f"Replaying {count:,} ticks in batches of {batch_size} against "
+              f"{len(portfolios)} portfolios x 50 positions")
+
+        # The old way: every batch of ticks revalues every portfolio from
+        # scratch. Time the first few batches and scale up
+        sample = batches[:20]
+        start = time.perf_counter()
+        for batch in sample:
+            for portfolio in portfolios:
+                portfolio.apply_prices(batch)
+                portfolio.invalidate()
+                portfolio.total_value()
+        seconds = (time.perf_counter() - start) * len(batches) / len(sample)
+        report_timing("full revaluation per batch (est.)", seconds, count)
+
+        for portfolio in portfolios:
+            portfolio.invalidate()
+        start = time.perf_counter()
+        live = LivePortfolios(portfolios)
+        report_timing("build reverse index", time.perf_counter() - start)
+        start = time.perf_counter()
+        for batch in batches:
+            live.apply_ticks(batch)
+        report_timing(f"incremental ({live.positions_updated:,} position updates)",
+                      time.perf_counter() - start, count)
+
+        reads = 10000
+        seconds = timeit.timeit(lambda: live.grand_total_cents, number=reads)
+        print(f"  grand total read: {seconds * 1e6 / reads:.2f} us (kept up to date by the ticks)")
+
+        # Running totals are whole cents, so they must equal a from-scratch valuation exactly
+        running = live.grand_total_cents
+        for portfolio in portfolios:
+            portfolio.invalidate()
+        fresh = sum(portfolio.total_cents() for portfolio in portfolios)
+        print(f"  grand total: running ${running / 100:,.2f}  recomputed ${fresh / 100:,.2f}  "
+              f"({'exact match' if running == fresh else f'off by {running - fresh} cents'})")
+    finally:
+        shutil.rmtree(directory)
+
+def benchmark_batch(count=100000, seed=0):
+    """Value a directory of portfolio files serially and across a process pool"""
+    rng = random.Random(seed)
+    stock_prices = {f"S{i:05d}": round(rng.uniform(1, 1000), 2) for i in range(5000)}
+    universe = list(stock_prices)
+    files = 200
+    rows = max(1, count // files)
+    workers = max(2, os.cpu_count() or 1)
+
+    directory = tempfile.mkdtemp(prefix="portfolio_batch_")
+    try:
+        for number in range(files):
+            with open(os.path.join(directory, f"portfolio_{number:04d}.csv"), 'w', encoding='utf-8') as file:
+                file.write("symbol,quantity\n")
+                for _ in range(rows):
+                    file.write(f"{rng.choice(universe)},{rng.randint(1, 500)}\n")
+        print(f"Valuing {files} portfolio files x {rows:,} rows against {len(stock_prices):,} prices")
+        print(f"  (the price table would be {len(pickle.dumps(stock_prices)):,} bytes pickled per task; "
+              f"shared memory sends only its name)")
+
+        totals = {}
+        for label, pool_size in [("1 process", 1), (f"{workers} processes", workers)]:
+            start = time.perf_counter()
+            results, firm = value_portfolio_directory(directory, stock_prices, pool_size)
+            report_timing(label, time.perf_counter() - start, files * rows)
+            totals[label] = sum(value for quantity, value in firm.values()) / 100
+        print("  firm totals: " + ", ".join(f"{label} ${total:,.2f}" for label, total in totals.items()))
+    finally:
+        shutil.rmtree(directory)
+
+def legacy_save_to_csv(portfolio, path):
+    """The old CSV export: one formatted writerow() per position"""
+    with open(path, 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(['Stock Symbol', 'Shares', 'Price per Share', 'Total Value'])
+        for stock_symbol, quantity, price in zip(portfolio.symbols, portfolio.quantities, portfolio.prices):
+            stock_value = quantity * price
+            writer.writerow([stock_symbol, quantity, f"${price:.2f}", f"${stock_value:.2f}"])
+        writer.writerow(['', '', 'TOTAL:', f"${portfolio.total_value():.2f}"])
+
+def benchmark_export(count=1000000, seed=0):
+    """Time every report format for a large portfolio"""
+    holdings, stock_prices = make_sample_portfolio(count, seed)
+    portfolio = Portfolio.from_holdings(holdings, stock_prices)
+    portfolio.total_value()
+
+    directory = tempfile.mkdtemp(prefix="portfolio_export_")
+    try:
+        print(f"Exporting a portfolio of {count:,} positions")
+        start = time.perf_counter()
+        legacy_save_to_csv(portfolio, os.path.join(directory, "legacy.csv"))
+        report_timing("csv, row by row (old)", time.perf_counter() - start, count)
+        # The target is about a second per million rows; text formats fall
+        # short because every price still goes through %.2f, chunked or not
+        target = count / 1e6
+        missed = []
+        for fmt, compress in [("txt", False), ("csv", False), ("csv", True), ("npz", False), ("npz", True)]:
+            start = time.perf_counter()
+            path = write_report(portfolio, "bench", fmt, compress, directory)
+            seconds = time.perf_counter() - start
+            label = f"{os.path.basename(path)} ({os.path.getsize(path) / 1e6:.1f} MB)"
+            report_timing(label, seconds, count)
+            if seconds > target * 1.05:
+                missed.append(os.path.basename(path))
+        if missed:
+            print(f"  over the ~{target:.2f} s target: {', '.join(missed)}")
+    finally:
+        shutil.rmtree(directory)
+
+BENCHMARKS = {
+    "valuation": benchmark_valuation,
+    "import": benchmark_import,
+    "prices": benchmark_prices,
+    "ticks": benchmark_ticks,
+    "batch": benchmark_batch,
+    "export": benchmark_export,
+    "money": benchmark_money,
+    "snapshots": benchmark_snapshots,
+}
+
+def parse_args(argv=None):
+    """Command line options - with no command we start the interactive tracker"""
+    parser = argparse.ArgumentParser(description="Stock Portfolio Tracker")
+    parser.add_argument("--prices", default=None,
+                        help="price feed file (JSON object or symbol,price CSV) instead of the built-in table")
+    parser.add_argument("--price-ttl", type=float, default=60.0, help="seconds to cache prices (default: 60)")
+    parser.add_argument("--price-stats", action="store_true", help="print price cache counters on exit")
+    parser.add_argument("--history", default=None, help="append every valuation to this snapshot file")
+    subparsers = parser.add_subparsers(dest="command")
+
+    subparsers.add_parser("track", help="interactive portfolio tracker (default)")
+
+    import_parser = subparsers.add_parser("import", help="import holdings from a CSV or JSONL file")
+    import_parser.add_argument("file", help="holdings file (symbol,quantity per row)")
+    import_parser.add_argument("--format", choices=("csv", "jsonl"), default=None,
+                               help="file format (default: from the file name)")
+    import_parser.add_argument("--rejects", default=None, help="write rejected rows to this CSV file")
+    import_parser.add_argument("--save", choices=sorted(REPORT_EXTENSIONS), default=None, help="save the portfolio")
+    import_parser.add_argument("--gzip", action="store_true", help="compress the saved report")
+
+    replay_parser = subparsers.add_parser("replay", help="replay a price tick file against holdings files")
+    replay_parser.add_argument("ticks", help="tick file (symbol,price per row)")
+    replay_parser.add_argument("holdings", nargs="+", help="holdings files, one portfolio each")
+    replay_parser.add_argument("--batch-size", type=int, default=1000, help="ticks applied per batch")
+
+    batch_parser = subparsers.add_parser("batch", help="value every holdings file in a directory")
+    batch_parser.add_argument("directory", help="directory of .csv/.jsonl holdings files, one portfolio each")
+    batch_parser.add_argument("--workers", type=int, default=None,
+                              help="worker processes (default: one per CPU)")
+
+    history_parser = subparsers.add_parser("history", help="show value over time from a snapshot file")
+    history_parser.add_argument("file", help="snapshot file written with --history")
+    history_parser.add_argument("--since", default=None, help="start time (epoch seconds or ISO date)")
+    history_parser.add_argument("--until", default=None, help="end time (epoch seconds or ISO date)")
+    history_parser.add_argument("--symbol", default=None, help="show one symbol's history instead")
+
+    bench_parser = subparsers.add_parser("bench", help="run a benchmark")
+    bench_parser.add_argument("name", choices=sorted(BENCHMARKS))
+    bench_parser.add_argument("--count", type=int, default=100000, help="number of positions")
+    bench_parser.add_argument("--seed", type=int, default=0, help="data seed")
+
+    return parser.parse_args(argv)
+
+def cli(argv=None):
+    """Dispatch the command line to the matching mode"""
+    args = parse_args(argv)
+    if args.prices:
+        source = FilePriceProvider(args.prices)
+        try:
+            source.refresh()
+        except (OSError, ValueError) as e:
+            print(f"Error reading prices: {e}")
+            sys.exit(1)
+    else:
+        source = StaticPriceProvider(STOCK_PRICES)
+    provider = CachedPriceProvider(source, ttl=args.price_ttl)
+    history = SnapshotStore(args.history) if args.history else None
+
+    try:
+        if args.command == "import":
+            run_import(args.file, args.format, args.rejects, args.save, provider, args.gzip, history)
+        elif args.command == "replay":
+            run_replay(args.ticks, args.holdings, args.batch_size, provider)
+        elif args.command == "batch":
+            run_batch(args.directory, args.workers, provider)
+        elif args.command == "history":
+            run_history(args.file, args.since, args.until, args.symbol)
+        elif args.command == "bench":
+            BENCHMARKS[args.name](count=args.count, seed=args.seed)
+        else:
+            main(provider, history)
+    finally:
+        if history is not None:
+            history.close()
+        if args.price_stats:
+            print(json.dumps(provider.stats(), indent=2))
+
 # Run the program
 if __name__ == "__main__":
-    main()
+    cli()
@@ -1,8 +1,32 @@
+import argparse
+import codecs
+import glob
+import hashlib
+import html
+import itertools
+import json
+import math
 import os
+import random
 import shutil
 import re
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
 import requests
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None  # Windows, where os.rename() refuses to replace a file anyway
 
 def file_organizer():
     """
@@ -53,23 +77,23 @@ def file_organizer():
     if confirm in ['y', 'yes']:
         moved_count = 0
         failed_count = 0
+        # Lists the destination once, then hands out free names without probing
+        names = NameAllocator(destination_folder)
         
         for filename in jpg_files:
             source_path = os.path.join(source_folder, filename)
-            dest_path = os.path.join(destination_folder, filename)
             
             try:
                 # Handle file name conflicts
-                if os.path.exists(dest_path):
-                    name, ext = os.path.splitext(filename)
-                    counter = 1
-                    while os.path.exists(dest_path):
-                        new_filename = f"{name}_{counter}{ext}"
-                        dest_path = os.path.join(destination_folder, new_filename)
-                        counter += 1
+                dest_path = names.claim(filename)
+                if os.path.basename(dest_path) != filename:
                     print(f"  Renamed '{filename}' to '{os.path.basename(dest_path)}'")
                 
-                shutil.move(source_path, dest_path)
+                try:
+                    shutil.move(source_path, dest_path)
+                except Exception:
+                    names.release(dest_path)
+                    raise
                 moved_count += 1
                 print(f"  ✓ Moved: {filename}")
                 
@@ -84,6 +108,550 @@ def file_organizer():
     else:
         print("Operation cancelled.")
 
+# Recursive organizer
+DEFAULT_RULES = {".jpg": "organized_images", ".jpeg": "organized_images"}
+MOVE_WORKERS = 8
+MOVE_BATCH = 256
+MAX_ERROR_SAMPLES = 20
+
+def parse_rules(specs=(), rules_file=None):
+    """
+    Build {".ext": folder} from --rule "jpg,jpeg=images" strings and/or a
+    JSON rules file {"images": ["jpg", "jpeg"], "docs": ["pdf"]}
+    """
+    rules = {}
+    if rules_file:
+        with open(rules_file, encoding='utf-8') as file:
+            for folder, extensions in json.load(file).items():
+                for extension in extensions:
+                    rules["." + extension.lower().lstrip(".")] = folder
+    for spec in specs:
+        extensions, sep, folder = spec.partition("=")
+        if not sep or not folder.strip():
+            raise ValueError(f"bad rule {spec!r} (expected EXT[,EXT...]=FOLDER)")
+        for extension in extensions.split(","):
+            if extension.strip():
+                rules["." + extension.strip().lower().lstrip(".")] = folder.strip()
+    return rules or dict(DEFAULT_RULES)
+
+class OrganizeReport:
+    """Counters for one organizer run"""
+
+    def __init__(self):
+        self.scanned = 0
+        self.matched = 0
+        self.moved = 0
+        self.renamed = 0
+        self.failed = 0
+        self.duplicates = 0
+        self.linked = 0
+        self.copied_bytes = 0
+        self.errors = []
+
+    def fail(self, path, error):
+        self.failed += 1
+        if len(self.errors) < MAX_ERROR_SAMPLES:
+            self.errors.append(f"{path}: {error}")
+
+    def print_summary(self, seconds=None):
+        print(f"\n📁 Scanned {self.scanned:,} files, {self.matched:,} matched the rules")
+        print(f"   Successfully moved: {self.moved:,} files")
+        if self.copied_bytes:
+            print(f"   Copied across devices: {self.copied_bytes / 1e6:,.1f} MB")
+        if self.renamed:
+            print(f"   Renamed to avoid a clash: {self.renamed:,} files")
+        if self.duplicates:
+            print(f"   Duplicates found: {self.duplicates:,} files ({self.linked:,} replaced by hard links)")
+        if self.failed:
+            print(f"   Failed to move: {self.failed:,} files")
+            for error in self.errors:
+                print(f"     ✗ {error}")
+        if seconds:
+            print(f"   Took {seconds:.2f} s ({self.matched / seconds:,.0f} files/s)")
+
+def scan_files(root, rules, skip=()):
+    """
+    Walk root recursively with os.scandir and yield (DirEntry, folder,
+    device) for every file, where folder is the rule's folder for its
+    extension (None if no rule matches). Directories in skip (absolute
+    paths, e.g. the destination folders) are not entered
+    The file type comes from the scan itself and the device is looked up
+    once per directory, so there is no stat call per file
+    """
+    pending = [root]
+    while pending:
+        directory = pending.pop()
+        try:
+            entries = os.scandir(directory)
+            device = os.stat(directory).st_dev
+        except OSError:
+            continue  # Unreadable directory: skip it
+        with entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    if os.path.abspath(entry.path) not in skip:
+                        pending.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    name = entry.name
+                    dot = name.rfind(".")
+                    folder = rules.get(name[dot:].lower()) if dot > 0 else None
+                    yield entry, folder, device
+
+class NameAllocator:
+    """
+    Hands out free file names (name, name_1, name_2, ...) in one directory
+    The directory is listed once into a set, and every stem keeps a counter
+    of the next suffix to try, so a name that collides thousands of times
+    still costs O(1) instead of one os.path.exists() per probe. A mover
+    holding the folder exclusively (lock_folder) renames straight onto the
+    names it hands out; otherwise names are claimed on disk atomically - an
+    O_EXCL placeholder, or os.link() when the file can be linked straight
+    in - so two movers (threads or whole processes) can never get the same
+    name; if someone else got there first we just move on to the next one
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.lock = threading.Lock()
+        self.taken = self.list_names()
+        self.counters = {}      # (stem, ext) -> next suffix to try
+        self.folder_lock = None  # Directory fd holding the organizer's flock
+        self.exclusive = False   # Only we are moving files in, see lock_folder()
+
+    def list_names(self):
+        """The names currently in the directory"""
+        try:
+            with os.scandir(self.directory) as entries:
+                return {entry.name for entry in entries}
+        except FileNotFoundError:
+            return set()  # Not created yet (e.g. a dry run)
+
+    def next_name(self, name):
+        """The next name not known to be taken (reserved in memory only)"""
+        with self.lock:
+            if name not in self.taken:
+                self.taken.add(name)
+                return name
+            stem, ext = os.path.splitext(name)
+            counter = self.counters.get((stem, ext), 1)
+            candidate = f"{stem}_{counter}{ext}"
+            while candidate in self.taken:
+                counter += 1
+                candidate = f"{stem}_{counter}{ext}"
+            self.counters[(stem, ext)] = counter + 1
+            self.taken.add(candidate)
+            return candidate
+
+    def claim(self, name):
+        """Reserve a free name with an empty placeholder file. Returns its path"""
+        while True:
+            path = os.path.join(self.directory, self.next_name(name))
+            try:
+                os.close(os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666))
+                return path
+            except FileExistsError:
+                continue  # Created by someone else since we listed the directory
+
+    def release(self, path):
+        """Give back a claimed name whose move failed"""
+        try:
+            if os.path.getsize(path) == 0:
+                os.unlink(path)
+        except OSError:
+            pass
+        with self.lock:
+            self.taken.discard(os.path.basename(path))
+
+    def link_in(self, existing_path, name):
+        """
+        Hard-link an existing file (same device) in under a free name.
+        os.link() claims the name and places the file in one step - it
+        fails rather than overwrite. Returns the new path
+        """
+        while True:
+            path = os.path.join(self.directory, self.next_name(name))
+            try:
+                os.link(existing_path, path)
+                return path
+            except FileExistsError:
+                continue
+
+    def lock_folder(self):
+        """
+        Take the folder's organizer lock - a flock on the directory itself,
+        so nothing is left behind and a crash drops it. The first run gets it
+        exclusively; runs that start meanwhile wait for it to finish, then
+        share the lock (keeping exclusive runs out) and claim every name.
+        Files written by anything other than an organizer are not covered,
+        just as with the old exists() probe. Returns whether we are exclusive
+        """
+        if fcntl is None:
+            self.exclusive = True
+            return True
+        self.folder_lock = os.open(self.directory, os.O_RDONLY)
+        try:
+            fcntl.flock(self.folder_lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            self.exclusive = True
+            # A run that finished since we listed the folder may have added names
+            with self.lock:
+                self.taken |= self.list_names()
+        except BlockingIOError:
+            fcntl.flock(self.folder_lock, fcntl.LOCK_SH)
+        except OSError:
+            pass  # No flock on this filesystem: claim every name
+        return self.exclusive
+
+    def unlock_folder(self):
+        """Drop the lock taken by lock_folder()"""
+        self.exclusive = False
+        if self.folder_lock is not None:
+            os.close(self.folder_lock)
+            self.folder_lock = None
+
+    def move_in(self, source_path, name):
+        """
+        Move a file from the same device in under a free name. Holding the
+        folder exclusively, every name we hand out is known to be free, so
+        that is a single os.rename(); otherwise the name is claimed with an
+        O_EXCL placeholder and the file os.replace()d over it. Renames are
+        atomic, so the file is never in both places. Returns the new path
+        """
+        if self.exclusive:
+            path = os.path.join(self.directory, self.next_name(name))
+            try:
+                os.rename(source_path, path)
+                return path
+            except FileExistsError:
+                pass  # Windows: created behind our back, so claim another name
+            except OSError:
+                with self.lock:
+                    self.taken.discard(os.path.basename(path))
+                raise
+        path = self.claim(name)
+        try:
+            os.replace(source_path, path)
+        except OSError:
+            self.release(path)
+            raise
+        return path
+
+# Duplicate detection
+DEDUP_INDEX_NAME = ".dedup_index.json"
+PARTIAL_HASH_BYTES = 64 * 1024
+HASH_CHUNK = 1 << 20
+HASH_WORKERS = 4
+
+def partial_hash(path):
+    """Hash of the first and last 64 KB of a file - cheap, and tells most same-size files apart"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as file:
+        digest.update(file.read(PARTIAL_HASH_BYTES))
+        if file.seek(0, os.SEEK_END) > 2 * PARTIAL_HASH_BYTES:
+            file.seek(-PARTIAL_HASH_BYTES, os.SEEK_END)
+            digest.update(file.read(PARTIAL_HASH_BYTES))
+    return digest.hexdigest()
+
+def full_hash(path):
+    """Hash of the whole file, read in 1 MB chunks"""
+    digest = hashlib.blake2b()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(HASH_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class DedupIndex:
+    """
+    Persistent content-hash index: {path: [size, mtime_ns, partial hash, full hash]}
+    A hash is only trusted while the file's path, size and mtime are
+    unchanged, so later runs never re-read a file that hasn't changed.
+    Files are compared in three steps, each only for files still tied
+    after the one before: size (free, from stat), a partial hash of the
+    ends of the file, then a full streaming hash. Hashing runs on a thread
+    pool - hashlib releases the GIL while it hashes big buffers
+    """
+
+    def __init__(self, path, workers=HASH_WORKERS):
+        self.path = path
+        self.workers = workers
+        self.entries = {}
+        self.seen = set()
+        self.moved_to = {}      # old path -> new path, for files moved this run
+        self.partial_reads = 0
+        self.full_reads = 0
+        self.cached = 0
+        try:
+            with open(path, encoding='utf-8') as file:
+                self.entries = json.load(file)
+        except FileNotFoundError:
+            pass
+        except ValueError:
+            self.entries = {}   # Corrupt index: start again
+
+    def stat(self, path):
+        """(size, mtime_ns) of a file, dropping cached hashes that went stale"""
+        info = os.stat(path)
+        key = (info.st_size, info.st_mtime_ns)
+        entry = self.entries.get(path)
+        if entry is None or (entry[0], entry[1]) != key:
+            self.entries[path] = [info.st_size, info.st_mtime_ns, None, None]
+        self.seen.add(path)
+        return info.st_size
+
+    def hashes(self, paths, field, function):
+        """Fill in one hash field (2 = partial, 3 = full) for paths, hashing only what isn't cached"""
+        missing = [path for path in paths if self.entries[path][field] is None]
+        self.cached += len(paths) - len(missing)
+        if not missing:
+            return [self.entries[path][field] for path in paths]
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for path, digest in zip(missing, executor.map(function, missing)):
+                self.entries[path][field] = digest
+        return [self.entries[path][field] for path in paths]
+
+    def find_duplicates(self, paths):
+        """
+        Map every path whose content matches an earlier path in the list
+        to that earlier path. Unreadable files are left out
+        """
+        by_size = {}
+        for path in paths:
+            try:
+                by_size.setdefault(self.stat(path), []).append(path)
+            except OSError:
+                continue
+
+        candidates = [path for group in by_size.values() if len(group) > 1 for path in group]
+        self.partial_reads += sum(1 for path in candidates if self.entries[path][2] is None)
+        by_partial = {}
+        for path, digest in zip(candidates, self.hashes(candidates, 2, partial_hash)):
+            by_partial.setdefault((self.entries[path][0], digest), []).append(path)
+
+        candidates = [path for group in by_partial.values() if len(group) > 1 for path in group]
+        self.full_reads += sum(1 for path in candidates if self.entries[path][3] is None)
+        originals = {}
+        duplicate_of = {}
+        for path, digest in zip(candidates, self.hashes(candidates, 3, full_hash)):
+            original = originals.setdefault(digest, path)
+            if original != path:
+                duplicate_of[path] = original
+        # Keep the original order of the input
+        order = {path: number for number, path in enumerate(paths)}
+        return dict(sorted(duplicate_of.items(), key=lambda item: order[item[0]]))
+
+    def rename(self, old_path, new_path):
+        """Carry a file's hashes over to its new path after a move"""
+        entry = self.entries.pop(old_path, None)
+        if entry is not None:
+            self.entries[new_path] = entry
+            self.seen.discard(old_path)
+            self.seen.add(new_path)
+        self.moved_to[old_path] = new_path
+
+    def save(self):
+        """Write the index (only files seen this run) atomically"""
+        entries = {path: self.entries[path] for path in self.seen if path in self.entries}
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as file:
+            json.dump(entries, file)
+        os.replace(temp_path, self.path)
+
+def find_folder_duplicates(index, folders, paths):
+    """
+    Duplicates among paths, counting what is already in the folders first,
+    so files already organized are the copies we keep
+    Returns {duplicate path: original path} for the given paths only
+    """
+    existing = []
+    for folder in folders:
+        try:
+            with os.scandir(folder) as entries:
+                existing += [entry.path for entry in entries
+                             if entry.is_file(follow_symlinks=False) and entry.name != DEDUP_INDEX_NAME]
+        except FileNotFoundError:
+            continue
+    wanted = set(paths)
+    return {path: original for path, original in index.find_duplicates(existing + list(paths)).items()
+            if path in wanted}
+
+def move_batch(moves):
+    """
+    Copy a batch of files to another device (runs in a worker thread)
+    Each destination is a placeholder already claimed by a NameAllocator,
+    which shutil.move overwrites
+    Returns [(source, destination, bytes copied, error or None)]
+    """
+    results = []
+    for source_path, dest_path, names in moves:
+        try:
+            size = os.path.getsize(source_path)
+            shutil.move(source_path, dest_path)
+            results.append((source_path, dest_path, size, None))
+        except OSError as e:
+            names.release(dest_path)
+            results.append((source_path, dest_path, 0, e))
+    return results
+
+def organize_tree(root, rules, dest_root=None, workers=MOVE_WORKERS, dry_run=False, verbose=False,
+                  duplicates=None, index_path=None):
+    """
+    Recursively move every file under root that matches a rule into
+    dest_root/<folder> (dest_root defaults to root)
+    Each destination folder is locked for the run (NameAllocator.lock_folder),
+    so moves within one device are one os.rename() onto a name the
+    allocator knows is free, done right here: they all land in the same
+    few folders, whose directory lock serializes them anyway, so a thread
+    pool only adds overhead. Only runs that overlap with another one claim
+    names with O_EXCL first. Moves across devices are copies, so their
+    names are claimed here and the copying runs in batches on a thread pool
+    duplicates picks what happens to files whose content is already in a
+    destination folder (or earlier in this run): None keeps them all,
+    "skip" leaves them where they are, "link" replaces them with a hard
+    link to the copy we keep, "report" lists them and moves them like any
+    other file. The hashes are kept
+    in a DedupIndex (index_path, default dest_root/.dedup_index.json)
+    Returns an OrganizeReport
+    """
+    dest_root = root if dest_root is None else dest_root
+    if duplicates:
+        # The index is keyed by path, so keep paths the same from run to run
+        root, dest_root = os.path.abspath(root), os.path.abspath(dest_root)
+    folders = {}
+    for folder in set(rules.values()):
+        path = os.path.join(dest_root, folder)
+        if not dry_run:
+            os.makedirs(path, exist_ok=True)
+        folders[folder] = path
+    devices = {folder: os.stat(path).st_dev if os.path.isdir(path) else None
+               for folder, path in folders.items()}
+    allocators = {folder: NameAllocator(path) for folder, path in folders.items()}
+    skip = {os.path.abspath(path) for path in folders.values()}
+    report = OrganizeReport()
+
+    def matched_files():
+        for entry, folder, device in scan_files(root, rules, skip):
+            report.scanned += 1
+            if folder is not None:
+                report.matched += 1
+                yield entry.path, entry.name, folder, device
+
+    files = matched_files()
+    duplicate_of = {}
+    index = None
+    if duplicates:
+        files = list(files)
+        index = DedupIndex(index_path or os.path.join(dest_root, DEDUP_INDEX_NAME))
+        duplicate_of = find_folder_duplicates(index, folders.values(), [path for path, _, _, _ in files])
+        report.duplicates = len(duplicate_of)
+        if duplicates == "report" or verbose:
+            for path, original in duplicate_of.items():
+                print(f"  Duplicate: {path} (same as {original})")
+        if not dry_run:
+            index.save()
+    # Only skip and link keep duplicates out of the normal moves
+    held_back_paths = duplicate_of if duplicates in ("skip", "link") else {}
+
+    def moved(source_path, name, dest_path):
+        report.moved += 1
+        if index is not None:
+            index.rename(source_path, dest_path)
+        if os.path.basename(dest_path) != name:
+            report.renamed += 1
+            if verbose:
+                print(f"  Renamed '{name}' to '{os.path.basename(dest_path)}'")
+        if verbose:
+            print(f"  ✓ Moved: {source_path}")
+
+    if dry_run:
+        for path, name, folder, device in files:
+            if path in held_back_paths:
+                continue
+            # Names are only reserved in memory, nothing is created
+            dest_path = os.path.join(folders[folder], allocators[folder].next_name(name))
+            if os.path.basename(dest_path) != name:
+                report.renamed += 1
+            if verbose:
+                print(f"  {path} -> {dest_path}")
+        return report
+
+    # Folders are locked in a fixed order, so two runs can't deadlock
+    for folder in sorted(allocators):
+        allocators[folder].lock_folder()
+    try:
+        held_back = []
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            futures = []
+            copies = []
+            for path, name, folder, device in files:
+                if path in held_back_paths:
+                    held_back.append((path, name, folder, device))
+                    continue
+                names = allocators[folder]
+                try:
+                    if device == devices[folder]:
+                        moved(path, name, names.move_in(path, name))
+                        continue
+                    copies.append((path, names.claim(name), names))
+                except OSError as e:
+                    report.fail(path, e)
+                    continue
+                if len(copies) >= MOVE_BATCH:
+                    futures.append(executor.submit(move_batch, copies))
+                    copies = []
+            if copies:
+                futures.append(executor.submit(move_batch, copies))
+            for future in futures:
+                for source_path, dest_path, size, error in future.result():
+                    if error is None:
+                        report.copied_bytes += size
+                        moved(source_path, os.path.basename(source_path), dest_path)
+                    else:
+                        report.fail(source_path, error)
+
+        if duplicates == "link":
+            # Each duplicate becomes a hard link to the copy we kept
+            for path, name, folder, device in held_back:
+                original = duplicate_of[path]
+                original = index.moved_to.get(original, original)
+                try:
+                    dest_path = allocators[folder].link_in(original, name)
+                    os.unlink(path)
+                    report.linked += 1
+                    index.rename(path, dest_path)
+                    if verbose:
+                        print(f"  🔗 Linked: {path} -> {dest_path}")
+                except OSError as e:
+                    report.fail(path, e)
+    finally:
+        for names in allocators.values():
+            names.unlock_folder()
+    if index is not None:
+        index.save()
+    return report
+
+def run_organize(root, dest_root=None, rule_specs=(), rules_file=None, workers=MOVE_WORKERS,
+                 dry_run=False, verbose=False, duplicates=None, index_path=None):
+    """Non-interactive organizer for the command line"""
+    if not os.path.isdir(root):
+        print(f"Error: Source folder '{root}' does not exist!")
+        sys.exit(1)
+    try:
+        rules = parse_rules(rule_specs, rules_file)
+    except (OSError, ValueError) as e:
+        print(f"Error reading rules: {e}")
+        sys.exit(1)
+    start = time.perf_counter()
+    try:
+        report = organize_tree(root, rules, dest_root, workers, dry_run, verbose, duplicates, index_path)
+    except OSError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    if dry_run:
+        held_back = report.duplicates if duplicates in ("skip", "link") else 0
+        print(f"Dry run: {report.matched - held_back:,} of {report.scanned:,} files would move, "
+              f"{report.renamed:,} renamed, {report.duplicates:,} duplicates")
+    else:
+        report.print_summary(time.perf_counter() - start)
+
 def email_extractor():
     """
     Task 2: Extract email addresses from a text file and save to another file
@@ -116,19 +684,9 @@ def email_extractor():
         return
     
     try:
-        # Read the file content
-        with open(input_file, 'r', encoding='utf-8') as file:
-            content = file.read()
-        
-        # Regular expression pattern for email addresses
-        # This pattern matches most common email formats
-        email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-        
-        # Find all email addresses
-        emails = re.findall(email_pattern, content)
-        
-        # Remove duplicates while preserving order
-        unique_emails = list(dict.fromkeys(emails))
+        # Stream the file through the precompiled pattern, keeping only
+        # the unique addresses (in the order they first appear)
+        unique_emails = extract_emails(input_file)
         
         if not unique_emails:
             print("No email addresses found in the file!")
@@ -144,20 +702,400 @@ def email_extractor():
             output_file = "extracted_emails.txt"
         
         # Save emails to output file
-        with open(output_file, 'w') as file:
-            file.write(f"Email Addresses Extracted from: {input_file}\n")
-            file.write(f"Extraction Date: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-            file.write(f"Total Found: {len(unique_emails)}\n")
-            file.write("=" * 50 + "\n\n")
-            
-            for i, email in enumerate(unique_emails, 1):
-                file.write(f"{i}. {email}\n")
+        write_email_report(output_file, input_file, unique_emails)
         
         print(f"\n📧 Emails successfully extracted and saved to '{output_file}'!")
         
     except Exception as e:
         print(f"Error processing file: {e}")
 
+# Streaming email extraction
+# Same pattern as always, compiled once, over bytes so files are never decoded
+EMAIL_PATTERN = re.compile(rb'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b')
+# Every byte a match can contain; anything else ends a possible match
+EMAIL_BYTES = b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789._%+-@|"
+SCAN_CHUNK = 8 << 20
+MAX_CARRY = 64 << 10
+
+def scan_email_chunks(file, chunk_size=SCAN_CHUNK, limit=None):
+    """
+    Yield the email addresses (bytes) in a binary file one chunk at a time,
+    as lists in file order, reading fixed-size chunks so memory stays flat
+    however big the file is
+    Each chunk is only scanned up to its last byte that can't be part of an
+    address; the tail after it is carried into the next chunk, so a match
+    cut by a chunk boundary is found whole, exactly as in a single pass.
+    limit stops after that many bytes
+    """
+    carry = b""
+    remaining = limit
+    while True:
+        size = chunk_size if remaining is None else min(chunk_size, remaining)
+        data = file.read(size) if size else b""
+        if remaining is not None:
+            remaining -= len(data)
+        buffer = carry + data if carry else data
+        if not data:
+            end = len(buffer)   # End of input: everything left is complete
+        else:
+            tail = buffer[-MAX_CARRY:]
+            end = len(buffer) - len(tail) + len(tail.rstrip(EMAIL_BYTES))
+            if end <= len(buffer) - len(tail):
+                # A run of address bytes longer than MAX_CARRY (not real
+                # text): keep the last MAX_CARRY bytes in play and move on
+                end = len(buffer) - MAX_CARRY
+        yield EMAIL_PATTERN.findall(buffer, 0, end)
+        if not data:
+            return
+        carry = buffer[end:]
+
+def extract_emails(path, chunk_size=SCAN_CHUNK):
+    """Unique email addresses in a file, in the order they first appear"""
+    unique = {}
+    with open(path, 'rb') as file:
+        # Deduplicate chunk by chunk: memory grows with the number of
+        # unique addresses, not with the file, and only those get decoded
+        for matches in scan_email_chunks(file, chunk_size):
+            unique.update(dict.fromkeys(matches))
+    return [email.decode('ascii') for email in unique]
+
+def write_email_report(output_file, input_file, emails):
+    """Save extracted emails in the numbered report format"""
+    with open(output_file, 'w') as file:
+        file.write(f"Email Addresses Extracted from: {input_file}\n")
+        file.write(f"Extraction Date: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+        file.write(f"Total Found: {len(emails)}\n")
+        file.write("=" * 50 + "\n\n")
+        file.writelines(f"{i}. {email}\n" for i, email in enumerate(emails, 1))
+
+# Parallel extraction over many files
+SPLIT_SIZE = 64 << 20
+SPLIT_SCAN_BLOCK = 64 << 10
+EXTRACT_WORKERS = os.cpu_count() or 1
+
+def iter_input_files(inputs):
+    """
+    Expand files, directories (walked recursively with os.scandir) and glob
+    patterns into file paths, each once, in a stable order
+    """
+    seen = set()
+    for item in inputs:
+        if os.path.isdir(item):
+            pending = [item]
+            paths = []
+            while pending:
+                with os.scandir(pending.pop()) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            pending.append(entry.path)
+                        elif entry.is_file(follow_symlinks=False):
+                            paths.append(entry.path)
+            paths.sort()
+        elif glob.has_magic(item):
+            paths = sorted(path for path in glob.glob(item, recursive=True) if os.path.isfile(path))
+        else:
+            paths = [item]
+        for path in paths:
+            if path not in seen:
+                seen.add(path)
+                yield path
+
+def next_line_end(file, position, size, block_size=SPLIT_SCAN_BLOCK):
+    """
+    Offset just after the first newline at or after position (size if
+    there is none), read in fixed-size blocks so a file with few or no
+    newlines is never pulled into memory in one go
+    """
+    file.seek(position)
+    while position < size:
+        block = file.read(block_size)
+        if not block:
+            break
+        newline = block.find(b"\n")
+        if newline >= 0:
+            return position + newline + 1
+        position += len(block)
+    return size
+
+def split_ranges(path, size, split_size=SPLIT_SIZE):
+    """
+    Cut a file into (start, end) byte ranges of about split_size, each
+    ending just after a newline. Addresses never span lines, so no match
+    can straddle two ranges
+    """
+    ranges = []
+    start = 0
+    with open(path, 'rb') as file:
+        while size - start > split_size:
+            end = next_line_end(file, start + split_size, size)
+            ranges.append((start, end))
+            start = end
+    if start < size or not ranges:
+        ranges.append((start, size))
+    return ranges
+
+def plan_extraction(paths, split_size=SPLIT_SIZE):
+    """
+    Group (path, start, end) ranges into tasks of about split_size bytes:
+    big files are split so no single file holds up the pool, small files
+    are bundled so each one isn't a task of its own
+    """
+    task = []
+    task_bytes = 0
+    for path in paths:
+        size = os.path.getsize(path)
+        for start, end in split_ranges(path, size, split_size):
+            task.append((path, start, end))
+            task_bytes += end - start
+            if task_bytes >= split_size:
+                yield task
+                task = []
+                task_bytes = 0
+    if task:
+        yield task
+
+# Unique address sets
+class MemoryEmailSet:
+    """Unique addresses (bytes) in first-seen order, in an in-memory dict"""
+
+    def __init__(self):
+        self.addresses = {}
+
+    def __len__(self):
+        return len(self.addresses)
+
+    def __iter__(self):
+        return (address.decode('ascii') for address in self.addresses)
+
+    def add_many(self, addresses):
+        """Add addresses, returning how many were new"""
+        before = len(self.addresses)
+        self.addresses.update(dict.fromkeys(addresses))
+        return len(self.addresses) - before
+
+    def close(self):
+        pass
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter: "definitely new" or "maybe seen before"
+    The bit positions come from one 64-bit blake2b digest split in two
+    (double hashing), so each check is one short hash and a few integer
+    operations. Unlike hash(), the digest is the same in every process, so
+    the filter fills the same way from run to run
+    """
+
+    def __init__(self, size_bytes, expected_items):
+        self.bits = bytearray(max(1, size_bytes))
+        self.size = len(self.bits) * 8
+        self.hashes = max(1, min(8, round(self.size / max(1, expected_items) * math.log(2))))
+
+    def add(self, item):
+        """Set the item's bits; True if they were all set already (maybe seen)"""
+        value = int.from_bytes(hashlib.blake2b(item, digest_size=8).digest(), 'little')
+        step = ((value >> 32) & 0xFFFFFFFF) | 1
+        position = value & 0xFFFFFFFF
+        bits = self.bits
+        seen = True
+        for _ in range(self.hashes):
+            position = (position + step) % self.size
+            byte, mask = position >> 3, 1 << (position & 7)
+            if not bits[byte] & mask:
+                bits[byte] |= mask
+                seen = False
+        return seen
+
+class DiskEmailSet:
+    """
+    Unique addresses in first-seen order, for more addresses than fit in RAM
+    The addresses live in a sqlite table whose rowid keeps the order they
+    were first seen. Repeats of busy addresses are caught in RAM by the
+    unflushed write buffer and a cache of recently seen addresses; after
+    that a Bloom filter answers "definitely new" without touching the disk,
+    and only its "maybe seen" answers are looked up in the database. New
+    addresses are written in big batches, and duplicates are never written
+    Everything kept in RAM is charged to memory_limit (bytes): the filter
+    gets up to half (less if expected_items doesn't need it), the write
+    buffer and the recent cache an eighth each, counted by the real size
+    of the addresses they hold, and sqlite's page cache whatever is left
+    after a reserve for sqlite's own bookkeeping
+    """
+    BUFFER_ENTRY_BYTES = 128    # One buffered address beyond its length: bytes header, dict slot and growth
+    RECENT_ENTRY_BYTES = 160    # The same in the recent cache, plus OrderedDict's links
+    SQLITE_RESERVE = 256 << 10  # Schema, statements and connection state outside the page cache
+    BLOOM_BYTES_PER_ITEM = 2    # 16 bits per address: well under 1% false positives
+
+    def __init__(self, path=None, memory_limit=64 << 20, expected_items=100_000_000):
+        self.temporary = path is None
+        if self.temporary:
+            handle, path = tempfile.mkstemp(prefix="emails_", suffix=".sqlite")
+            os.close(handle)
+        self.path = path
+        self.bloom = BloomFilter(min(memory_limit // 2, expected_items * self.BLOOM_BYTES_PER_ITEM),
+                                 expected_items)
+        self.buffer_budget = memory_limit // 8
+        self.recent_budget = memory_limit // 8
+        self.cache_budget = max(64 << 10, memory_limit - len(self.bloom.bits) - self.buffer_budget
+                                - self.recent_budget - self.SQLITE_RESERVE)
+        self.pending = {}
+        self.pending_bytes = 0
+        self.recent = OrderedDict()
+        self.recent_bytes = 0
+        self.count = 0
+        self.disk_lookups = 0
+        self.false_positives = 0
+        self.db = sqlite3.connect(path)
+        self.db.execute("PRAGMA journal_mode=OFF")
+        self.db.execute("PRAGMA synchronous=OFF")
+        self.db.execute(f"PRAGMA cache_size=-{self.cache_budget // 1024}")
+        self.db.execute("CREATE TABLE IF NOT EXISTS emails (id INTEGER PRIMARY KEY, address BLOB UNIQUE)")
+        self.count = self.db.execute("SELECT COUNT(*) FROM emails").fetchone()[0]
+        if self.count:
+            # Reopened store: load what is already there into the filter
+            for (address,) in self.db.execute("SELECT address FROM emails"):
+                self.bloom.add(address)
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        self.flush()
+        cursor = self.db.execute("SELECT address FROM emails ORDER BY id")
+        return (address.decode('ascii') for (address,) in cursor)
+
+    def add_many(self, addresses):
+        """Add addresses, returning how many were new"""
+        pending = self.pending
+        recent = self.recent
+        new = 0
+        for address in addresses:
+            # Busy addresses are usually still in RAM - cheaper than the filter
+            if address in pending:
+                continue
+            if address in recent:
+                recent.move_to_end(address)
+                continue
+            if self.bloom.add(address):
+                self.disk_lookups += 1
+                if self.db.execute("SELECT 1 FROM emails WHERE address = ?", (address,)).fetchone():
+                    self.remember(address)
+                    continue
+                self.false_positives += 1
+            pending[address] = None
+            self.pending_bytes += len(address) + self.BUFFER_ENTRY_BYTES
+            new += 1
+            if self.pending_bytes >= self.buffer_budget:
+                self.flush()
+        self.count += new
+        return new
+
+    def remember(self, address):
+        """Put an address in the recent cache, dropping the oldest ones past its budget"""
+        recent = self.recent
+        recent[address] = None
+        self.recent_bytes += len(address) + self.RECENT_ENTRY_BYTES
+        while self.recent_bytes > self.recent_budget and recent:
+            oldest, _ = recent.popitem(last=False)
+            self.recent_bytes -= len(oldest) + self.RECENT_ENTRY_BYTES
+
+    def flush(self):
+        """Write buffered new addresses to the database in one transaction"""
+        if not self.pending:
+            return
+        with self.db:
+            self.db.executemany("INSERT INTO emails (address) VALUES (?)",
+                                ((address,) for address in self.pending))
+        # Addresses seen for the first time are the likeliest to come back soon
+        for address in self.pending:
+            self.remember(address)
+        self.pending.clear()
+        self.pending_bytes = 0
+
+    def stats(self):
+        return {"unique": self.count, "disk_lookups": self.disk_lookups,
+                "false_positives": self.false_positives, "bloom_hashes": self.bloom.hashes,
+                "cache_budget": self.cache_budget}
+
+    def close(self):
+        self.db.close()
+        if self.temporary:
+            os.unlink(self.path)
+
+def extract_task(task):
+    """
+    Scan one task's byte ranges (runs in a worker process)
+    Returns [(path, matches, unique addresses in first-seen order)] per range
+    """
+    results = []
+    for path, start, end in task:
+        unique = {}
+        matches = 0
+        with open(path, 'rb') as file:
+            file.seek(start)
+            for found in scan_email_chunks(file, limit=end - start):
+                matches += len(found)
+                unique.update(dict.fromkeys(found))
+        results.append((path, matches, list(unique)))
+    return results
+
+def extract_emails_parallel(inputs, workers=EXTRACT_WORKERS, split_size=SPLIT_SIZE, unique=None):
+    """
+    Unique email addresses across files, directories and glob patterns
+    Tasks run on a process pool, but results are merged in input order, so
+    the output is the same as scanning every file one after the other
+    unique is where the addresses are collected (a MemoryEmailSet unless
+    given, e.g. a DiskEmailSet)
+    Returns (unique set, {path: [matches, addresses first seen in that file]})
+    """
+    tasks = plan_extraction(iter_input_files(inputs), split_size)
+    if unique is None:
+        unique = MemoryEmailSet()
+    per_file = {}
+
+    def merge(results):
+        for path, matches, found in results:
+            counts = per_file.setdefault(path, [0, 0])
+            counts[0] += matches
+            counts[1] += unique.add_many(found)
+
+    if workers <= 1:
+        for task in tasks:
+            merge(extract_task(task))
+    else:
+        # Only a small window of tasks is in flight, so a huge input
+        # doesn't queue up every range (and its results) at once
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            pending = deque()
+            for task in tasks:
+                pending.append(executor.submit(extract_task, task))
+                if len(pending) >= workers * 2:
+                    merge(pending.popleft().result())
+            while pending:
+                merge(pending.popleft().result())
+    return unique, per_file
+
+def run_emails(inputs, output_file="extracted_emails.txt", workers=EXTRACT_WORKERS,
+               split_size=SPLIT_SIZE, show_files=True, store="memory", memory_mb=64):
+    """Non-interactive email extraction for the command line"""
+    start = time.perf_counter()
+    unique = DiskEmailSet(memory_limit=memory_mb << 20) if store == "disk" else MemoryEmailSet()
+    try:
+        unique_emails, per_file = extract_emails_parallel(inputs, workers, split_size, unique)
+        write_email_report(output_file, ", ".join(inputs), unique_emails)
+    except (OSError, sqlite3.Error) as e:
+        print(f"Error processing file: {e}")
+        sys.exit(1)
+    finally:
+        unique.close()
+    seconds = time.perf_counter() - start
+    if show_files:
+        print(f"{'File':<50} {'Matches':>12} {'New':>10}")
+        for path, (matches, new) in per_file.items():
+            print(f"{path:<50} {matches:>12,} {new:>10,}")
+    size = sum(os.path.getsize(path) for path in per_file)
+    print(f"📧 {len(unique_emails):,} unique email addresses from {len(per_file):,} files saved to "
+          f"'{output_file}' ({size / 1e6:,.1f} MB in {seconds:.2f} s)")
+
 def webpage_scraper():
     """
     Task 3: Scrape the title of a webpage and save it to a file
@@ -210,22 +1148,15 @@ def webpage_scraper():
     
     try:
         # Send HTTP request with headers to avoid being blocked
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        
-        response = requests.get(url, headers=headers, timeout=10)
+        response = requests.get(url, headers=SCRAPE_HEADERS, timeout=SCRAPE_TIMEOUT, stream=True)
+        if not response.ok:
+            response.close()
         response.raise_for_status()  # Raise an exception for bad status codes
         
-        # Extract title using regex
-        title_pattern = r'<title[^>]*>(.*?)</title>'
-        title_match = re.search(title_pattern, response.text, re.IGNORECASE | re.DOTALL)
+        # Only read the page as far as its title
+        title = read_title(response)[0]
         
-        if title_match:
-            title = title_match.group(1).strip()
-            # Clean up the title (remove extra whitespace and decode HTML entities)
-            title = re.sub(r'\s+', ' ', title)
-            
+        if title is not None:
             print(f"\n🎯 Page Title Found: '{title}'")
             
             # Ask for output file name
@@ -233,20 +1164,7 @@ def webpage_scraper():
             if not output_file:
                 output_file = "scraped_titles.txt"
             
-            # Check if file exists to determine if we should append
-            file_exists = os.path.exists(output_file)
-            mode = 'a' if file_exists else 'w'
-            
-            # Save title to file
-            with open(output_file, mode, encoding='utf-8') as file:
-                if not file_exists:
-                    file.write("WEBPAGE TITLE SCRAPING LOG\n")
-                    file.write("=" * 40 + "\n\n")
-                
-                file.write(f"Date: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-                file.write(f"URL: {url}\n")
-                file.write(f"Title: {title}\n")
-                file.write("-" * 40 + "\n\n")
+            write_title_log(output_file, [(url, title)])
             
             print(f"📄 Title saved to '{output_file}'!")
             
@@ -258,6 +1176,322 @@ def webpage_scraper():
     except Exception as e:
         print(f"❌ Error: {e}")
 
+# Bulk title scraping
+SCRAPE_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+TITLE_PATTERN = re.compile(r'<title[^>]*>(.*?)</title>', re.IGNORECASE | re.DOTALL)
+SCRAPE_WORKERS = 16
+SCRAPE_TIMEOUT = 10
+SCRAPE_RETRIES = 2
+RETRY_BACKOFF = 0.5
+HOST_RATE = 10.0            # Requests per second to any one host (0 = no limit)
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+HOST_POOLS = 64             # Hosts whose idle connections the Session keeps
+
+def clean_title(title):
+    """Decode HTML entities (&amp;, &#233;...) and collapse whitespace"""
+    return re.sub(r'\s+', ' ', html.unescape(title)).strip()
+
+def parse_title(text):
+    """The page title from a whole document, or None"""
+    match = TITLE_PATTERN.search(text)
+    if not match:
+        return None
+    return clean_title(match.group(1))
+
+# Streaming title extraction
+# Tags are matched on a lower-cased copy of the bytes, so nothing is decoded
+# until the title itself is found (UTF-16 pages are turned into UTF-8 first)
+TITLE_OPEN = re.compile(rb'<title(?:\s[^>]*)?>')
+TITLE_CLOSE = re.compile(rb'</title\s*>')
+HEAD_END = re.compile(rb'</head\s*>|<body[\s>]')
+META_CHARSET = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?\s*([a-z0-9_.:-]+)')
+HEADER_CHARSET = re.compile(r'charset\s*=\s*["\']?([\w.:-]+)', re.IGNORECASE)
+BOMS = [(codecs.BOM_UTF8, 'utf-8'), (codecs.BOM_UTF16_LE, 'utf-16-le'), (codecs.BOM_UTF16_BE, 'utf-16-be')]
+STREAM_CHUNK = 16 << 10
+MAX_TITLE_SCAN = 1 << 20    # Give up if no title turns up in the first MB
+CHARSET_PRESCAN = 1024      # Like browsers, look this far for a <meta charset>
+
+def valid_charset(name):
+    """The codec name for a charset label, or None if Python doesn't know it"""
+    try:
+        return codecs.lookup(name.decode('ascii') if isinstance(name, bytes) else name).name
+    except (LookupError, UnicodeDecodeError):
+        return None
+
+class TitleParser:
+    """
+    Finds the <title> in a page fed to it chunk by chunk, and says when it
+    can stop: once </title> has been seen (and the charset is settled),
+    or at </head> / <body> when there is no title at all
+    The charset is picked like browsers do: a BOM first, then the
+    Content-Type header (charset), then a <meta charset>, and utf-8
+    (falling back to windows-1252) by default
+    """
+
+    def __init__(self, charset=None, limit=MAX_TITLE_SCAN):
+        self.charset = valid_charset(charset) if charset else None
+        self.limit = limit
+        self.head = b""             # First bytes, kept until we know if there is a BOM
+        self.bom = None
+        self.decoder = None         # Set for UTF-16 pages, which are scanned as UTF-8
+        self.lowered = bytearray()
+        self.raw = bytearray()
+        self.bytes_read = 0
+        self.searched = 0           # Where the next tag search starts
+        self.title_start = None
+        self.title_bytes = None
+        self.done = False
+
+    def sniff(self, chunk):
+        """Settle the BOM once the first bytes are in; returns what is left to scan"""
+        self.head += chunk
+        if len(self.head) < len(codecs.BOM_UTF8):
+            return None
+        chunk, self.head = self.head, None
+        for bom, name in BOMS:
+            if chunk.startswith(bom):
+                self.bom = name
+                chunk = chunk[len(bom):]
+                break
+        charset = self.bom or self.charset
+        if charset and charset.startswith('utf-16'):
+            self.decoder = codecs.getincrementaldecoder(charset)('replace')
+        return chunk
+
+    def feed(self, chunk):
+        """Add the next chunk; True once there is nothing more to read"""
+        if self.done:
+            return True
+        self.bytes_read += len(chunk)
+        if self.head is not None:
+            chunk = self.sniff(chunk)
+            if chunk is None:
+                return False
+        if self.decoder is not None:
+            chunk = self.decoder.decode(chunk).encode('utf-8')
+        if len(self.raw) < self.limit:
+            self.raw += chunk
+            self.lowered += chunk.lower()
+        lowered = self.lowered
+        # Restart at the last "<" already seen, so a tag split between chunks is still found
+        start = max(0, lowered.rfind(b'<', 0, self.searched))
+        if self.title_start is None:
+            match = TITLE_OPEN.search(lowered, start)
+            head_end = HEAD_END.search(lowered, start)
+            if match and (not head_end or match.start() < head_end.start()):
+                self.title_start = match.end()
+                start = match.end()
+            elif head_end or len(self.raw) >= self.limit:
+                self.done = True
+                return True
+        if self.title_start is not None and self.title_bytes is None:
+            match = TITLE_CLOSE.search(lowered, max(start, self.title_start))
+            if match:
+                self.title_bytes = bytes(self.raw[self.title_start:match.start()])
+            elif len(self.raw) >= self.limit:
+                self.done = True
+                return True
+        self.searched = len(lowered)
+        if self.title_bytes is not None:
+            # A <meta charset> may still follow the title inside the prescan window
+            self.done = (self.bom is not None or self.charset is not None
+                         or self.meta_charset() is not None or len(self.raw) >= CHARSET_PRESCAN
+                         or HEAD_END.search(lowered, self.title_start) is not None)
+        return self.done
+
+    def meta_charset(self):
+        match = META_CHARSET.search(self.lowered, 0, CHARSET_PRESCAN)
+        charset = valid_charset(match.group(1)) if match else None
+        # A page we could read as bytes can't really be UTF-16 - HTML says use utf-8
+        if charset and charset.startswith('utf-16'):
+            return 'utf-8'
+        return charset
+
+    def title(self):
+        """The decoded, cleaned-up title, or None"""
+        if self.title_bytes is None:
+            return None
+        if self.decoder is not None:
+            charset = 'utf-8'       # Already transcoded
+        else:
+            charset = self.bom or self.charset or self.meta_charset()
+        if charset:
+            text = self.title_bytes.decode(charset, 'replace')
+        else:
+            try:
+                text = self.title_bytes.decode('utf-8')
+            except UnicodeDecodeError:
+                text = self.title_bytes.decode('windows-1252', 'replace')
+        return clean_title(text)
+
+def header_charset(response):
+    """The charset named in the Content-Type header, or None"""
+    match = HEADER_CHARSET.search(response.headers.get('Content-Type', ''))
+    return match.group(1) if match else None
+
+def read_title(response, chunk_size=STREAM_CHUNK):
+    """
+    Read a stream=True response only as far as its title, then close it
+    Closing a half-read response drops that connection instead of
+    downloading the rest of the page into the pool
+    Returns (title or None, bytes read)
+    """
+    parser = TitleParser(header_charset(response))
+    try:
+        for chunk in response.iter_content(chunk_size):
+            if parser.feed(chunk):
+                break
+    finally:
+        response.close()
+    return parser.title(), parser.bytes_read
+
+def write_title_log(output_file, entries):
+    """Append (url, title) entries to the scraping log, creating it if needed"""
+    file_exists = os.path.exists(output_file)
+    with open(output_file, 'a' if file_exists else 'w', encoding='utf-8') as file:
+        if not file_exists:
+            file.write("WEBPAGE TITLE SCRAPING LOG\n")
+            file.write("=" * 40 + "\n\n")
+        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        for url, title in entries:
+            file.write(f"Date: {now}\n")
+            file.write(f"URL: {url}\n")
+            file.write(f"Title: {title}\n")
+            file.write("-" * 40 + "\n\n")
+
+def read_urls(inputs):
+    """URLs given directly or listed one per line in files (# marks a comment line)"""
+    urls = []
+    for item in inputs:
+        if item.startswith(('http://', 'https://')):
+            lines = [item]
+        else:
+            with open(item, encoding='utf-8') as file:
+                lines = file.read().splitlines()
+        for line in lines:
+            url = line.strip()
+            if url and not url.startswith('#'):
+                urls.append(url if url.startswith(('http://', 'https://')) else 'https://' + url)
+    return urls
+
+class HostRateLimiter:
+    """
+    Spaces out requests to each host (scheme + host + port) to at most rate
+    per second. Each caller reserves the next free slot under a lock and
+    then sleeps outside it, so threads for different hosts never wait on
+    each other
+    """
+
+    def __init__(self, rate=HOST_RATE):
+        self.interval = 1 / rate if rate > 0 else 0
+        self.next_slot = {}
+        self.lock = threading.Lock()
+
+    def wait(self, url):
+        if not self.interval:
+            return
+        host = urlsplit(url)[:2]
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot.get(host, now))
+            self.next_slot[host] = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+def make_session(workers=SCRAPE_WORKERS):
+    """
+    One keep-alive Session whose pools have room for every worker, and for
+    enough hosts that switching between them doesn't throw connections away
+    """
+    session = requests.Session()
+    session.headers.update(SCRAPE_HEADERS)
+    adapter = requests.adapters.HTTPAdapter(pool_connections=HOST_POOLS, pool_maxsize=workers)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+def retry_delay(response, attempt):
+    """Seconds to wait before the next attempt: Retry-After if given, else exponential backoff"""
+    retry_after = response.headers.get('Retry-After', '') if response is not None else ''
+    if retry_after.isdigit():
+        return min(int(retry_after), 60)
+    return RETRY_BACKOFF * 2 ** attempt
+
+def fetch_title(session, url, limiter, timeout=SCRAPE_TIMEOUT, retries=SCRAPE_RETRIES):
+    """
+    Fetch one page and pull out its title, retrying timeouts, dropped
+    connections and 429/5xx answers. Every attempt goes through the rate limiter
+    The body is streamed and only read as far as the title
+    Returns {"url", "title", "status", "error", "attempts", "bytes"}
+    """
+    result = {"url": url, "title": None, "status": None, "error": None, "attempts": 0, "bytes": 0}
+    for attempt in range(retries + 1):
+        limiter.wait(url)
+        result["attempts"] += 1
+        response = None
+        try:
+            response = session.get(url, timeout=timeout, stream=True)
+            result["status"] = response.status_code
+            if response.ok:
+                result["title"], result["bytes"] = read_title(response)
+                result["error"] = None if result["title"] is not None else "no title found"
+                return result
+            response.close()
+            if response.status_code not in RETRY_STATUSES:
+                response.raise_for_status()
+            result["error"] = f"HTTP {response.status_code}"
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout,
+                requests.exceptions.ChunkedEncodingError) as e:
+            result["error"] = str(e)
+        except requests.exceptions.RequestException as e:
+            # 4xx, bad URLs... trying again won't help
+            result["error"] = str(e)
+            return result
+        if attempt < retries:
+            time.sleep(retry_delay(response, attempt))
+    return result
+
+def scrape_titles(urls, workers=SCRAPE_WORKERS, rate=HOST_RATE, timeout=SCRAPE_TIMEOUT,
+                  retries=SCRAPE_RETRIES, session=None):
+    """Fetch titles for many URLs on a thread pool sharing one Session; results in input order"""
+    limiter = HostRateLimiter(rate)
+    own_session = session is None
+    if own_session:
+        session = make_session(workers)
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(lambda url: fetch_title(session, url, limiter, timeout, retries), urls))
+    finally:
+        if own_session:
+            session.close()
+
+def run_scrape(inputs, output_file="scraped_titles.txt", workers=SCRAPE_WORKERS, rate=HOST_RATE,
+               timeout=SCRAPE_TIMEOUT, retries=SCRAPE_RETRIES, verbose=False):
+    """Non-interactive bulk title scraping for the command line"""
+    try:
+        urls = read_urls(inputs)
+    except OSError as e:
+        print(f"Error reading URL list: {e}")
+        sys.exit(1)
+    start = time.perf_counter()
+    results = scrape_titles(urls, workers, rate, timeout, retries)
+    seconds = time.perf_counter() - start
+    found = [(result["url"], result["title"]) for result in results if result["title"] is not None]
+    write_title_log(output_file, found)
+    failed = [result for result in results if result["title"] is None]
+    if verbose:
+        for result in results:
+            print(f"  {result['url']}: {result['title'] if result['title'] is not None else '❌ ' + result['error']}")
+    else:
+        for result in failed[:MAX_ERROR_SAMPLES]:
+            print(f"❌ {result['url']}: {result['error']}")
+        if len(failed) > MAX_ERROR_SAMPLES:
+            print(f"   ... and {len(failed) - MAX_ERROR_SAMPLES:,} more")
+    print(f"🌐 {len(found):,} of {len(urls):,} titles saved to '{output_file}' "
+          f"in {seconds:.2f} s ({len(urls) / max(seconds, 1e-9):,.1f} URLs/s)")
+
 def main():
     """Main menu to choose which automation task to run"""
     while True:
@@ -286,6 +1520,557 @@ def main():
         
         input("\nPress Enter to continue...")
 
+# Benchmarks
+def report_timing(label, seconds, count=None, unit="files"):
+    """Print one benchmark result line"""
+    line = f"  {label:<40} {seconds * 1000:10.2f} ms"
+    if count:
+        line += f"   {count / seconds:12,.0f} {unit}/s"
+    print(line)
+
+def make_sample_tree(root, count, seed=0, depth=3, fanout=4):
+    """A nested tree of count small files, about a third of them .jpg"""
+    rng = random.Random(seed)
+    directories = [root]
+    for level in range(depth):
+        directories += [os.path.join(parent, f"d{level}_{i}") for parent in directories for i in range(fanout)]
+    for directory in directories:
+        os.makedirs(directory, exist_ok=True)
+    extensions = [".jpg", ".JPEG", ".txt", ".png", ".log", ".csv"]
+    for number in range(count):
+        name = f"IMG_{rng.randrange(count // 4 + 1):05d}{rng.choice(extensions)}"
+        path = os.path.join(rng.choice(directories), name)
+        with open(path, 'ab') as file:
+            file.write(b"x" * rng.randint(0, 64))
+
+def legacy_organize(root, destination_folder):
+    """The old organizer's approach applied to a whole tree: endswith, exists probing, one move at a time"""
+    moved = 0
+    for directory, subdirectories, filenames in os.walk(root):
+        if os.path.abspath(directory).startswith(os.path.abspath(destination_folder)):
+            continue
+        for filename in filenames:
+            if filename.lower().endswith(('.jpg', '.jpeg')):
+                dest_path = os.path.join(destination_folder, filename)
+                if os.path.exists(dest_path):
+                    name, ext = os.path.splitext(filename)
+                    counter = 1
+                    while os.path.exists(dest_path):
+                        dest_path = os.path.join(destination_folder, f"{name}_{counter}{ext}")
+                        counter += 1
+                shutil.move(os.path.join(directory, filename), dest_path)
+                moved += 1
+    return moved
+
+def benchmark_organize(count=20000, seed=0, rounds=3):
+    """Organize a synthetic tree the old way and with the recursive organizer (best of rounds)"""
+    directory = tempfile.mkdtemp(prefix="organizer_")
+    try:
+        print(f"Organizing a tree of {count:,} files")
+        best = {}
+        for label, organize in [("walk + exists + shutil.move (old)",
+                                 lambda root: legacy_organize(root, os.path.join(root, "organized_images"))),
+                                ("scandir + locked folder, plain renames",
+                                 lambda root: organize_tree(root, DEFAULT_RULES).moved)]:
+            for _ in range(rounds):
+                root = os.path.join(directory, "tree")
+                make_sample_tree(root, count, seed)
+                os.makedirs(os.path.join(root, "organized_images"), exist_ok=True)
+                start = time.perf_counter()
+                moved = organize(root)
+                seconds = time.perf_counter() - start
+                best[label] = min(best.get(label, seconds), seconds)
+                shutil.rmtree(root)
+            report_timing(label, best[label], moved)
+            print(f"    moved {moved:,} files")
+        old, new = best.values()
+        print(f"  {old / new:.2f}x the old loop's speed: one rename per file instead of "
+              f"stat() probes and a rename")
+    finally:
+        shutil.rmtree(directory)
+
+def legacy_claim(folder, filename):
+    """The old naming: probe name_1, name_2, ... with os.path.exists until one is free"""
+    dest_path = os.path.join(folder, filename)
+    if os.path.exists(dest_path):
+        name, ext = os.path.splitext(filename)
+        counter = 1
+        while os.path.exists(dest_path):
+            dest_path = os.path.join(folder, f"{name}_{counter}{ext}")
+            counter += 1
+    open(dest_path, 'x').close()
+    return dest_path
+
+def benchmark_naming(count=50000, seed=0):
+    """Give count files the same name: exists() probing vs NameAllocator"""
+    directory = tempfile.mkdtemp(prefix="naming_")
+    try:
+        print(f"Claiming {count:,} copies of IMG_0001.jpg")
+        # Probing is quadratic, so time a slice of the run and scale up by k^2
+        sample = min(count, 2000)
+        folder = os.path.join(directory, "legacy")
+        os.makedirs(folder)
+        start = time.perf_counter()
+        for _ in range(sample):
+            legacy_claim(folder, "IMG_0001.jpg")
+        seconds = (time.perf_counter() - start) * (count / sample) ** 2
+        report_timing(f"exists() probing (old, est. from {sample:,})", seconds, count)
+
+        folder = os.path.join(directory, "allocator")
+        os.makedirs(folder)
+        names = NameAllocator(folder)
+        start = time.perf_counter()
+        for _ in range(count):
+            names.next_name("IMG_0001.jpg")
+        report_timing("NameAllocator naming only (no files)", time.perf_counter() - start, count)
+
+        names = NameAllocator(folder)
+        start = time.perf_counter()
+        for _ in range(count):
+            names.claim("IMG_0001.jpg")
+        report_timing("NameAllocator.claim (O_EXCL)", time.perf_counter() - start, count)
+
+        # Four movers with their own allocators (like four separate runs)
+        # racing for the same names in one folder
+        folder = os.path.join(directory, "race")
+        os.makedirs(folder)
+        claimed = []
+        def racer():
+            racer_names = NameAllocator(folder)
+            claimed.extend(racer_names.claim("IMG_0001.jpg") for _ in range(count // 4))
+        threads = [threading.Thread(target=racer) for _ in range(4)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        report_timing("4 racing allocators", time.perf_counter() - start, len(claimed))
+        print(f"    {len(claimed):,} names claimed, {len(set(claimed)):,} unique")
+    finally:
+        shutil.rmtree(directory)
+
+def write_sample_photos(folder, count, seed=0, prefix="IMG"):
+    """count fake photos: a fifth are copies of earlier ones, a few differ only in the middle"""
+    rng = random.Random(seed)
+    os.makedirs(folder, exist_ok=True)
+    written = []
+    for number in range(count):
+        roll = rng.random()
+        if written and roll < 0.2:
+            data = rng.choice(written)
+        elif written and roll < 0.25:
+            # Same size and same ends as an earlier photo: only the full hash tells them apart
+            data = bytearray(rng.choice(written))
+            data[len(data) // 2] ^= 0xFF
+            data = bytes(data)
+        else:
+            data = rng.randbytes(rng.randint(20_000, 400_000))
+        written.append(data)
+        with open(os.path.join(folder, f"{prefix}_{number:05d}.jpg"), 'wb') as file:
+            file.write(data)
+
+def benchmark_dedup(count=2000, seed=0):
+    """Find duplicates: hash everything vs size/partial/full with a persistent index"""
+    directory = tempfile.mkdtemp(prefix="dedup_")
+    try:
+        folder = os.path.join(directory, "photos")
+        write_sample_photos(folder, count, seed)
+        paths = sorted(os.path.join(folder, name) for name in os.listdir(folder))
+        print(f"Finding duplicates among {count:,} photos")
+
+        start = time.perf_counter()
+        originals = {}
+        naive = {}
+        for path in paths:
+            original = originals.setdefault(full_hash(path), path)
+            if original != path:
+                naive[path] = original
+        report_timing("full hash of every file", time.perf_counter() - start, count)
+
+        index_path = os.path.join(directory, DEDUP_INDEX_NAME)
+        index = DedupIndex(index_path)
+        start = time.perf_counter()
+        found = index.find_duplicates(paths)
+        report_timing("size -> partial -> full (cold)", time.perf_counter() - start, count)
+        print(f"    {len(found):,} duplicates (naive found {len(naive):,}, same: {found == naive}); "
+              f"{index.partial_reads:,} partial and {index.full_reads:,} full reads")
+        index.save()
+
+        # A later run with a few hundred new photos: the index answers for the rest
+        write_sample_photos(folder, count // 10, seed + 1, prefix="NEW")
+        paths = sorted(os.path.join(folder, name) for name in os.listdir(folder))
+        index = DedupIndex(index_path)
+        start = time.perf_counter()
+        found = index.find_duplicates(paths)
+        report_timing(f"second run, +{count // 10:,} files (warm index)", time.perf_counter() - start, len(paths))
+        print(f"    {len(found):,} duplicates; {index.partial_reads:,} partial and "
+              f"{index.full_reads:,} full reads, {index.cached:,} hashes from the index")
+    finally:
+        shutil.rmtree(directory)
+
+def write_sample_mail_log(path, size, seed=0, unique=50000):
+    """A mail-server style log of about size bytes with addresses on most lines"""
+    rng = random.Random(seed)
+    users = [f"{rng.choice(['john', 'mary', 'admin', 'info', 'sales'])}.{i}" for i in range(unique)]
+    domains = ["example.com", "mail.example.org", "company.co.uk", "site.net"]
+    words = ["delivered", "deferred", "bounced", "queued", "status=sent", "relay=local"]
+    with open(path, 'w', encoding='utf-8') as file:
+        written = 0
+        while written < size:
+            line = (f"2024-01-{rng.randint(1, 28):02d} {rng.choice(words)} from=<{rng.choice(users)}@"
+                    f"{rng.choice(domains)}> to=<{rng.choice(users)}@{rng.choice(domains)}> "
+                    f"{' '.join(rng.choices(words, k=3))} notanemail @invalid.com user@.com\n")
+            written += file.write(line)
+
+def legacy_extract_emails(path):
+    """The old extraction: read the whole file, findall, then dedup the full list"""
+    with open(path, 'r', encoding='utf-8') as file:
+        content = file.read()
+    emails = re.findall(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b', content)
+    return list(dict.fromkeys(emails))
+
+def measure_peak(func):
+    """
+    (result, seconds, peak MB of Python allocations) for func
+    tracemalloc slows every allocation down, so the timing is a separate run
+    """
+    start = time.perf_counter()
+    result = func()
+    seconds = time.perf_counter() - start
+    tracemalloc.start()
+    try:
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return result, seconds, peak / 1e6
+
+def benchmark_emails(count=50, seed=0):
+    """Email extraction from a count MB log: whole-file read vs streaming chunks"""
+    directory = tempfile.mkdtemp(prefix="emails_")
+    try:
+        path = os.path.join(directory, "mail.log")
+        write_sample_mail_log(path, count << 20, seed)
+        print(f"Extracting emails from a {count} MB log")
+        results = {}
+        for label, func in [("read + findall + dedup (old)", lambda: legacy_extract_emails(path)),
+                            ("streaming 8 MB chunks", lambda: extract_emails(path))]:
+            emails, seconds, peak = measure_peak(func)
+            results[label] = emails
+            report_timing(label, seconds)
+            print(f"    {len(emails):,} unique, peak Python memory {peak:,.1f} MB")
+        print(f"  same addresses in the same order: {len(set(map(tuple, results.values()))) == 1}")
+
+        # Tiny chunks put thousands of boundaries through the middle of addresses
+        with open(path, 'rb') as file:
+            small = list(dict.fromkeys(itertools.chain.from_iterable(
+                scan_email_chunks(file, 4096, limit=4 << 20))))
+        with open(path, 'rb') as file:
+            whole = list(dict.fromkeys(EMAIL_PATTERN.findall(file.read(4 << 20))))
+        print(f"  4 KB chunks match a single pass: {small == whole}")
+    finally:
+        shutil.rmtree(directory)
+
+def benchmark_extract(count=100, seed=0):
+    """Extract from a count MB corpus (one big log plus many small ones) with 1, 2, 4... workers"""
+    directory = tempfile.mkdtemp(prefix="extract_")
+    try:
+        write_sample_mail_log(os.path.join(directory, "big.log"), (count // 2) << 20, seed)
+        small = os.path.join(directory, "archive")
+        os.makedirs(small)
+        for number in range(50):
+            write_sample_mail_log(os.path.join(small, f"mail_{number:02d}.log"),
+                                  (count << 20) // 100, seed + number + 1)
+        cores = os.cpu_count() or 1
+        print(f"Extracting from a {count} MB corpus (1 big file + 50 small) on {cores} CPU(s)")
+
+        start = time.perf_counter()
+        expected = list(extract_emails_parallel([directory], workers=1, split_size=1 << 62)[0])
+        report_timing("one file at a time, no splitting", time.perf_counter() - start)
+
+        workers = 1
+        while True:
+            start = time.perf_counter()
+            emails, per_file = extract_emails_parallel([directory], workers, split_size=8 << 20)
+            report_timing(f"{workers} worker(s), 8 MB ranges", time.perf_counter() - start)
+            if list(emails) != expected:
+                print("    ✗ output differs from the sequential run!")
+            if workers >= max(cores, 4):
+                break
+            workers *= 2
+        print(f"  {len(expected):,} unique addresses; every run gave the same ordered output")
+    finally:
+        shutil.rmtree(directory)
+
+def benchmark_uniques(count=2_000_000, seed=0):
+    """Collect unique addresses from count matches: in-memory dict vs disk-backed set"""
+    rng = random.Random(seed)
+    # A few very busy senders plus a long tail, so about half the matches repeat
+    matches = [f"user{int(rng.paretovariate(0.3)) % (count // 2)}@mail{rng.randrange(50)}.example.com"
+               .encode('ascii') for _ in range(count)]
+    # Batched up front, so the measured peak is the set's own memory
+    batches = [matches[start:start + 100_000] for start in range(0, count, 100_000)]
+    print(f"Collecting unique addresses from {count:,} matches")
+
+    def collect(unique):
+        """Fill the set, then stream it out into a digest of the ordered addresses"""
+        try:
+            for batch in batches:
+                unique.add_many(batch)
+            digest = hashlib.blake2b()
+            for email in unique:
+                digest.update(email.encode('ascii') + b"\n")
+            return len(unique), digest.hexdigest(), getattr(unique, "stats", dict)()
+        finally:
+            unique.close()
+
+    (total, expected, _), seconds, peak = measure_peak(lambda: collect(MemoryEmailSet()))
+    report_timing("dict in RAM", seconds)
+    print(f"    {total:,} unique, peak Python memory {peak:,.1f} MB")
+    for memory_mb in (4, 16):
+        (_, digest, stats), seconds, peak = measure_peak(
+            lambda: collect(DiskEmailSet(memory_limit=memory_mb << 20, expected_items=count)))
+        report_timing(f"disk set, {memory_mb} MB budget", seconds)
+        # tracemalloc can't see sqlite's own memory, so add what it was allowed
+        sqlite_mb = (stats["cache_budget"] + DiskEmailSet.SQLITE_RESERVE) / 1e6
+        print(f"    peak Python memory {peak:,.1f} MB + sqlite up to {sqlite_mb:,.1f} MB "
+              f"(budget {(memory_mb << 20) / 1e6:,.1f} MB), {stats['disk_lookups']:,} disk lookups, "
+              f"{stats['false_positives']:,} Bloom false positives")
+        if digest != expected:
+            print("    ✗ output differs from the in-memory set!")
+
+class StubPageHandler(BaseHTTPRequestHandler):
+    """
+    Local pages for the scraper benchmarks - no network needed
+    /page/N is a normal page, /flaky/N answers 503 the first time it is
+    asked for, anything else is a 404
+    """
+    protocol_version = "HTTP/1.1"     # Keep-alive, so connection reuse shows
+    disable_nagle_algorithm = True    # Headers and body go out as two writes
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_GET(self):
+        server = self.server
+        if server.delay:
+            time.sleep(server.delay)
+        with server.lock:
+            server.requests += 1
+            first_try = self.path not in server.seen
+            server.seen.add(self.path)
+        if self.path.startswith("/flaky/") and first_try:
+            self.send_page(503, b"busy, try again", {"Retry-After": "0"})
+        elif self.path.startswith(("/page/", "/flaky/")):
+            self.send_page(200, server.page(self.path))
+        else:
+            self.send_page(404, b"not found")
+
+    def send_page(self, status, body, headers=None):
+        parts = body if isinstance(body, list) else [body]
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(sum(map(len, parts))))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        try:
+            for part in parts:
+                self.wfile.write(part)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client had what it needed (a streamed title) and hung up
+            self.close_connection = True
+
+    def log_message(self, format, *args):
+        pass
+
+def start_stub_server(delay=0, body_size=2048):
+    """
+    Serve StubPageHandler on a free local port in a background thread
+    delay (seconds) stands in for network latency on every request
+    Returns the server - stop it with server.shutdown()
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubPageHandler)
+    server.daemon_threads = True
+    server.delay = delay
+    server.lock = threading.Lock()
+    server.connections = server.requests = 0
+    server.seen = set()
+    filler = b"<p>" + b"lorem ipsum dolor sit amet " * (body_size // 27) + b"</p>\n"
+    server.page = lambda path: [f"<html><head><title>Stub page {path} &ndash; local</title></head><body>\n"
+                                .encode('utf-8'), filler, b"</body></html>\n"]
+    server.url = f"http://127.0.0.1:{server.server_address[1]}"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def legacy_scrape(urls):
+    """The old way: one bare requests.get (and connection) per URL, one after another"""
+    titles = []
+    for url in urls:
+        response = requests.get(url, headers=SCRAPE_HEADERS, timeout=SCRAPE_TIMEOUT)
+        titles.append(parse_title(response.text))
+    return titles
+
+def benchmark_scrape(count=200, seed=0):
+    """Scrape count stub pages spread over 4 local hosts with 20 ms latency each"""
+    servers = [start_stub_server(delay=0.02) for _ in range(4)]
+    try:
+        urls = [f"{servers[number % 4].url}/page/{number}" for number in range(count)]
+        random.Random(seed).shuffle(urls)
+        print(f"Scraping {count:,} URLs from 4 local stub hosts (20 ms per response)")
+
+        def connections():
+            return sum(server.connections for server in servers)
+
+        opened = connections()
+        start = time.perf_counter()
+        expected = legacy_scrape(urls)
+        report_timing("requests.get one by one (old)", time.perf_counter() - start, count, "URLs")
+        print(f"    {connections() - opened:,} connections opened")
+
+        for workers in (1, 8, 32):
+            opened = connections()
+            start = time.perf_counter()
+            results = scrape_titles(urls, workers, rate=0)
+            report_timing(f"{workers} thread(s), shared Session", time.perf_counter() - start, count, "URLs")
+            print(f"    {connections() - opened:,} connections opened")
+            if [result["title"] for result in results] != expected:
+                print("    ✗ titles differ from the one-by-one run!")
+
+        # 32 threads, but each host may only see 50 requests a second
+        rate = 50
+        start = time.perf_counter()
+        scrape_titles(urls, 32, rate=rate)
+        seconds = time.perf_counter() - start
+        report_timing(f"32 threads, {rate} requests/s per host", seconds, count, "URLs")
+        print(f"    at least {(count / 4 - 1) / rate:.2f} s expected from the limit")
+
+        flaky = [f"{servers[number % 4].url}/flaky/{number}" for number in range(20)]
+        results = scrape_titles(flaky, 8, rate=0)
+        recovered = sum(result["title"] is not None and result["attempts"] == 2 for result in results)
+        print(f"  503-then-200 pages recovered by one retry: {recovered}/{len(flaky)}")
+        missing = scrape_titles([f"{servers[0].url}/missing"], 1, rate=0)[0]
+        print(f"  404 not retried: {missing['attempts'] == 1} ({missing['error'][:40]}...)")
+    finally:
+        for server in servers:
+            server.shutdown()
+            server.server_close()
+
+def legacy_page_title(url):
+    """The old way: download and decode the whole page, then regex it"""
+    response = requests.get(url, headers=SCRAPE_HEADERS, timeout=SCRAPE_TIMEOUT)
+    return parse_title(response.text), len(response.content)
+
+def benchmark_titles(count=20, seed=0):
+    """Title of a count MB stub page: whole download + regex vs streaming with an early stop"""
+    server = start_stub_server(body_size=count << 20)
+    session = make_session(1)
+    try:
+        url = f"{server.url}/page/{seed}"
+        print(f"Getting the title of a {count} MB page, 5 times")
+
+        def streamed():
+            return read_title(session.get(url, timeout=SCRAPE_TIMEOUT, stream=True))
+
+        results = {}
+        for label, func in [("whole page + regex (old)", lambda: legacy_page_title(url)),
+                            ("streamed, stop at </title>", streamed)]:
+            # thread_time leaves out the stub server's threads
+            start, cpu = time.perf_counter(), time.thread_time()
+            for _ in range(5):
+                title, size = func()
+            report_timing(label, (time.perf_counter() - start) / 5)
+            print(f"    {size:,} bytes read, {(time.thread_time() - cpu) / 5 * 1000:,.1f} ms client CPU per page")
+            results[label] = title
+        print(f"  same title: {len(set(results.values())) == 1} ({title!r})")
+    finally:
+        session.close()
+        server.shutdown()
+        server.server_close()
+
+BENCHMARKS = {
+    "dedup": benchmark_dedup,
+    "extract": benchmark_extract,
+    "emails": benchmark_emails,
+    "organize": benchmark_organize,
+    "scrape": benchmark_scrape,
+    "titles": benchmark_titles,
+    "naming": benchmark_naming,
+    "uniques": benchmark_uniques,
+}
+
+def parse_args(argv=None):
+    """Command line options - with no command we show the interactive menu"""
+    parser = argparse.ArgumentParser(description="Python Task Automation Suite")
+    subparsers = parser.add_subparsers(dest="command")
+
+    organize_parser = subparsers.add_parser("organize", help="recursively sort files into folders by extension")
+    organize_parser.add_argument("root", help="folder to organize (searched recursively)")
+    organize_parser.add_argument("--dest", default=None, help="where the folders are created (default: root)")
+    organize_parser.add_argument("--rule", action="append", default=[], metavar="EXT[,EXT]=FOLDER",
+                                 help="move these extensions into FOLDER (repeatable; default: jpg,jpeg=organized_images)")
+    organize_parser.add_argument("--rules", default=None, help='JSON rules file: {"folder": ["ext", ...]}')
+    organize_parser.add_argument("--workers", type=int, default=MOVE_WORKERS,
+                                 help="threads copying files to another device")
+    organize_parser.add_argument("--dedup", choices=("skip", "link", "report"), default=None,
+                                 help="find files already in the destination: leave them, hard-link them, or list them and move them anyway")
+    organize_parser.add_argument("--dedup-index", default=None,
+                                 help=f"hash index file (default: DEST/{DEDUP_INDEX_NAME})")
+    organize_parser.add_argument("--dry-run", action="store_true", help="only show what would move")
+    organize_parser.add_argument("--verbose", action="store_true", help="print every file")
+
+    emails_parser = subparsers.add_parser("emails", help="extract unique email addresses from files")
+    emails_parser.add_argument("inputs", nargs="+", help="files, directories (searched recursively) or glob patterns")
+    emails_parser.add_argument("-o", "--output", default="extracted_emails.txt", help="report file")
+    emails_parser.add_argument("--workers", type=int, default=EXTRACT_WORKERS,
+                               help="worker processes (default: one per CPU)")
+    emails_parser.add_argument("--split-size", type=int, default=SPLIT_SIZE,
+                               help="bytes per task; bigger files are split at line boundaries")
+    emails_parser.add_argument("--quiet", action="store_true", help="don't list the per-file counts")
+    emails_parser.add_argument("--store", choices=("memory", "disk"), default="memory",
+                               help="keep unique addresses in RAM or in a disk-backed set")
+    emails_parser.add_argument("--memory-mb", type=int, default=64,
+                               help="RAM budget of the disk-backed set (default: 64)")
+
+    scrape_parser = subparsers.add_parser("scrape", help="fetch the titles of many webpages")
+    scrape_parser.add_argument("inputs", nargs="+", help="URLs and/or files listing one URL per line")
+    scrape_parser.add_argument("-o", "--output", default="scraped_titles.txt", help="log file (appended to)")
+    scrape_parser.add_argument("--workers", type=int, default=SCRAPE_WORKERS, help="download threads")
+    scrape_parser.add_argument("--rate", type=float, default=HOST_RATE,
+                               help=f"max requests per second to one host, 0 for no limit (default: {HOST_RATE:g})")
+    scrape_parser.add_argument("--timeout", type=float, default=SCRAPE_TIMEOUT, help="seconds per request")
+    scrape_parser.add_argument("--retries", type=int, default=SCRAPE_RETRIES,
+                               help="extra attempts after timeouts, dropped connections and 429/5xx")
+    scrape_parser.add_argument("--verbose", action="store_true", help="print every title")
+
+    bench_parser = subparsers.add_parser("bench", help="run a benchmark")
+    bench_parser.add_argument("name", choices=sorted(BENCHMARKS))
+    bench_parser.add_argument("--count", type=int, default=None, help="number of files (default: per benchmark)")
+    bench_parser.add_argument("--seed", type=int, default=0, help="data seed")
+
+    return parser.parse_args(argv)
+
+def cli(argv=None):
+    """Dispatch the command line to the matching mode"""
+    args = parse_args(argv)
+    if args.command == "organize":
+        run_organize(args.root, args.dest, args.rule, args.rules, args.workers, args.dry_run, args.verbose,
+                     args.dedup, args.dedup_index)
+    elif args.command == "emails":
+        run_emails(args.inputs, args.output, args.workers, args.split_size, not args.quiet,
+                   args.store, args.memory_mb)
+    elif args.command == "scrape":
+        run_scrape(args.inputs, args.output, args.workers, args.rate, args.timeout, args.retries, args.verbose)
+    elif args.command == "bench":
+        options = {"seed": args.seed}
+        if args.count:
+            options["count"] = args.count
+        BENCHMARKS[args.name](**options)
+    else:
+        main()
+
 # Run the program
 if __name__ == "__main__":
-    main()
+    cli()
@@ -1,161 +1,468 @@
+import argparse
+import asyncio
+import hashlib
+import itertools
+import json
+import marshal
+import os
 import random
+import re
+import shutil
+import struct
+import sys
+import tempfile
+import threading
 import time
+import timeit
+import tracemalloc
+from array import array
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
 
-def get_bot_response(user_input):
+# Rules file with the intents, their keywords and responses
+RULES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "chatbot_rules.json")
+RULES_CACHE_VERSION = 3
+RULES_CHECK_INTERVAL = 2.0  # Seconds between checks for an edited rules file
+
+def build_keyword_regex(keywords):
     """
-    Main function that processes user input and returns appropriate response
-    Uses if-elif chains to match patterns and return responses
+    Build a regex for a list of keywords, factored into a prefix trie
+    so the regex engine dispatches on one character at a time instead
+    of trying every keyword at every position
     """
-    # Convert input to lowercase for easier matching
-    user_input = user_input.lower().strip()
-    
-    # Greeting responses
-    if any(greeting in user_input for greeting in ['hello', 'hi', 'hey', 'greetings']):
-        greetings = [
-            "Hi there! How can I help you today?",
-            "Hello! Nice to meet you!",
-            "Hey! What's up?",
-            "Greetings! How are you doing?",
-            "Hi! I'm excited to chat with you!"
-        ]
-        return random.choice(greetings)
-    
-    # How are you responses
-    elif any(phrase in user_input for phrase in ['how are you', 'how do you do', 'how\'s it going']):
-        responses = [
-            "I'm doing great, thanks for asking! How about you?",
-            "I'm fine, thanks! Having a wonderful day chatting with people.",
-            "Fantastic! I love helping people. How are you feeling?",
-            "I'm doing well! Ready to assist you with anything you need.",
-            "Great! I'm here and ready to chat. How's your day going?"
-        ]
-        return random.choice(responses)
-    
-    # Name-related questions
-    elif any(phrase in user_input for phrase in ['what is your name', 'what\'s your name', 'who are you']):
-        return "I'm ChatBot, your friendly AI assistant! What's your name?"
-    
-    elif any(phrase in user_input for phrase in ['my name is', 'i am', 'i\'m', 'call me']):
+    trie = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[''] = True  # Marks the end of a keyword
+
+    def emit(node):
+        branches = [re.escape(char) + emit(child)
+                    for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        # Optional tail keeps the match greedy, so we always get the longest keyword
+        return f'(?:{body})?' if '' in node else body
+
+    return emit(trie)
+
+def build_keyword_priority(intents):
+    """
+    Map every keyword to the index of the first intent that uses it
+    The regex returns the longest keyword starting at a position, and every
+    shorter keyword that is a prefix of it matched there too, so each
+    keyword carries the best priority of all its prefixes
+    """
+    priority = {}
+    for index, (_, keywords) in enumerate(intents):
+        for keyword in keywords:
+            priority.setdefault(keyword, index)
+
+    keyword_priority = {}
+    for keyword, best in priority.items():
+        for end in range(1, len(keyword)):
+            best = min(best, priority.get(keyword[:end], best))
+        keyword_priority[keyword] = best
+    return keyword_priority
+
+class ChatRules:
+    """
+    One loaded rules table
+    intents is a tuple of (name, keywords) in priority order and responses
+    maps each intent (plus "default") to a tuple of responses. Intents that
+    capture the user's name also have a tuple in nameless_responses, used
+    when no name could be extracted. A table is never modified after
+    loading - a reload builds a new one
+    use_cache says whether reloads of the same file may use and write the
+    sidecar cache. A compiled regex can't be cached, so loading never
+    compiles it: use_rules() starts compiling it on a background thread,
+    and a match that comes first waits for that compile instead of paying
+    for its own. With thousands of intents the compile takes far longer
+    than loading from the cache, so a first message that arrives at once
+    still waits for it
+    """
+
+    def __init__(self, intents, responses, nameless_responses, keyword_regex, keyword_priority,
+                 source=None, stamp=None, use_cache=False):
+        self.intents = intents
+        self.responses = responses
+        self.nameless_responses = nameless_responses
+        self.keyword_regex = keyword_regex
+        self.keyword_priority = keyword_priority
+        self.intent_names = tuple(name for name, _ in intents)
+        self.source = source
+        self.stamp = stamp
+        self.use_cache = use_cache
+        self.regex = self.wrap_regex(keyword_regex)
+        self.compiled = None
+        self.compile_lock = threading.Lock()
+
+    @property
+    def pattern(self):
+        """The compiled keyword regex (compiled the first time it is needed)"""
+        if self.compiled is None:
+            with self.compile_lock:
+                if self.compiled is None:
+                    self.compiled = re.compile(self.regex)
+        return self.compiled
+
+    def table(self):
+        """
+        The loaded tables as plain tuples, dicts and strings - what the
+        sidecar cache holds - so they can be sent to worker processes,
+        including rules built in memory that have no file to load
+        """
+        return (self.intents, self.responses, self.nameless_responses, self.keyword_regex,
+                self.keyword_priority, self.source, self.stamp, self.use_cache)
+
+    def compile_in_background(self):
+        """Start compiling the keyword regex on a daemon thread, if it isn't compiled yet"""
+        if self.compiled is None:
+            threading.Thread(target=lambda: self.pattern, name="rules-compile", daemon=True).start()
+
+    @staticmethod
+    def wrap_regex(keyword_regex):
+        """
+        Zero-width lookahead: finditer visits every position exactly once and
+        overlapping keywords (like 'hi' inside 'this') are never skipped
+        """
+        return '(?=(' + keyword_regex + '))'
+
+def parse_rules(document):
+    """
+    Turn a parsed rules document into (intents, responses, nameless_responses)
+    Raises ValueError if the document is malformed
+    """
+    if not isinstance(document, dict) or not isinstance(document.get("intents"), list):
+        raise ValueError("rules must be an object with an 'intents' list")
+
+    def strings(value, what):
+        if not isinstance(value, list) or not value or not all(isinstance(v, str) for v in value):
+            raise ValueError(f"{what} must be a non-empty list of strings")
+        return tuple(value)
+
+    intents = []
+    responses = {"default": strings(document.get("default_responses"), "default_responses")}
+    nameless_responses = {}
+    for entry in document["intents"]:
+        name = entry.get("name") if isinstance(entry, dict) else None
+        if not isinstance(name, str) or not name or name == "default" or name in responses:
+            raise ValueError(f"intent needs a unique 'name' (got {name!r})")
+        keywords = strings(entry.get("keywords"), f"keywords of intent {name!r}")
+        intents.append((name, tuple(keyword.lower() for keyword in keywords)))
+        responses[name] = strings(entry.get("responses"), f"responses of intent {name!r}")
+        if "responses_without_name" in entry:
+            nameless_responses[name] = strings(entry["responses_without_name"],
+                                               f"responses_without_name of intent {name!r}")
+    return tuple(intents), responses, nameless_responses
+
+def compile_rules(document, source=None, stamp=None, use_cache=False):
+    """Build a ChatRules table from a parsed rules document"""
+    intents, responses, nameless_responses = parse_rules(document)
+    keywords = [keyword for _, words in intents for keyword in words]
+    return ChatRules(intents, responses, nameless_responses, build_keyword_regex(keywords),
+                     build_keyword_priority(intents), source, stamp, use_cache)
+
+def rules_cache_path(path):
+    """The sidecar file that caches the tables built from a rules file"""
+    return path + ".cache"
+
+def read_rules_cache(path):
+    """Read a sidecar cache, returning None if it is missing or unusable"""
+    try:
+        with open(rules_cache_path(path), 'rb') as file:
+            cached = marshal.loads(file.read())
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+    if not isinstance(cached, dict) or cached.get("version") != RULES_CACHE_VERSION:
+        return None
+    return cached
+
+def write_rules_cache(path, rules, digest):
+    """
+    Save the built tables next to the rules file (atomically)
+    The cache is a marshal dump of plain tuples, dicts and strings, which
+    loads much faster than JSON and can't run code the way a pickle can.
+    It holds the finished keyword regex source and priority map, so a
+    cached start does no parsing or trie building at all
+    """
+    cached = {
+        "version": RULES_CACHE_VERSION,
+        "mtime_ns": rules.stamp[0],
+        "size": rules.stamp[1],
+        "sha256": digest,
+        "intents": rules.intents,
+        "responses": rules.responses,
+        "nameless_responses": rules.nameless_responses,
+        "keyword_regex": rules.keyword_regex,
+        "keyword_priority": rules.keyword_priority,
+    }
+    temp_path = f"{rules_cache_path(path)}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, 'wb') as file:
+            marshal.dump(cached, file)
+        os.replace(temp_path, rules_cache_path(path))
+    except OSError:
+        # A read-only directory just means every start takes the slow path
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+
+def rules_from_cache(cached, source, stamp):
+    """
+    Rebuild a ChatRules table from a sidecar cache
+    Returns None if the cache doesn't have the expected shape
+    """
+    try:
+        return ChatRules(cached["intents"], cached["responses"], cached["nameless_responses"],
+                         cached["keyword_regex"], cached["keyword_priority"], source, stamp, use_cache=True)
+    except (KeyError, TypeError):
+        return None
+
+def load_rules(path=RULES_FILE, use_cache=True):
+    """
+    Load a rules file, going through the <rules>.cache sidecar unless
+    use_cache is False
+    The cache is used as-is when the file's mtime and size match, and
+    after a content hash check when only the mtime changed
+    """
+    stat = os.stat(path)
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    cached = read_rules_cache(path) if use_cache else None
+    if cached and (cached.get("mtime_ns"), cached.get("size")) == stamp:
+        rules = rules_from_cache(cached, path, stamp)
+        if rules is not None:
+            return rules
+
+    with open(path, 'rb') as file:
+        data = file.read()
+    digest = hashlib.sha256(data).hexdigest()
+    if cached and cached.get("sha256") == digest:
+        # Only the mtime changed - reuse everything and just re-stamp the cache
+        rules = rules_from_cache(cached, path, stamp)
+        if rules is not None:
+            write_rules_cache(path, rules, digest)
+            return rules
+
+    try:
+        document = json.loads(data)
+    except ValueError as e:
+        raise ValueError(f"{path} is not valid JSON: {e}") from None
+    rules = compile_rules(document, path, stamp, use_cache)
+    if use_cache:
+        write_rules_cache(path, rules, digest)
+    return rules
+
+# Nothing is loaded at import time: cli() loads the --rules file, and
+# current_rules() falls back to the default file for library use
+RULES = None
+RULES_CHECKED_AT = time.monotonic()
+RULES_BROKEN_STAMP = None
+
+def current_rules():
+    """The rules table in use, loading the default rules file on first use"""
+    if RULES is None:
+        use_rules_file(RULES_FILE)
+    return RULES
+
+def use_rules(rules):
+    """Make rules the table used by get_bot_reply (its regex compiles in the background)"""
+    global RULES, RULES_CHECKED_AT
+    rules.compile_in_background()
+    RULES = rules
+    RULES_CHECKED_AT = time.monotonic()
+
+def use_rules_file(path, use_cache=True):
+    """Load a rules file and start using it"""
+    use_rules(load_rules(path, use_cache))
+
+def use_rules_table(table):
+    """Start using rules sent as ChatRules.table() (the worker initializer)"""
+    use_rules(ChatRules(*table))
+
+def reload_rules_if_changed(force=False):
+    """
+    Hot reload: pick up an edited rules file without a restart
+    Only stats the file every RULES_CHECK_INTERVAL seconds. A broken file
+    is reported once and the current rules stay in use
+    Returns True if new rules were loaded
+    """
+    global RULES_CHECKED_AT, RULES_BROKEN_STAMP
+    now = time.monotonic()
+    if RULES is None or RULES.source is None or (not force and now - RULES_CHECKED_AT < RULES_CHECK_INTERVAL):
+        return False  # Rules built in memory have no file to watch
+    RULES_CHECKED_AT = now
+
+    try:
+        stat = os.stat(RULES.source)
+    except OSError:
+        return False  # Editors sometimes remove the file for a moment while saving
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    if stamp == RULES.stamp or stamp == RULES_BROKEN_STAMP:
+        return False
+
+    try:
+        use_rules(load_rules(RULES.source, RULES.use_cache))
+    except (OSError, ValueError) as e:
+        print(f"ChatBot: could not reload rules, keeping the old ones: {e}", file=sys.stderr)
+        RULES_BROKEN_STAMP = stamp
+        return False
+    return True
+
+def match_intent(user_input, rules=None):
+    """
+    Find the highest-priority intent in one pass over the (lowercased) input
+    Returns the intent name or None if nothing matched
+    """
+    rules = rules or RULES or current_rules()
+    keyword_priority = rules.keyword_priority
+    best = None
+    for match in rules.pattern.finditer(user_input):
+        priority = keyword_priority[match.group(1)]
+        if best is None or priority < best:
+            best = priority
+            if best == 0:
+                break  # Nothing can beat the first intent
+    return None if best is None else rules.intent_names[best]
+
+def legacy_match_intent(user_input, rules=None):
+    """
+    The old if/elif chain: one any() substring scan per intent
+    Kept as the reference for the benchmark
+    """
+    for intent, keywords in (rules or RULES or current_rules()).intents:
+        if any(keyword in user_input for keyword in keywords):
+            return intent
+    return None
+
+def select_response(rules, intent, raw_input, rng=random, lowered=None):
+    """Pick the response for a matched intent and return (intent, response, name)"""
+    if intent in rules.nameless_responses:
         # Try to extract the name
-        name = extract_name(user_input)
+        name = extract_name(raw_input, lowered)
         if name:
-            return f"Nice to meet you, {name}! That's a lovely name."
+            return intent, rng.choice(rules.responses[intent]).replace("{name}", name), name
         else:
-            return "Nice to meet you! Thanks for telling me your name."
-    
-    # Age-related questions
-    elif any(phrase in user_input for phrase in ['how old', 'your age', 'age are you']):
-        return "I don't have an age like humans do, but I was created recently! How old are you?"
-    
-    # Help requests
-    elif any(word in user_input for word in ['help', 'assist', 'support']):
-        return "I'm here to help! You can ask me about myself, chat casually, or just say hello. What would you like to know?"
-    
-    # Compliments
-    elif any(word in user_input for word in ['good', 'great', 'awesome', 'amazing', 'cool', 'nice']):
-        responses = [
-            "Thank you! That's very kind of you to say.",
-            "I appreciate the compliment! You're pretty awesome too!",
-            "Thanks! I'm glad you think so. You made my day!",
-            "That's so nice! I try my best to be helpful.",
-            "Thank you! You're making me blush (if I could)!"
-        ]
-        return random.choice(responses)
-    
-    # Feelings and emotions
-    elif any(word in user_input for word in ['sad', 'unhappy', 'depressed', 'down']):
-        return "I'm sorry to hear you're feeling down. Sometimes talking helps. Want to share what's bothering you?"
-    
-    elif any(word in user_input for word in ['happy', 'excited', 'great', 'wonderful']):
-        return "That's fantastic! I love hearing when people are happy. What's making you feel so good?"
-    
-    elif any(word in user_input for word in ['tired', 'sleepy', 'exhausted']):
-        return "You sound tired! Make sure to get some rest. Sleep is important for your health."
-    
-    # Weather (basic response since we can't check real weather)
-    elif any(word in user_input for word in ['weather', 'rain', 'sunny', 'cold', 'hot']):
-        return "I can't check the actual weather, but I hope it's nice where you are! What's the weather like?"
-    
-    # Time-related
-    elif any(word in user_input for word in ['time', 'date', 'day']):
-        return "I don't have access to real-time information, but I hope you're having a great day whenever it is!"
-    
-    # Food-related
-    elif any(word in user_input for word in ['food', 'eat', 'hungry', 'pizza', 'burger']):
-        return "I don't eat, but I love hearing about food! What's your favorite dish?"
-    
-    # Technology/Programming
-    elif any(word in user_input for word in ['python', 'programming', 'code', 'computer']):
-        return "I love talking about technology! Python is amazing for programming. Are you learning to code?"
-    
-    # Jokes
-    elif any(word in user_input for word in ['joke', 'funny', 'laugh']):
-        jokes = [
-            "Why don't scientists trust atoms? Because they make up everything!",
-            "Why did the programmer quit his job? He didn't get arrays! (a raise)",
-            "What do you call a bear with no teeth? A gummy bear!",
-            "Why don't eggs tell jokes? They'd crack each other up!",
-            "What's a computer's favorite snack? Microchips!"
-        ]
-        return random.choice(jokes)
-    
-    # Questions about the bot
-    elif any(phrase in user_input for phrase in ['what can you do', 'what do you do', 'your abilities']):
-        return "I can chat with you, answer basic questions, tell jokes, and try to be helpful! I'm still learning though."
-    
-    # Goodbye responses
-    elif any(word in user_input for word in ['bye', 'goodbye', 'see you', 'farewell', 'exit', 'quit']):
-        farewells = [
-            "Goodbye! It was great chatting with you!",
-            "See you later! Have a wonderful day!",
-            "Farewell! Thanks for the lovely conversation!",
-            "Bye! Hope to chat with you again soon!",
-            "Take care! It was a pleasure talking with you!"
-        ]
-        return random.choice(farewells)
-    
-    # Default responses for unrecognized input
-    else:
-        default_responses = [
-            "That's interesting! Tell me more about that.",
-            "I'm not sure I understand, but I'm listening!",
-            "Could you rephrase that? I want to make sure I understand.",
-            "Hmm, that's something new for me. Can you explain more?",
-            "I'm still learning! Could you try asking that differently?",
-            "That sounds fascinating! I'd love to learn more about it.",
-            "I'm not quite sure how to respond to that, but I'm here to chat!"
-        ]
-        return random.choice(default_responses)
-
-def extract_name(user_input):
-    """
-    Simple function to extract name from user input
-    Looks for patterns like "my name is John" or "I am Jane"
+            return intent, rng.choice(rules.nameless_responses[intent]), None
+
+    return intent, rng.choice(rules.responses[intent or "default"]), None
+
+def get_bot_reply(user_input, rng=random):
+    """
+    Process user input and return (intent, response, name)
+    intent is None for unrecognized input, name is only set when the
+    user introduced themselves
+    """
+    if PIPELINE_STATS is not None:
+        return instrumented_bot_reply(user_input, rng)
+    rules = RULES or current_rules()
+
+    # Convert input to lowercase for easier matching
+    # (the raw text is kept so names come back the way they were typed)
+    raw_input = user_input.strip()
+    user_input = raw_input.lower()
+
+    return select_response(rules, match_intent(user_input, rules), raw_input, rng, user_input)
+
+def get_bot_response(user_input, rng=random):
+    """
+    Main function that processes user input and returns appropriate response
+    Uses the compiled intent matcher to pick the response list
+    Pass a random.Random as rng to make the choice of response reproducible
+    """
+    return get_bot_reply(user_input, rng)[1]
+
+# Common patterns for name introduction, most explicit first. "my name is"
+# anywhere in the message beats the others ("I am happy, my name is Bob" is
+# about Bob), otherwise the first phrase in the message wins. Each phrase
+# has to start a word, so "hi am" is not "i am"
+NAME_PHRASES = ("my name is ", "call me ", "i am ", "i'm ")
+NAME_PUNCTUATION = ".,!?;:\"()"
+
+def name_at(user_input, position):
+    """
+    The name that starts at position: the word there without surrounding
+    punctuation, then any capitalized words right after it ("Mary Jane").
+    A trailing period stays on initials ("J.R.", "J.") and any other
+    punctuation ends the name, as does "I" ("I'm Bob I think")
+    """
+    words = user_input[position:].split(None, 1)
+    if not words:
+        return None
+    word = words[0]
+    if word.isalpha() and (len(words) == 1 or not words[1][0].isupper()):
+        return word[0].upper() + word[1:]  # The usual case: one plain word
+    word = word.lstrip(NAME_PUNCTUATION)
+    core = word.rstrip(NAME_PUNCTUATION)
+    if not core:
+        return None
+    name = ""
+    while True:
+        if len(core) != len(word) and word[len(core)] == "." and (len(core) == 1 or "." in core):
+            core += "."
+        name = f"{name} {core}" if name else core
+        if len(core) != len(word) or len(words) < 2 or not words[1][0].isupper():
+            break  # Punctuation or a lowercase word ends the name
+        words = words[1].split(None, 1)
+        word = words[0]
+        core = word.rstrip(NAME_PUNCTUATION)
+        if not core or core == "I":
+            break
+    return name[0].upper() + name[1:]
+
+def extract_name(user_input, lowered=None):
+    """
+    Extract a name from user input
+    Looks for patterns like "my name is John" or "I am Mary Jane" and keeps
+    the casing the user typed (only the first letter is capitalized)
+    Pass the lowercased input as lowered if you already have it
+    """
+    if lowered is None:
+        lowered = user_input.lower()
+    if len(lowered) != len(user_input):
+        # Rare letters change length when lowercased; positions wouldn't line up
+        user_input = lowered
+    first_at = len(lowered)
+    first_name = None
+    for phrase in NAME_PHRASES:
+        if phrase not in lowered:
+            continue
+        at = lowered.find(phrase)
+        while 0 <= at < first_at:
+            if at == 0 or not (lowered[at - 1].isalnum() or lowered[at - 1] == "_"):
+                name = name_at(user_input, at + len(phrase))
+                if name:
+                    if phrase is NAME_PHRASES[0]:
+                        return name
+                    first_at, first_name = at, name
+                    break
+            at = lowered.find(phrase, at + 1)
+    return first_name
+
+def legacy_extract_name(user_input):
+    """
+    The old extractor: lowercase again, then find() each pattern in turn
+    Kept as the reference for the benchmark
     """
     user_input = user_input.lower()
-    
-    # Common patterns for name introduction
-    patterns = [
-        'my name is ',
-        'i am ',
-        'i\'m ',
-        'call me '
-    ]
-    
-    for pattern in patterns:
+    for pattern in ['my name is ', 'i am ', 'i\'m ', 'call me ']:
         if pattern in user_input:
-            # Find the position after the pattern
-            start_pos = user_input.find(pattern) + len(pattern)
-            # Extract the word after the pattern
-            remaining = user_input[start_pos:].strip()
+            remaining = user_input[user_input.find(pattern) + len(pattern):].strip()
             if remaining:
-                # Take the first word as the name
-                name = remaining.split()[0]
-                # Capitalize the first letter
-                return name.capitalize()
-    
+                return remaining.split()[0].capitalize()
     return None
 
+ENCOURAGEMENTS = [
+    "(I'm enjoying our conversation! Keep it going! 😄)",
+    "(You're a great conversationalist! 🌟)",
+    "(This is fun! What else would you like to talk about? 💬)"
+]
+
+EXIT_COMMANDS = ['quit', 'exit', 'stop']
+
 def typing_effect(text, delay=0.03):
     """
     Creates a typing effect for bot responses
@@ -185,14 +492,15 @@ def display_welcome():
     print("\nType 'quit' or 'exit' anytime to end our conversation.")
     print("=" * 60)
 
-def main():
+def main(log=None):
     """
     Main chatbot loop
     Handles user input and bot responses
+    Pass a ConversationLogWriter as log to record every turn
     """
     display_welcome()
     
-    conversation_count = 0
+    session = SESSIONS.get(LOCAL_USER)
     
     print("\nChatBot: Hi there! I'm excited to chat with you! 😊")
     
@@ -207,27 +515,31 @@ def main():
                 continue
             
             # Check for exit commands
-            if user_input.lower() in ['quit', 'exit', 'stop']:
+            if user_input.lower() in EXIT_COMMANDS:
                 print("ChatBot: Thanks for chatting! Have a great day! 👋")
                 break
             
-            # Get bot response
-            bot_response = get_bot_response(user_input)
+            # Get bot response (picking up any edits to the rules file first)
+            reload_rules_if_changed()
+            intent, bot_response, name = get_bot_reply(user_input)
             
             # Display response with typing effect
-            print("ChatBot: ", end="")
-            typing_effect(bot_response)
+            if PIPELINE_STATS is None:
+                print("ChatBot: ", end="")
+                typing_effect(bot_response)
+            else:
+                output_start = time.perf_counter_ns()
+                print("ChatBot: ", end="")
+                typing_effect(bot_response)
+                record_output_time(output_start)
             
-            conversation_count += 1
+            session = SESSIONS.record_turn(LOCAL_USER, user_input, bot_response, intent, name)
+            if log is not None:
+                log.write_turn(LOCAL_USER, user_input, bot_response, intent)
             
             # Add some variety every few messages
-            if conversation_count % 5 == 0:
-                encouragement = [
-                    "\n(I'm enjoying our conversation! Keep it going! 😄)",
-                    "\n(You're a great conversationalist! 🌟)",
-                    "\n(This is fun! What else would you like to talk about? 💬)"
-                ]
-                print(random.choice(encouragement))
+            if session.message_count % 5 == 0:
+                print("\n" + random.choice(ENCOURAGEMENTS))
                 
         except KeyboardInterrupt:
             print("\n\nChatBot: Oops! Looks like you pressed Ctrl+C. Goodbye! 👋")
@@ -236,19 +548,1290 @@ def main():
             print(f"\nChatBot: Sorry, I encountered an error: {e}")
             print("But I'm still here to chat! Try again.")
 
+# Instrumentation
+# Set CHATBOT_STATS=1 to collect per-intent hits and per-stage latencies,
+# and CHATBOT_PROFILE=<file> (or =1 for a summary on stderr) to run under cProfile
+STAGES = ("normalize", "match", "select", "output")
+
+class LatencyHistogram:
+    """
+    Latency histogram with power-of-two nanosecond buckets
+    Bucket i holds samples below 2**i ns, so adding a sample is one
+    bit_length() call and the whole histogram is a 64-slot array
+    """
+    __slots__ = ("buckets", "count", "total_ns")
+
+    def __init__(self):
+        self.buckets = array('Q', bytes(8 * 64))
+        self.count = 0
+        self.total_ns = 0
+
+    def add(self, nanoseconds):
+        self.buckets[nanoseconds.bit_length()] += 1
+        self.count += 1
+        self.total_ns += nanoseconds
+
+    def merge(self, other):
+        """Add another histogram's samples to this one"""
+        for index, count in enumerate(other.buckets):
+            if count:
+                self.buckets[index] += count
+        self.count += other.count
+        self.total_ns += other.total_ns
+
+    def percentile(self, fraction):
+        """Upper bound (in ns) of the bucket holding the given percentile"""
+        target = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if count and seen >= target:
+                return 1 << index
+        return 0
+
+    def summary(self):
+        """Count, mean and p50/p99 (bucket upper bounds) in microseconds"""
+        if not self.count:
+            return {"count": 0}
+        return {
+            "count": self.count,
+            "mean_us": round(self.total_ns / self.count / 1000, 3),
+            "p50_us": self.percentile(0.50) / 1000,
+            "p99_us": self.percentile(0.99) / 1000,
+        }
+
+class PipelineStats:
+    """Per-intent hit counters and per-stage latency histograms"""
+
+    def __init__(self):
+        self.intent_hits = {}
+        self.stages = {stage: LatencyHistogram() for stage in STAGES}
+
+    def merge(self, other):
+        """Add the hits and latencies collected by another PipelineStats (e.g. a worker's)"""
+        for intent, hits in other.intent_hits.items():
+            self.intent_hits[intent] = self.intent_hits.get(intent, 0) + hits
+        for stage, histogram in other.stages.items():
+            self.stages[stage].merge(histogram)
+
+    def as_dict(self):
+        return {
+            "intent_hits": dict(sorted(self.intent_hits.items(), key=lambda item: -item[1])),
+            "latency": {stage: histogram.summary() for stage, histogram in self.stages.items()},
+        }
+
+# None means instrumentation is off - the hot path only checks for that
+PIPELINE_STATS = None
+
+def enable_instrumentation():
+    """Start collecting pipeline stats (returns the PipelineStats object)"""
+    global PIPELINE_STATS
+    if PIPELINE_STATS is None:
+        PIPELINE_STATS = PipelineStats()
+    return PIPELINE_STATS
+
+def disable_instrumentation():
+    """Stop collecting pipeline stats"""
+    global PIPELINE_STATS
+    PIPELINE_STATS = None
+
+def instrumented_bot_reply(user_input, rng=random):
+    """get_bot_reply with every stage timed"""
+    stats = PIPELINE_STATS
+    rules = RULES or current_rules()
+    clock = time.perf_counter_ns
+
+    start = clock()
+    raw_input = user_input.strip()
+    user_input = raw_input.lower()
+    normalized = clock()
+    intent = match_intent(user_input, rules)
+    matched = clock()
+    reply = select_response(rules, intent, raw_input, rng, user_input)
+    selected = clock()
+
+    stats.stages["normalize"].add(normalized - start)
+    stats.stages["match"].add(matched - normalized)
+    stats.stages["select"].add(selected - matched)
+    key = intent or "default"
+    stats.intent_hits[key] = stats.intent_hits.get(key, 0) + 1
+    return reply
+
+def record_output_time(start_ns):
+    """Add the time since start_ns to the output stage (if instrumenting)"""
+    if PIPELINE_STATS is not None:
+        PIPELINE_STATS.stages["output"].add(time.perf_counter_ns() - start_ns)
+
+def get_pipeline_stats():
+    """The collected pipeline stats as a dict, or None when disabled"""
+    return None if PIPELINE_STATS is None else PIPELINE_STATS.as_dict()
+
+def start_profiler():
+    """Start cProfile if CHATBOT_PROFILE is set (returns the profiler or None)"""
+    if not os.environ.get("CHATBOT_PROFILE"):
+        return None
+    import cProfile
+    profiler = cProfile.Profile()
+    profiler.enable()
+    return profiler
+
+def stop_profiler(profiler):
+    """Stop cProfile and save (or print) what it collected"""
+    if profiler is None:
+        return
+    profiler.disable()
+    target = os.environ.get("CHATBOT_PROFILE")
+    if target == "1":
+        import pstats
+        pstats.Stats(profiler, stream=sys.stderr).sort_stats("cumulative").print_stats(25)
+    else:
+        profiler.dump_stats(target)
+        print(f"Profile saved to {target}", file=sys.stderr)
+
+if os.environ.get("CHATBOT_STATS"):
+    enable_instrumentation()
+
+# Session store
+DEFAULT_HISTORY_SIZE = 10
+DEFAULT_STORE_BYTES = 64 * 1024 * 1024
+LOCAL_USER = "local"
+
+# Intents get a stable small id the first time they are seen, so histograms
+# stay valid when a reloaded rules file adds, removes or reorders intents
+INTENT_ID_NAMES = ["default"]
+INTENT_IDS = {"default": 0}
+
+def intent_id(intent):
+    """Histogram slot for an intent (None means unrecognized -> "default")"""
+    name = intent or "default"
+    index = INTENT_IDS.get(name)
+    if index is None:
+        index = INTENT_IDS[name] = len(INTENT_ID_NAMES)
+        INTENT_ID_NAMES.append(name)
+    return index
+
+# Fixed cost of one turn in the ring buffer: the (user, bot, intent) tuple
+# itself - intent names are shared with the rules, so they cost nothing more
+TURN_OVERHEAD = sys.getsizeof((None, None, None))
+
+class SessionRecord:
+    """
+    Compact per-user state
+    The intent histogram is an array of C ints indexed by intent_id()
+    and the last turns live in a fixed-size ring buffer, so a record never
+    grows past history_size turns
+
+    Measured with 'bench sessions' on CPython 3.11 (64-bit), with the default
+    history of 10 turns: about 550 bytes for an empty record including its
+    store entry, plus about 64 bytes per stored turn and the text itself.
+    The store's own estimate counts every text in full (about 3 KB for a
+    session with 10 typical turns), so the memory cap is conservative
+    """
+    __slots__ = ("name", "message_count", "saved_count", "intent_counts", "turns")
+
+    def __init__(self, history_size=DEFAULT_HISTORY_SIZE):
+        self.name = None
+        self.message_count = 0
+        self.saved_count = 0  # message_count when the session was last saved to a log
+        self.intent_counts = array('I', bytes(4 * len(INTENT_IDS)))
+        self.turns = [None] * history_size
+
+    def add_turn(self, user_input, response, intent=None, name=None):
+        """
+        Store one turn, overwriting the oldest once the ring buffer is full
+        Returns the change in stored bytes
+        """
+        if name:
+            self.name = name
+        index = intent_id(intent)
+        if index >= len(self.intent_counts):
+            # A reloaded rules file brought in a new intent
+            self.intent_counts.extend([0] * (index + 1 - len(self.intent_counts)))
+        self.intent_counts[index] += 1
+
+        slot = self.message_count % len(self.turns)
+        self.message_count += 1
+        freed = turn_size(self.turns[slot])
+        self.turns[slot] = (user_input, response, intent)
+        return turn_size(self.turns[slot]) - freed
+
+    def recent_turns(self, with_intent=False):
+        """
+        The stored (user, bot) turns, oldest first - or (user, bot, intent)
+        with the intent that produced each reply
+        """
+        size = len(self.turns)
+        start = self.message_count % size if self.message_count > size else 0
+        ordered = self.turns[start:] + self.turns[:start]
+        if with_intent:
+            return [turn for turn in ordered if turn is not None]
+        return [turn[:2] for turn in ordered if turn is not None]
+
+    def intent_histogram(self):
+        """Intent name -> count, only for intents that were seen"""
+        return {INTENT_ID_NAMES[i]: count for i, count in enumerate(self.intent_counts) if count}
+
+    def size_in_bytes(self):
+        """Approximate memory held by this record and its turns"""
+        return (sys.getsizeof(self) + sys.getsizeof(self.intent_counts)
+                + sys.getsizeof(self.turns) + sum(turn_size(t) for t in self.turns))
+
+def turn_size(turn):
+    """Approximate bytes held by one (user, bot, intent) turn"""
+    if turn is None:
+        return 0
+    return TURN_OVERHEAD + sys.getsizeof(turn[0]) + sys.getsizeof(turn[1])
+
+class SessionStore:
+    """
+    Sessions by user id with least-recently-used eviction
+    The total size of all records is kept under max_bytes
+    """
+
+    def __init__(self, max_bytes=DEFAULT_STORE_BYTES, history_size=DEFAULT_HISTORY_SIZE):
+        self.max_bytes = max_bytes
+        self.history_size = history_size
+        self.sessions = OrderedDict()
+        self.sizes = {}
+        self.total_bytes = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.sessions)
+
+    def __contains__(self, user_id):
+        return user_id in self.sessions
+
+    def get(self, user_id):
+        """Return the record for user_id, creating it if needed"""
+        record = self.sessions.get(user_id)
+        if record is None:
+            record = SessionRecord(self.history_size)
+            self.sessions[user_id] = record
+            self.sizes[user_id] = record.size_in_bytes() + sys.getsizeof(user_id)
+            self.total_bytes += self.sizes[user_id]
+            self.evict(keep=user_id)
+        else:
+            self.sessions.move_to_end(user_id)
+        return record
+
+    def peek(self, user_id):
+        """Return the record without touching the LRU order (or None)"""
+        return self.sessions.get(user_id)
+
+    def record_turn(self, user_id, user_input, response, intent=None, name=None):
+        """Add one turn to a user's session and return the record"""
+        record = self.get(user_id)
+        delta = record.add_turn(user_input, response, intent, name)
+        self.sizes[user_id] += delta
+        self.total_bytes += delta
+        self.evict(keep=user_id)
+        return record
+
+    def evict(self, keep=None):
+        """Drop least recently used sessions until we fit in max_bytes"""
+        while self.total_bytes > self.max_bytes and len(self.sessions) > 1:
+            user_id = next(iter(self.sessions))
+            if user_id == keep:
+                break
+            self.discard(user_id)
+            self.evictions += 1
+
+    def discard(self, user_id):
+        """Forget a session"""
+        if self.sessions.pop(user_id, None) is not None:
+            self.total_bytes -= self.sizes.pop(user_id)
+
+# Default store used by the interactive chat
+SESSIONS = SessionStore()
+
+# Headless API
+def respond_batch(messages, seed=None):
+    """
+    Generator that yields one response per message, without any typing delay
+    Works on any iterable (a list, a file, a generator) in constant memory
+    The same seed always gives the same responses
+    """
+    rng = random.Random(seed)
+    for message in messages:
+        yield get_bot_response(message, rng)
+
+def read_jsonl_messages(lines):
+    """
+    Parse JSONL input lazily
+    Each line is either a JSON string or an object with a "message" field
+    Yields (record, message) - message is None when the line is invalid
+    """
+    for line_number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield {"line": line_number, "error": f"invalid JSON: {e}"}, None
+            continue
+        if isinstance(record, str):
+            record = {"message": record}
+        if not isinstance(record, dict) or not isinstance(record.get("message"), str):
+            yield {"line": line_number, "error": "expected a string or an object with a 'message' string"}, None
+            continue
+        yield record, record["message"]
+
+# Sharded batch execution
+DEFAULT_CHUNK_SIZE = 5000
+
+def chunk_seed(seed, chunk_index):
+    """
+    Derive the seed for one chunk from the global seed
+    Chunks (not workers) get their own seed, so the output only depends on
+    the seed and chunk size - never on how many workers ran
+    """
+    return None if seed is None else f"{seed}:{chunk_index}"
+
+def respond_chunk(task):
+    """Worker entry point: answer one chunk of messages"""
+    chunk_index, seed, messages = task
+    rng = random.Random(chunk_seed(seed, chunk_index))
+    return [get_bot_response(message, rng) for message in messages]
+
+def respond_chunk_with_stats(task):
+    """
+    Worker entry point when instrumentation is on: answer one chunk and
+    send back the stats it collected, since a worker's own PIPELINE_STATS
+    never reaches the parent
+    """
+    global PIPELINE_STATS
+    PIPELINE_STATS = PipelineStats()
+    return respond_chunk(task), PIPELINE_STATS
+
+def chunk_responder(workers):
+    """
+    The worker entry point for a run: respond_chunk, or with stats on and
+    worker processes in play, respond_chunk_with_stats
+    Returns (func, unpack) where unpack(result) merges any worker stats
+    into PIPELINE_STATS and returns the responses
+    """
+    if workers <= 1 or PIPELINE_STATS is None:
+        return respond_chunk, lambda responses: responses
+
+    def unpack(result):
+        responses, stats = result
+        if PIPELINE_STATS is not None:
+            PIPELINE_STATS.merge(stats)
+        return responses
+    return respond_chunk_with_stats, unpack
+
+def iter_chunks(items, chunk_size):
+    """Group any iterable into lists of chunk_size items"""
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def ordered_chunk_map(func, jobs, workers=1):
+    """
+    Run func(task) for every (context, task) pair and yield (context, result)
+    in the original order
+    With more than one worker the tasks go to a process pool, but only a
+    small window of chunks is in flight so memory stays constant
+    """
+    if workers <= 1:
+        for context, task in jobs:
+            yield context, func(task)
+        return
+
+    # Workers get this process's tables as they are, whether they came from
+    # a file (which may have changed since) or were built in memory
+    with ProcessPoolExecutor(max_workers=workers, initializer=use_rules_table,
+                             initargs=(current_rules().table(),)) as executor:
+        pending = deque()
+        for context, task in jobs:
+            pending.append((context, executor.submit(func, task)))
+            if len(pending) >= workers * 2:
+                context, future = pending.popleft()
+                yield context, future.result()
+        while pending:
+            context, future = pending.popleft()
+            yield context, future.result()
+
+def respond_parallel(messages, seed=None, workers=1, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Like respond_batch, but spreads chunks of messages over worker processes
+    Responses come back in input order and are identical for any worker count
+    With instrumentation on, the stats the workers collect are merged into
+    this process's PIPELINE_STATS
+    """
+    jobs = ((None, (index, seed, chunk))
+            for index, chunk in enumerate(iter_chunks(messages, chunk_size)))
+    func, unpack = chunk_responder(workers)
+    for _, result in ordered_chunk_map(func, jobs, workers):
+        yield from unpack(result)
+
+def run_jsonl(input_stream, output_stream, seed=None, workers=1, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Stream JSONL messages from input_stream and write JSONL responses
+    Every input record is echoed back with a "response" field added
+    Returns the number of responses written
+    """
+    def jobs():
+        records = read_jsonl_messages(input_stream)
+        for index, chunk in enumerate(iter_chunks(records, chunk_size)):
+            messages = [message for _, message in chunk if message is not None]
+            yield chunk, (index, seed, messages)
+
+    written = 0
+    func, unpack = chunk_responder(workers)
+    for chunk, result in ordered_chunk_map(func, jobs(), workers):
+        responses = iter(unpack(result))
+        for record, message in chunk:
+            if message is not None:
+                record["response"] = next(responses)
+                written += 1
+            line = json.dumps(record, ensure_ascii=False) + "\n"
+            if PIPELINE_STATS is None:
+                output_stream.write(line)
+            else:
+                output_start = time.perf_counter_ns()
+                output_stream.write(line)
+                record_output_time(output_start)
+    output_stream.flush()
+    return written
+
+# Asyncio server
+MAX_LINE_BYTES = 64 * 1024
+
+async def typing_stream(writer, text, delay=0.03):
+    """
+    Non-blocking typing effect: write one character at a time to a stream
+    Other sessions keep running while this one is "typing"
+    """
+    for char in text:
+        writer.write(char.encode('utf-8'))
+        await writer.drain()
+        await asyncio.sleep(delay)
+
+async def send_line(writer, text, typing_delay=0.0):
+    """Send one protocol line, optionally with the typing effect"""
+    if typing_delay > 0:
+        await typing_stream(writer, text, typing_delay)
+        writer.write(b"\n")
+    else:
+        writer.write(text.encode('utf-8') + b"\n")
+    await writer.drain()
+
+def session_reply(store, user_id, user_input, rng=random, log=None):
+    """
+    Work out the reply line for one message in a session
+    Returns (reply, finished) - the same rules as the interactive main()
+    """
+    user_input = user_input.strip()
+    if not user_input:
+        return "ChatBot: I'm listening... please say something!", False
+    if user_input.lower() in EXIT_COMMANDS:
+        return "ChatBot: Thanks for chatting! Have a great day! 👋", True
+
+    intent, response, name = get_bot_reply(user_input, rng)
+    session = store.record_turn(user_id, user_input, response, intent, name)
+    if log is not None:
+        log.write_turn(user_id, user_input, response, intent)
+
+    reply = "ChatBot: " + response
+    # Every reply is exactly one line, so the encouragement goes on the same line
+    if session.message_count % 5 == 0:
+        reply += " " + rng.choice(ENCOURAGEMENTS)
+    return reply, False
+
+def make_session_handler(rng, store, typing_delay=0.0, log=None):
+    """Build the asyncio connection callback for the line protocol"""
+    connection_ids = itertools.count(1)
+
+    async def handle_session(reader, writer):
+        user_id = f"conn-{next(connection_ids)}"
+        try:
+            await send_line(writer, "ChatBot: Hi there! I'm excited to chat with you! 😊")
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    await send_line(writer, "ChatBot: That message is too long for me!")
+                    break
+                if not line:
+                    break  # Client went away
+                reply, finished = session_reply(store, user_id, line.decode('utf-8', 'replace'), rng, log)
+                if PIPELINE_STATS is None:
+                    await send_line(writer, reply, typing_delay)
+                else:
+                    output_start = time.perf_counter_ns()
+                    await send_line(writer, reply, typing_delay)
+                    record_output_time(output_start)
+                if finished:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+    return handle_session
+
+async def start_chat_server(host="127.0.0.1", port=8765, unix_path=None, seed=None,
+                            typing_delay=0.0, store=None, log=None):
+    """Start the line-protocol server on TCP or on a Unix socket"""
+    if store is None:
+        store = SessionStore()
+    handler = make_session_handler(random.Random(seed), store, typing_delay, log)
+    if unix_path:
+        return await asyncio.start_unix_server(handler, path=unix_path, limit=MAX_LINE_BYTES, backlog=4096)
+    return await asyncio.start_server(handler, host, port, limit=MAX_LINE_BYTES, backlog=4096)
+
+async def watch_rules_file(interval=RULES_CHECK_INTERVAL):
+    """
+    Hot reload for the server: check the rules file every interval seconds
+    A changed file is loaded on a worker thread, so building the new tables
+    never holds up the event loop between replies
+    """
+    while True:
+        await asyncio.sleep(interval)
+        await asyncio.to_thread(reload_rules_if_changed, True)
+
+async def flush_log_periodically(log):
+    """
+    Flush the conversation log on its own clock, so turns buffered just
+    before the server goes quiet reach the disk within about flush_interval
+    seconds instead of waiting for the next turn
+    """
+    while True:
+        await asyncio.sleep(log.flush_interval)
+        log.flush_if_due()
+
+async def serve_forever(host, port, unix_path, seed, typing_delay, log=None):
+    """Run the chat server until interrupted"""
+    server = await start_chat_server(host, port, unix_path, seed, typing_delay, log=log)
+    where = unix_path or f"{host}:{port}"
+    print(f"ChatBot server listening on {where} (Ctrl+C to stop)")
+    tasks = [asyncio.create_task(watch_rules_file())]
+    if log is not None:
+        tasks.append(asyncio.create_task(flush_log_periodically(log)))
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        for task in tasks:
+            task.cancel()
+
+# Load generator
+async def open_chat_connection(host, port, unix_path):
+    """Connect to the chat server over TCP or a Unix socket"""
+    if unix_path:
+        return await asyncio.open_unix_connection(unix_path, limit=MAX_LINE_BYTES)
+    return await asyncio.open_connection(host, port, limit=MAX_LINE_BYTES)
+
+async def load_session(host, port, unix_path, messages, latencies):
+    """One simulated user: send messages one by one and time each reply"""
+    reader, writer = await open_chat_connection(host, port, unix_path)
+    try:
+        await reader.readline()  # Welcome line
+        for message in messages:
+            start = time.perf_counter()
+            writer.write(message.encode('utf-8') + b"\n")
+            await writer.drain()
+            await reader.readline()
+            latencies.append(time.perf_counter() - start)
+    finally:
+        writer.close()
+        await writer.wait_closed()
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    return sorted_values[index]
+
+async def run_load_test(host="127.0.0.1", port=8765, unix_path=None, sessions=1000, messages=20, seed=0):
+    """Open many concurrent sessions against a running server and report latency"""
+    corpus = [m for m in make_sample_messages(sessions * messages, seed)
+              if m.strip().lower() not in EXIT_COMMANDS]
+    latencies = []
+
+    start = time.perf_counter()
+    results = await asyncio.gather(
+        *(load_session(host, port, unix_path, corpus[i::sessions][:messages], latencies)
+          for i in range(sessions)),
+        return_exceptions=True)
+    seconds = time.perf_counter() - start
+
+    failed = sum(1 for result in results if isinstance(result, Exception))
+    latencies.sort()
+    print(f"Load test: {sessions} sessions x {messages} messages ({failed} sessions failed)")
+    print(f"  replies:    {len(latencies)} in {seconds:.2f}s ({len(latencies) / seconds:,.0f} msg/s)")
+    print(f"  p50 latency: {percentile(latencies, 0.50) * 1000:.2f} ms")
+    print(f"  p99 latency: {percentile(latencies, 0.99) * 1000:.2f} ms")
+    return latencies
+
+# Conversation log
+LOG_MAGIC = b"CBLOG1\n"
+LOG_HEADER = struct.Struct("<dIIII")  # timestamp + byte lengths of user, intent, message, response
+LOG_LENGTH = struct.Struct("<I")
+LOG_FORMATS = ("jsonl", "binary")
+# JSONL records are filled into a fixed template; only the values go through
+# the json module, with one shared encoder instead of a new one per dumps()
+LOG_JSON = json.JSONEncoder(ensure_ascii=False).encode
+LOG_JSONL_RECORD = '{"time": %r, "user": %s, "intent": %s, "message": %s, "response": %s}\n'
+
+class ConversationLogWriter:
+    """
+    Append-only conversation log
+    Turns are encoded into an in-memory buffer and written in one go once
+    flush_bytes are pending or flush_interval seconds have passed (checked
+    on each write, and by flush_if_due() for callers that go quiet), and the
+    file is rotated like logging's RotatingFileHandler once it reaches
+    max_bytes
+
+    Formats:
+      jsonl  - one JSON object per line
+      binary - LOG_MAGIC, then records of <u32 length><payload>, where the
+               payload is LOG_HEADER followed by the four UTF-8 strings
+    """
+
+    def __init__(self, path, fmt="jsonl", flush_bytes=1 << 20, flush_interval=1.0,
+                 max_bytes=100 * 1024 * 1024, backup_count=5):
+        if fmt not in LOG_FORMATS:
+            raise ValueError(f"unknown log format {fmt!r}, expected one of {LOG_FORMATS}")
+        self.path = path
+        self.fmt = fmt
+        self.flush_bytes = flush_bytes
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.buffer = []
+        self.pending = 0
+        self.last_flush = time.monotonic()
+        self.file = None
+        self.open_file()
+
+    def open_file(self):
+        """
+        Open (or create) the current log file for appending
+        The torn tail of a write cut off by a crash is cut away first, so
+        new turns always start on a record boundary
+        """
+        size = complete_log_size(self.path, self.fmt)
+        self.file = open(self.path, 'ab', buffering=0)
+        if self.file.seek(0, os.SEEK_END) > size:
+            self.file.truncate(size)
+        self.size = size
+        if self.fmt == "binary" and self.size == 0:
+            self.file.write(LOG_MAGIC)
+            self.size = len(LOG_MAGIC)
+
+    def encode(self, user_id, message, response, intent, timestamp):
+        """Encode one turn in the writer's format"""
+        if self.fmt == "jsonl":
+            # Same bytes as json.dumps() of the record dict, keys in this order
+            return (LOG_JSONL_RECORD % (timestamp, LOG_JSON(user_id), LOG_JSON(intent),
+                                        LOG_JSON(message), LOG_JSON(response))).encode('utf-8')
+
+        fields = [str(user_id).encode('utf-8'), (intent or "").encode('utf-8'),
+                  message.encode('utf-8'), response.encode('utf-8')]
+        payload = LOG_HEADER.pack(timestamp, *map(len, fields)) + b"".join(fields)
+        return LOG_LENGTH.pack(len(payload)) + payload
+
+    def write_turn(self, user_id, message, response, intent=None, timestamp=None):
+        """Buffer one turn, flushing when a size or time threshold is hit"""
+        if timestamp is None:
+            timestamp = time.time()
+        data = self.encode(user_id, message, response, intent, timestamp)
+        self.buffer.append(data)
+        self.pending += len(data)
+        if self.pending >= self.flush_bytes or time.monotonic() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush_if_due(self):
+        """Flush turns that have waited flush_interval seconds, even if no new turn came"""
+        if self.buffer and time.monotonic() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """Write all buffered turns with a single write call"""
+        if self.buffer:
+            self.file.write(b"".join(self.buffer))
+            self.size += self.pending
+            self.buffer = []
+            self.pending = 0
+            if self.size >= self.max_bytes:
+                self.rotate()
+        self.last_flush = time.monotonic()
+
+    def rotate(self):
+        """log -> log.1 -> log.2 ... keeping backup_count old files"""
+        self.file.close()
+        if self.backup_count > 0:
+            for index in range(self.backup_count - 1, 0, -1):
+                source = f"{self.path}.{index}"
+                if os.path.exists(source):
+                    os.replace(source, f"{self.path}.{index + 1}")
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self.open_file()
+
+    def close(self):
+        """Flush what is left and close the file"""
+        if self.file is not None:
+            self.flush()
+            self.file.close()
+            self.file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def log_files(path):
+    """The rotated files of a log followed by the live one, oldest first"""
+    backups = []
+    index = 1
+    while os.path.exists(f"{path}.{index}"):
+        backups.append(f"{path}.{index}")
+        index += 1
+    files = backups[::-1]
+    if os.path.exists(path):
+        files.append(path)
+    return files
+
+def binary_log_records(file, size):
+    """
+    Yield (end offset, payload) for each whole record, starting at the
+    file's current position
+    Stops at the first record that is cut short or whose lengths don't add
+    up - the torn tail of a crashed write
+    """
+    offset = file.tell()
+    while offset + LOG_LENGTH.size + LOG_HEADER.size <= size:
+        length = LOG_LENGTH.unpack(file.read(LOG_LENGTH.size))[0]
+        if length < LOG_HEADER.size or offset + LOG_LENGTH.size + length > size:
+            return
+        payload = file.read(length)
+        if len(payload) < length or LOG_HEADER.size + sum(LOG_HEADER.unpack_from(payload)[1:]) != length:
+            return
+        offset += LOG_LENGTH.size + length
+        yield offset, payload
+
+def last_line_end(file, size, block_size=64 * 1024):
+    """Offset just past the last newline of a file (0 if it has none)"""
+    position = size
+    while position > 0:
+        start = max(0, position - block_size)
+        file.seek(start)
+        newline = file.read(position - start).rfind(b"\n")
+        if newline != -1:
+            return start + newline + 1
+        position = start
+    return 0
+
+def complete_log_size(path, fmt):
+    """
+    Size of the part of a log file that holds only whole records
+    Anything after it was left by a write that a crash cut off
+    """
+    try:
+        file = open(path, 'rb')
+    except FileNotFoundError:
+        return 0
+    with file:
+        size = os.fstat(file.fileno()).st_size
+        head = file.read(len(LOG_MAGIC))
+        if fmt == "jsonl":
+            if head == LOG_MAGIC:
+                raise ValueError(f"{path} is a binary conversation log, not JSONL")
+            return last_line_end(file, size)
+        if head != LOG_MAGIC:
+            if LOG_MAGIC.startswith(head):
+                return 0  # Cut off while the magic itself was being written
+            raise ValueError(f"{path} is not a binary conversation log")
+        end = len(LOG_MAGIC)
+        for end, _ in binary_log_records(file, size):
+            pass
+        return end
+
+def read_log_file(filename):
+    """
+    Lazily yield the turns of one log file, detecting its format
+    Unreadable JSONL lines and binary records are skipped, and a torn
+    binary tail ends the file - each is reported on stderr
+    """
+    with open(filename, 'rb') as file:
+        if file.read(len(LOG_MAGIC)) != LOG_MAGIC:
+            file.seek(0)
+            for line_number, line in enumerate(file, 1):
+                if not line.strip():
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError as e:
+                    print(f"ChatBot: skipped unreadable line {line_number} of {filename}: {e}",
+                          file=sys.stderr)
+            return
+
+        size = os.fstat(file.fileno()).st_size
+        end = len(LOG_MAGIC)
+        for end, payload in binary_log_records(file, size):
+            timestamp, *lengths = LOG_HEADER.unpack_from(payload)
+            offset = LOG_HEADER.size
+            fields = []
+            for length in lengths:
+                fields.append(payload[offset:offset + length])
+                offset += length
+            try:
+                user_id, intent, message, response = (field.decode('utf-8') for field in fields)
+            except UnicodeDecodeError as e:
+                print(f"ChatBot: skipped unreadable record ending at byte {end} of {filename}: {e}",
+                      file=sys.stderr)
+                continue
+            yield {"time": timestamp, "user": user_id, "intent": intent or None,
+                   "message": message, "response": response}
+        if end < size:
+            print(f"ChatBot: ignored {size - end} bytes of torn records at the end of {filename}",
+                  file=sys.stderr)
+
+def read_conversation_log(path, include_rotated=True):
+    """Lazily iterate every turn in a log, oldest first"""
+    for filename in (log_files(path) if include_rotated else [path]):
+        yield from read_log_file(filename)
+
 # Additional utility functions
-def get_conversation_stats():
+def get_conversation_stats(user_id=LOCAL_USER, store=None):
     """
-    Could be used to track conversation statistics
+    Conversation statistics for one user from the session store, plus the
+    pipeline stats under "pipeline" when instrumentation is on
+    Returns None if there is nothing to report
     """
-    pass
+    stats = {}
+    record = (store or SESSIONS).peek(user_id)
+    if record is not None:
+        stats.update({
+            "name": record.name,
+            "messages": record.message_count,
+            "intents": record.intent_histogram(),
+            "recent_turns": record.recent_turns(),
+        })
+    pipeline = get_pipeline_stats()
+    if pipeline is not None:
+        stats["pipeline"] = pipeline
+    return stats or None
 
-def save_conversation_log():
+def save_conversation_log(path="conversation_log.jsonl", user_id=LOCAL_USER, store=None, fmt="jsonl"):
     """
-    Could be used to save conversation history
+    Append the stored turns of one session to a conversation log
+    Turns written by an earlier call are skipped, so saving a session
+    again only adds what was said since
+    Returns the number of turns written
     """
-    pass
+    record = (store or SESSIONS).peek(user_id)
+    if record is None:
+        return 0
+    unsaved = record.message_count - record.saved_count
+    turns = record.recent_turns(with_intent=True)[-unsaved:] if unsaved else []
+    if turns:
+        with ConversationLogWriter(path, fmt) as log:
+            for message, response, intent in turns:
+                log.write_turn(user_id, message, response, intent)
+    record.saved_count = record.message_count
+    return len(turns)
+
+# Benchmarks
+SAMPLE_MESSAGES = [
+    "Hello there!",
+    "how are you doing today",
+    "What's your name?",
+    "My name is Alice",
+    "I'm Bob and I like trains",
+    "how old are you",
+    "can you help me with something",
+    "you are awesome",
+    "I feel sad today",
+    "I'm so tired",
+    "what's the weather like",
+    "what time is it",
+    "I'm hungry, let's get pizza",
+    "do you like python programming",
+    "tell me a joke",
+    "what can you do",
+    "goodbye",
+    "the quick brown fox jumps over the lazy dog",
+    "quantum flux capacitors are strange",
+    "lorem ipsum dolor sit amet consectetur",
+]
+
+FILLER_WORDS = ["the", "a", "blue", "over", "lazy", "quantum", "orange", "river",
+                "mountain", "keyboard", "window", "silver", "planet", "music"]
+
+def make_sample_messages(count, seed=0):
+    """Build a synthetic corpus by padding sample phrases with filler words"""
+    rng = random.Random(seed)
+    messages = []
+    for _ in range(count):
+        words = rng.choices(FILLER_WORDS, k=rng.randint(0, 8))
+        words.insert(rng.randint(0, len(words)), rng.choice(SAMPLE_MESSAGES))
+        messages.append(" ".join(words))
+    return messages
+
+def report_timing(label, seconds, count):
+    """Print one benchmark result line"""
+    print(f"  {label:<28} {seconds * 1e6 / count:8.2f} us/msg   {count / seconds:12,.0f} msg/s")
+
+def benchmark_intents(count=20000, seed=0):
+    """Compare the compiled intent matcher against the old if/elif chain"""
+    messages = [m.lower().strip() for m in make_sample_messages(count, seed)]
+
+    mismatches = sum(1 for m in messages if match_intent(m) != legacy_match_intent(m))
+    print(f"Intent matching over {count} messages ({mismatches} mismatches)")
+
+    for label, func in [("if/elif chain (any scans)", legacy_match_intent),
+                        ("compiled matcher", match_intent)]:
+        seconds = min(timeit.repeat(lambda: [func(m) for m in messages], number=1, repeat=5))
+        report_timing(label, seconds, count)
+
+def benchmark_workers(count=200000, seed=0):
+    """Messages/sec of the sharded batch mode for 1..N worker processes"""
+    messages = make_sample_messages(count, seed)
+    print(f"Sharded batch replay over {count} messages")
+
+    baseline = None
+    for workers in range(1, (os.cpu_count() or 1) + 1):
+        start = time.perf_counter()
+        responses = list(respond_parallel(messages, seed=seed, workers=workers))
+        seconds = time.perf_counter() - start
+        if baseline is None:
+            baseline = responses
+        same = "same output" if responses == baseline else "OUTPUT DIFFERS"
+        report_timing(f"{workers} worker(s) ({same})", seconds, count)
+
+def benchmark_sessions(count=20000, seed=0):
+    """Bytes per session and turn throughput of the session store"""
+    messages = make_sample_messages(count, seed)
+    rng = random.Random(seed)
+    replies = [get_bot_reply(message, rng) for message in messages]
+
+    store = SessionStore(max_bytes=1 << 62)
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for i in range(count):
+        store.get(f"user-{i}")
+    empty = tracemalloc.get_traced_memory()[0] - before
+
+    for turn in range(DEFAULT_HISTORY_SIZE):
+        for i in range(count):
+            intent, response, name = replies[(i + turn) % count]
+            store.record_turn(f"user-{i}", messages[(i + turn) % count], response, intent, name)
+    full = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+
+    # Time the turns again without tracemalloc slowing every allocation down
+    user_ids = [f"user-{i}" for i in range(count)]
+    timed = SessionStore(max_bytes=1 << 62)
+    start = time.perf_counter()
+    for turn in range(DEFAULT_HISTORY_SIZE):
+        for i in range(count):
+            intent, response, name = replies[(i + turn) % count]
+            timed.record_turn(user_ids[i], messages[(i + turn) % count], response, intent, name)
+    seconds = time.perf_counter() - start
+
+    print(f"Session store with {count} sessions, {DEFAULT_HISTORY_SIZE}-turn history")
+    print(f"  empty session:      {empty / count:8.0f} bytes")
+    print(f"  full history:       {full / count:8.0f} bytes (texts shared with the corpus)")
+    print(f"  store estimate:     {store.total_bytes / count:8.0f} bytes (every text counted)")
+    report_timing("record_turn", seconds, count * DEFAULT_HISTORY_SIZE)
+
+    capped = SessionStore(max_bytes=full // 4)
+    for i in range(count):
+        intent, response, name = replies[i]
+        capped.record_turn(f"user-{i}", messages[i], response, intent, name)
+    print(f"  with a {capped.max_bytes:,} byte cap: {len(capped)} sessions kept, "
+          f"{capped.evictions} evicted")
+
+def benchmark_log(count=200000, seed=0):
+    """Turns/sec of the buffered conversation log writer and lazy reader"""
+    messages = make_sample_messages(min(count, 10000), seed)
+    rng = random.Random(seed)
+    replies = [get_bot_reply(message, rng) for message in messages]
+    turns = [(f"user-{i % 1000}", messages[i % len(messages)], replies[i % len(messages)][1],
+              replies[i % len(messages)][0]) for i in range(count)]
+
+    print(f"Conversation log with {count} turns")
+    directory = tempfile.mkdtemp(prefix="chatbot_log_")
+    try:
+        for fmt in LOG_FORMATS:
+            path = os.path.join(directory, f"bench.{fmt}")
+            start = time.perf_counter()
+            with ConversationLogWriter(path, fmt, max_bytes=32 * 1024 * 1024) as log:
+                now = time.time()
+                for user_id, message, response, intent in turns:
+                    log.write_turn(user_id, message, response, intent, now)
+            seconds = time.perf_counter() - start
+            size = sum(os.path.getsize(f) for f in log_files(path))
+            report_timing(f"write {fmt} ({size / count:.0f} B/turn)", seconds, count)
+
+            start = time.perf_counter()
+            read = sum(1 for _ in read_conversation_log(path))
+            seconds = time.perf_counter() - start
+            report_timing(f"read {fmt} ({read} turns)", seconds, count)
+    finally:
+        shutil.rmtree(directory)
+
+NAME_SAMPLES = [
+    "My name is Alice",
+    "hi, i am bob and i like trains",
+    "I'm Bob I think",
+    "I'm Mary Jane Watson from New York",
+    "I am happy, my name is McKenzie",
+    "call me Al Please",
+    "my name is   O'Brien-Smith",
+    "I am so tired today",
+    "nothing to see here at all, just a longer message without a name in it",
+]
+
+def benchmark_names(count=20000, seed=0):
+    """Compare the case-keeping name extractor against the old find() loop"""
+    for label, max_filler in [("short", 8), ("long", 40)]:
+        rng = random.Random(seed)
+        corpus = []
+        for _ in range(count):
+            words = rng.choices(FILLER_WORDS, k=rng.randint(0, max_filler))
+            words.insert(rng.randint(0, len(words)), rng.choice(NAME_SAMPLES))
+            corpus.append(" ".join(words))
+        # Both get the input that get_bot_reply has lowercased already
+        lowered = [text.lower() for text in corpus]
+        pairs = list(zip(corpus, lowered))
+        # get_bot_reply only calls extract_name for introductions
+        intros = [pair for pair in pairs if legacy_match_intent(pair[1]) == "user_name"]
+
+        # The old loop only ever took one word, so compare first words
+        differ = sum(1 for text, low in pairs
+                     if (extract_name(text, low) or "").lower().split()[:1]
+                     != (legacy_extract_name(low) or "").lower().split()[:1])
+        average = sum(map(len, corpus)) / count
+        print(f"Name extraction over {count} {label} messages ({average:.0f} chars on average, "
+              f"{differ} first names differ from the old loop apart from case)")
+        for group, items in [("", pairs), (" (intros)", intros)]:
+            old = min(timeit.repeat(lambda: [legacy_extract_name(low) for text, low in items],
+                                    number=1, repeat=5))
+            report_timing("lower + find loop" + group, old, len(items))
+            new = min(timeit.repeat(lambda: [extract_name(text, low) for text, low in items],
+                                    number=1, repeat=5))
+            report_timing("phrase find + word slice" + group, new, len(items))
+            print(f"    new extractor vs the old loop: {(new / old - 1) * 100:+.1f}% per call")
+    # Not a speedup: the old loop only lowercased and split, this one keeps
+    # the typed case, checks word boundaries and takes multi-word names
+    print("  (extract_name only runs on messages already matched as introductions)")
+    # The last one changed on purpose: the first phrase in the message now
+    # wins over the old loop's fixed "i am" before "call me" order
+    for text in NAME_SAMPLES[:7] + ["call me Al, I am Bob"]:
+        print(f"  {text!r:40} -> {extract_name(text)!r} (was {legacy_extract_name(text.lower())!r})")
+
+def make_sample_rules(intent_count, seed=0):
+    """A synthetic rules document with intent_count intents"""
+    rng = random.Random(seed)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+
+    def word():
+        return "".join(rng.choices(letters, k=rng.randint(4, 10)))
+
+    return {
+        "intents": [{"name": f"intent_{i}",
+                     "keywords": [word() + " " + word() for _ in range(5)],
+                     "responses": [f"Response {j} for intent {i}" for j in range(3)]}
+                    for i in range(intent_count)],
+        "default_responses": ["I'm not sure I understand, but I'm listening!"],
+    }
+
+def benchmark_rules(count=2000, seed=0):
+    """Startup time of a large rules file: cold parse vs the cached sidecar"""
+    directory = tempfile.mkdtemp(prefix="chatbot_rules_")
+    try:
+        path = os.path.join(directory, "rules.json")
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump(make_sample_rules(count, seed), file)
+
+        print(f"Loading a rules file with {count} intents ({count * 5} keywords)")
+        probe = make_sample_rules(count, seed)["intents"][-1]["keywords"][0]
+        # The regex can't be cached, so the first match pays for compiling
+        # it - unless the background compile had time to finish first
+        idle = 2.0
+        for label, use_cache, touch, pause in [("no cache (parse + build)", False, False, 0),
+                                               ("first load (writes cache)", True, False, 0),
+                                               ("cached (mtime match)", True, False, 0),
+                                               ("cached (touched, hash match)", True, True, 0),
+                                               (f"cached, first message after {idle:.0f} s", True, False, idle)]:
+            if touch:
+                stat = os.stat(path)
+                os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000))
+            re.purge()  # Don't let the regex module's own cache hide compile time
+            start = time.perf_counter()
+            rules = load_rules(path, use_cache=use_cache)
+            rules.compile_in_background()  # What use_rules() does
+            loaded = time.perf_counter()
+            time.sleep(pause)
+            first = time.perf_counter()
+            assert match_intent(probe, rules) == f"intent_{count - 1}"
+            matched = time.perf_counter()
+            print(f"  {label:<32} {(loaded - start) * 1000:8.1f} ms load"
+                  f" + {(matched - first) * 1000:6.1f} ms first match"
+                  f" = {(loaded - start + matched - first) * 1000:8.1f} ms")
+    finally:
+        shutil.rmtree(directory)
+
+def benchmark_instrumentation(count=20000, seed=0):
+    """Cost of the instrumentation hooks, disabled and enabled"""
+    messages = make_sample_messages(count, seed)
+    was_enabled = PIPELINE_STATS is not None
+
+    def unhooked_reply(user_input, rng):
+        # get_bot_reply exactly as it would be without the hook check
+        rules = RULES or current_rules()
+        raw_input = user_input.strip()
+        user_input = raw_input.lower()
+        return select_response(rules, match_intent(user_input, rules), raw_input, rng, user_input)
+
+    def run(func, enabled):
+        if enabled:
+            enable_instrumentation()
+        else:
+            disable_instrumentation()
+        rng = random.Random(seed)
+        return timeit.timeit(lambda: [func(m, rng) for m in messages], number=1)
+
+    # Interleave the runs so machine noise hits all three variants alike
+    print(f"Instrumentation overhead over {count} messages")
+    plain = disabled = enabled = float("inf")
+    for _ in range(9):
+        plain = min(plain, run(unhooked_reply, False))
+        disabled = min(disabled, run(get_bot_reply, False))
+        enabled = min(enabled, run(get_bot_reply, True))
+    if not was_enabled:
+        disable_instrumentation()
+
+    report_timing("pipeline, no hooks", plain, count)
+    report_timing("hooks disabled", disabled, count)
+    report_timing("hooks enabled", enabled, count)
+    print(f"  disabled overhead: {(disabled / plain - 1) * 100:+.1f}%   "
+          f"enabled overhead: {(enabled / plain - 1) * 100:+.1f}%")
+
+    # Whole-pipeline timings carry a few percent of machine noise, so also
+    # time the only thing the disabled path adds: one global check
+    check_ns = min(timeit.repeat("PIPELINE_STATS is not None", globals=globals(),
+                                 number=1000000, repeat=5)) * 1000
+    print(f"  disabled hook check alone: {check_ns:.1f} ns/msg "
+          f"({check_ns / (plain * 1e9 / count) * 100:.2f}% of a reply)")
+
+BENCHMARKS = {
+    "intents": benchmark_intents,
+    "workers": benchmark_workers,
+    "sessions": benchmark_sessions,
+    "log": benchmark_log,
+    "names": benchmark_names,
+    "rules": benchmark_rules,
+    "instrumentation": benchmark_instrumentation,
+}
+
+def parse_args(argv=None):
+    """Command line options - with no command we start the interactive chat"""
+    parser = argparse.ArgumentParser(
+        description="Friendly rule-based ChatBot",
+        epilog="Set CHATBOT_STATS=1 to print per-intent hits and per-stage latencies on exit, "
+               "and CHATBOT_PROFILE=<file> (or 1 for a summary) to run under cProfile.")
+    parser.add_argument("--rules", default=RULES_FILE, help="intents/responses rules file (default: %(default)s)")
+    parser.add_argument("--no-rules-cache", dest="rules_cache", action="store_false",
+                        help="don't read or write the <rules>.cache sidecar next to the rules file")
+    subparsers = parser.add_subparsers(dest="command")
+
+    def add_log_options(sub_parser):
+        sub_parser.add_argument("--log", default=None, help="append every turn to this conversation log")
+        sub_parser.add_argument("--log-format", choices=LOG_FORMATS, default="jsonl", help="log format (default: jsonl)")
+
+    chat_parser = subparsers.add_parser("chat", help="interactive chat (default)")
+    add_log_options(chat_parser)
+
+    batch_parser = subparsers.add_parser("batch", help="read JSONL messages from stdin, write JSONL responses to stdout")
+    batch_parser.add_argument("--seed", type=int, default=None, help="seed for reproducible responses")
+    batch_parser.add_argument("--workers", type=int, default=1, help="worker processes (default: 1)")
+    batch_parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="messages per chunk")
+
+    def add_address_options(sub_parser):
+        sub_parser.add_argument("--host", default="127.0.0.1", help="TCP host (default: 127.0.0.1)")
+        sub_parser.add_argument("--port", type=int, default=8765, help="TCP port (default: 8765)")
+        sub_parser.add_argument("--unix", default=None, help="use this Unix socket path instead of TCP")
+
+    serve_parser = subparsers.add_parser("serve", help="run the asyncio line-protocol chat server")
+    add_address_options(serve_parser)
+    serve_parser.add_argument("--seed", type=int, default=None, help="seed for reproducible responses")
+    serve_parser.add_argument("--typing-delay", type=float, default=0.0, help="seconds per character (default: 0)")
+    add_log_options(serve_parser)
+
+    load_parser = subparsers.add_parser("loadtest", help="measure server latency with many concurrent sessions")
+    add_address_options(load_parser)
+    load_parser.add_argument("--sessions", type=int, default=1000, help="concurrent sessions")
+    load_parser.add_argument("--messages", type=int, default=20, help="messages per session")
+
+    bench_parser = subparsers.add_parser("bench", help="run a micro-benchmark")
+    bench_parser.add_argument("name", choices=sorted(BENCHMARKS))
+    bench_parser.add_argument("--count", type=int, default=20000, help="number of messages")
+    bench_parser.add_argument("--seed", type=int, default=0, help="corpus seed")
+
+    return parser.parse_args(argv)
+
+def cli(argv=None):
+    """Dispatch the command line to the matching mode"""
+    args = parse_args(argv)
+    if RULES is None or os.path.abspath(args.rules) != RULES.source:
+        try:
+            use_rules_file(os.path.abspath(args.rules), args.rules_cache)
+        except (OSError, ValueError) as e:
+            sys.exit(f"Error loading rules: {e}")
+    log = None
+    if getattr(args, "log", None):
+        log = ConversationLogWriter(args.log, args.log_format)
+    profiler = start_profiler()
+    try:
+        run_command(args, log)
+    finally:
+        stop_profiler(profiler)
+        if PIPELINE_STATS is not None and args.command != "bench":
+            print(json.dumps(get_pipeline_stats(), indent=2), file=sys.stderr)
+
+def run_command(args, log=None):
+    """Run the mode picked on the command line"""
+    if args.command == "batch":
+        run_jsonl(sys.stdin, sys.stdout, seed=args.seed,
+                  workers=args.workers, chunk_size=args.chunk_size)
+    elif args.command == "serve":
+        try:
+            asyncio.run(serve_forever(args.host, args.port, args.unix, args.seed, args.typing_delay, log))
+        except KeyboardInterrupt:
+            print("\nChatBot server stopped. Goodbye! 👋")
+        finally:
+            if log is not None:
+                log.close()
+    elif args.command == "loadtest":
+        asyncio.run(run_load_test(args.host, args.port, args.unix, args.sessions, args.messages))
+    elif args.command == "bench":
+        BENCHMARKS[args.name](count=args.count, seed=args.seed)
+    else:
+        try:
+            main(log)
+        finally:
+            if log is not None:
+                log.close()
 
 # Run the chatbot
 if __name__ == "__main__":
-    main()
+    cli()
@@ -0,0 +1,416 @@
+import importlib.util
+import io
+import os
+import sys
+
+import pytest
+
+# The scripts have dashes in their names, so load them by path
+SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Task4-ChatBotv2.py")
+spec = importlib.util.spec_from_file_location("chatbot", SCRIPT)
+chatbot = importlib.util.module_from_spec(spec)
+sys.modules["chatbot"] = chatbot  # So worker processes can unpickle its functions
+spec.loader.exec_module(chatbot)
+
+def write_turns(path, fmt, count, first=0):
+    with chatbot.ConversationLogWriter(path, fmt) as log:
+        for i in range(first, first + count):
+            log.write_turn(f"user-{i}", f"message {i}", f"reply {i}", "greeting", timestamp=i)
+
+@pytest.mark.parametrize("fmt", chatbot.LOG_FORMATS)
+def test_torn_tail_is_cut_before_appending(tmp_path, fmt, capsys):
+    path = str(tmp_path / f"chat.{fmt}")
+    write_turns(path, fmt, 3)
+    # A crash part-way through the fourth turn leaves half a record behind
+    torn = chatbot.ConversationLogWriter(path, fmt).encode("user-3", "message 3", "reply 3", None, 3)
+    with open(path, 'ab') as file:
+        file.write(torn[:len(torn) // 2])
+    write_turns(path, fmt, 2, first=4)
+
+    turns = list(chatbot.read_conversation_log(path))
+    assert [turn["message"] for turn in turns] == ["message 0", "message 1", "message 2",
+                                                   "message 4", "message 5"]
+    assert capsys.readouterr().err == ""
+
+def test_jsonl_writer_refuses_a_binary_log(tmp_path):
+    path = str(tmp_path / "chat.log")
+    write_turns(path, "binary", 3)
+    with open(path, 'rb') as file:
+        before = file.read()
+    with pytest.raises(ValueError, match="binary conversation log"):
+        chatbot.ConversationLogWriter(path, "jsonl")
+    with open(path, 'rb') as file:
+        assert file.read() == before
+
+def test_saving_a_session_twice_writes_each_turn_once(tmp_path):
+    path = str(tmp_path / "chat.jsonl")
+    store = chatbot.SessionStore()
+    for i in range(3):
+        store.record_turn("alice", f"message {i}", f"reply {i}", "greeting")
+    assert chatbot.save_conversation_log(path, "alice", store) == 3
+    assert chatbot.save_conversation_log(path, "alice", store) == 0
+    store.record_turn("alice", "message 3", "reply 3")
+    assert chatbot.save_conversation_log(path, "alice", store) == 1
+    assert [turn["message"] for turn in chatbot.read_conversation_log(path)] == \
+        ["message 0", "message 1", "message 2", "message 3"]
+
+def test_reader_stops_at_torn_binary_tail(tmp_path, capsys):
+    path = str(tmp_path / "chat.binary")
+    write_turns(path, "binary", 2)
+    with open(path, 'ab') as file:
+        file.write(b"\x40\x00\x00\x00partial")
+    assert [turn["user"] for turn in chatbot.read_log_file(path)] == ["user-0", "user-1"]
+    assert "11 bytes of torn records" in capsys.readouterr().err
+
+def test_reader_skips_bad_jsonl_lines(tmp_path, capsys):
+    path = str(tmp_path / "chat.jsonl")
+    write_turns(path, "jsonl", 1)
+    with open(path, 'ab') as file:
+        file.write(b'{"user": "cut off\n')
+    write_turns(path, "jsonl", 1, first=1)
+    with open(path, 'ab') as file:
+        file.write(b'{"user": "torn')
+    assert [turn["user"] for turn in chatbot.read_log_file(path)] == ["user-0", "user-1"]
+    err = capsys.readouterr().err
+    assert "line 2 of" in err and "line 4 of" in err
+
+@pytest.mark.parametrize("text, name", [
+    ("My name is Alice", "Alice"),
+    ("I am happy, my name is McKenzie", "McKenzie"),
+    ("call me Al please", "Al"),
+    ("i'm bob", "Bob"),
+    ("my name is   J.R. Smith", "J.R. Smith"),
+    ("my name is J.R.", "J.R."),
+    ("call me J., please", "J."),
+    ("my name is Bob. Nice to meet you", "Bob"),
+    ("I'm Mary Jane Watson from New York", "Mary Jane Watson"),
+    ("I am Mary Jane.", "Mary Jane"),
+    ("I'm Bob I think", "Bob"),
+    ("my name is \"Zoe\"!", "Zoe"),
+    ("i am !!! bob", None),
+    ("my name is !!!, i am Kim", "Kim"),
+    ("the enemy name is far, I am Kim", "Kim"),
+    # The first phrase wins (the old loop always tried "i am" before "call me")
+    ("call me Al, I am Bob", "Al"),
+    ("I am Bob, call me Al", "Bob"),
+    ("miami is nice", None),
+    ("my name is", None),
+])
+def test_extract_name(text, name):
+    assert chatbot.extract_name(text) == name
+
+def test_extract_name_agrees_with_old_loop():
+    rng = chatbot.random.Random(0)
+    for _ in range(2000):
+        words = rng.choices(chatbot.FILLER_WORDS, k=rng.randint(0, 8))
+        words.insert(rng.randint(0, len(words)), rng.choice(chatbot.NAME_SAMPLES))
+        text = " ".join(words)
+        new = chatbot.extract_name(text, text.lower())
+        old = chatbot.legacy_extract_name(text)
+        # The old loop only ever took the first word of a name
+        assert (new or "").lower().split()[:1] == (old or "").lower().split()[:1], text
+
+def write_rules(path, keyword):
+    document = chatbot.make_sample_rules(3)
+    document["intents"][0]["keywords"] = [keyword]
+    with open(path, 'w', encoding='utf-8') as file:
+        chatbot.json.dump(document, file)
+
+def test_rules_cache_skips_the_build_and_follows_edits(tmp_path, monkeypatch):
+    path = str(tmp_path / "rules.json")
+    write_rules(path, "hello there")
+    assert chatbot.match_intent("hello there", chatbot.load_rules(path)) == "intent_0"
+    assert os.path.exists(chatbot.rules_cache_path(path))
+
+    def no_build(*args, **kwargs):
+        raise AssertionError("the cached tables should have been used")
+
+    monkeypatch.setattr(chatbot, "compile_rules", no_build)
+    rules = chatbot.load_rules(path)
+    assert rules.compiled is None  # Compiled on the first match only
+    assert chatbot.match_intent("hello there", rules) == "intent_0"
+    # Same content with a new mtime still comes from the cache
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert chatbot.match_intent("hello there", chatbot.load_rules(path)) == "intent_0"
+
+    monkeypatch.undo()
+    write_rules(path, "good evening")
+    rules = chatbot.load_rules(path)
+    assert chatbot.match_intent("good evening", rules) == "intent_0"
+    assert chatbot.match_intent("hello there", rules) is None
+
+def test_regex_compiles_once_in_the_background(tmp_path, monkeypatch):
+    path = str(tmp_path / "rules.json")
+    write_rules(path, "hello there")
+    rules = chatbot.load_rules(path)
+    compiles = []
+    compile_regex = chatbot.re.compile
+    def counting_compile(pattern, *args):
+        if pattern == rules.regex:
+            compiles.append(pattern)
+        return compile_regex(pattern, *args)
+    monkeypatch.setattr(chatbot.re, "compile", counting_compile)
+
+    rules.compile_in_background()
+    # A match that comes straight away waits for the background compile
+    assert chatbot.match_intent("hello there", rules) == "intent_0"
+    rules.compile_in_background()  # Already compiled: nothing to do
+    assert rules.compiled is not None and len(compiles) == 1
+
+def test_broken_rules_cache_is_rebuilt(tmp_path):
+    path = str(tmp_path / "rules.json")
+    write_rules(path, "hello there")
+    with open(chatbot.rules_cache_path(path), 'wb') as file:
+        file.write(b"\x00not a cache")
+    assert chatbot.match_intent("hello there", chatbot.load_rules(path)) == "intent_0"
+    assert chatbot.read_rules_cache(path)["version"] == chatbot.RULES_CACHE_VERSION
+
+def fuzz_messages(words, count, seed=0):
+    """Random messages glued from words and their fragments, so keywords overlap"""
+    rng = chatbot.random.Random(seed)
+    pieces = list(words) + [word[:rng.randint(1, len(word))] for word in words] + ["", " ", "x"]
+    return ["".join(rng.choices(pieces, k=rng.randint(0, 6))) for _ in range(count)]
+
+def test_matcher_agrees_with_legacy_chain_on_default_rules():
+    rules = chatbot.current_rules()
+    keywords = [keyword for _, words in rules.intents for keyword in words]
+    messages = fuzz_messages(keywords, 3000)
+    messages += [m.lower() for m in chatbot.make_sample_messages(1000)]
+    for message in messages:
+        assert chatbot.match_intent(message, rules) == chatbot.legacy_match_intent(message, rules), message
+
+def test_matcher_agrees_with_legacy_chain_on_prefix_keywords():
+    # Later intents own shorter or longer versions of earlier keywords
+    document = {"intents": [{"name": "long", "keywords": ["hi there", "this"], "responses": ["a"]},
+                            {"name": "short", "keywords": ["hi", "the"], "responses": ["b"]},
+                            {"name": "longer", "keywords": ["hi there you", "th"], "responses": ["c"]}],
+                "default_responses": ["d"]}
+    rules = chatbot.compile_rules(document)
+    for message in fuzz_messages(["hi there you", "this", "hi", "the", "th", "ere"], 5000, seed=1):
+        assert chatbot.match_intent(message, rules) == chatbot.legacy_match_intent(message, rules), message
+
+def test_session_store_evicts_least_recently_used():
+    store = chatbot.SessionStore(max_bytes=10**9)
+    for user_id in "abc":
+        store.get(user_id)
+    store.max_bytes = store.total_bytes  # Room for exactly three empty sessions
+    store.get("a")  # a is now the most recently used
+    store.peek("b")  # peek doesn't count as a use
+    store.get("d")
+    assert list(store.sessions) == ["c", "a", "d"]
+    assert store.evictions == 1
+
+    # A session that outgrows the store on its own pushes out everyone else but stays
+    store.record_turn("a", "x" * 10000, "reply")
+    assert list(store.sessions) == ["a"]
+    assert store.evictions == 3
+    assert store.total_bytes == store.sizes["a"]
+
+@pytest.mark.parametrize("fmt", chatbot.LOG_FORMATS)
+def test_log_round_trip_and_rotation(tmp_path, fmt):
+    path = str(tmp_path / f"chat.{fmt}")
+    turns = [{"time": i + 0.5, "user": f"user-{i % 3}", "intent": "greeting" if i % 2 else None,
+              "message": f"héllo {i} 👋", "response": f"reply {i}\nsecond line"}
+             for i in range(40)]
+    with chatbot.ConversationLogWriter(path, fmt, flush_bytes=1, max_bytes=400, backup_count=2) as log:
+        for turn in turns:
+            log.write_turn(turn["user"], turn["message"], turn["response"], turn["intent"], turn["time"])
+
+    files = chatbot.log_files(path)
+    assert files == [path + ".2", path + ".1", path]
+    assert all(os.path.getsize(name) <= 400 + 100 for name in files)
+    read = list(chatbot.read_conversation_log(path))
+    # The oldest turns rotated out; the rest come back in order and unchanged
+    assert 0 < len(read) < len(turns)
+    assert read == turns[-len(read):]
+    live = list(chatbot.read_conversation_log(path, include_rotated=False))
+    assert live == read[len(read) - len(live):]
+
+@pytest.mark.parametrize("turn", [
+    ("user-1", "héllo \"there\" 👋\n\t\\", "reply", "greeting", 1760000000.25),
+    (42, "hi", "hello", None, 1000),
+])
+def test_jsonl_records_match_json_dumps(tmp_path, turn):
+    user_id, message, response, intent, timestamp = turn
+    with chatbot.ConversationLogWriter(str(tmp_path / "chat.jsonl")) as log:
+        record = {"time": timestamp, "user": user_id, "intent": intent, "message": message, "response": response}
+        assert log.encode(*turn[:4], timestamp) == (chatbot.json.dumps(record, ensure_ascii=False) + "\n").encode('utf-8')
+
+def test_quiet_log_flushes_on_its_own_clock(tmp_path):
+    path = tmp_path / "chat.jsonl"
+    log = chatbot.ConversationLogWriter(str(path), flush_interval=0.05)
+    try:
+        log.write_turn("user-1", "hi", "hello")
+        assert path.stat().st_size == 0  # Buffered until the interval is up
+        log.flush_if_due()
+        assert path.stat().st_size == 0
+
+        async def quiet_server():
+            flusher = chatbot.asyncio.create_task(chatbot.flush_log_periodically(log))
+            await chatbot.asyncio.sleep(0.2)
+            flusher.cancel()
+        chatbot.asyncio.run(quiet_server())
+        assert [turn["message"] for turn in chatbot.read_conversation_log(str(path))] == ["hi"]
+    finally:
+        log.close()
+
+@pytest.fixture
+def stats():
+    stats = chatbot.enable_instrumentation()
+    yield stats
+    chatbot.disable_instrumentation()
+
+def test_instrumentation_fills_every_stage(stats):
+    messages = chatbot.make_sample_messages(50)
+    output = io.StringIO()
+    chatbot.run_jsonl((chatbot.json.dumps(message) for message in messages), output, seed=0)
+    assert sum(stats.intent_hits.values()) == 50
+    assert all(stats.stages[stage].count == 50 for stage in chatbot.STAGES)
+    assert stats.stages["match"].total_ns > 0
+
+def test_disabled_instrumentation_touches_nothing(stats):
+    chatbot.disable_instrumentation()
+    messages = chatbot.make_sample_messages(50)
+    chatbot.run_jsonl((chatbot.json.dumps(message) for message in messages), io.StringIO(), seed=0)
+    list(chatbot.respond_batch(messages, seed=0))
+    assert stats.intent_hits == {}
+    assert all(histogram.count == 0 for histogram in stats.stages.values())
+    assert chatbot.get_pipeline_stats() is None
+
+def test_worker_stats_are_merged_into_the_parent(stats):
+    messages = chatbot.make_sample_messages(300)
+    list(chatbot.respond_parallel(messages, seed=0, workers=2, chunk_size=50))
+    assert sum(stats.intent_hits.values()) == 300
+    assert stats.stages["match"].count == 300
+    # Same hits as answering everything in this process
+    chatbot.disable_instrumentation()
+    local = chatbot.enable_instrumentation()
+    list(chatbot.respond_batch(messages, seed=0))
+    assert local.intent_hits == stats.intent_hits
+
+def jsonl_input(count, seed=0):
+    lines = [chatbot.json.dumps({"id": i, "message": message})
+             for i, message in enumerate(chatbot.make_sample_messages(count, seed))]
+    lines[3] = '{"id": 3, "message": '        # Cut off
+    lines[7] = chatbot.json.dumps({"id": 7})  # No message
+    lines[9] = chatbot.json.dumps("just a string")
+    lines.insert(5, "   ")                    # Blank lines are skipped
+    return [line + "\n" for line in lines]
+
+def test_jsonl_batch_keeps_ids_order_and_reports_bad_lines():
+    output = io.StringIO()
+    written = chatbot.run_jsonl(jsonl_input(20), output, seed=0, chunk_size=4)
+    records = [chatbot.json.loads(line) for line in output.getvalue().splitlines()]
+    assert written == 18
+    assert len(records) == 20
+    assert [record.get("id") for record in records] == [0, 1, 2, None, 4, 5, 6, None, 8, None] + list(range(10, 20))
+    # Bad lines come back in place, with their line number (counting the blank one)
+    assert records[3]["line"] == 4 and records[3]["error"].startswith("invalid JSON")
+    assert records[7] == {"line": 9, "error": "expected a string or an object with a 'message' string"}
+    assert records[9] == {"message": "just a string", "response": records[9]["response"]}
+    assert all(isinstance(record["response"], str) for record in records if "message" in record)
+
+def test_respond_batch_is_reproducible_and_lazy():
+    messages = chatbot.make_sample_messages(100)
+    assert list(chatbot.respond_batch(messages, seed=1)) == list(chatbot.respond_batch(iter(messages), seed=1))
+    replies = chatbot.respond_batch(iter(messages), seed=1)
+    assert isinstance(next(replies), str)
+
+@pytest.mark.parametrize("workers", [2, 3])
+def test_jsonl_output_is_byte_identical_for_any_worker_count(workers):
+    lines = jsonl_input(500, seed=2)
+    single, parallel = io.StringIO(), io.StringIO()
+    chatbot.run_jsonl(iter(lines), single, seed=7, workers=1, chunk_size=64)
+    chatbot.run_jsonl(iter(lines), parallel, seed=7, workers=workers, chunk_size=64)
+    assert parallel.getvalue().encode('utf-8') == single.getvalue().encode('utf-8')
+
+def test_parallel_responses_depend_only_on_the_chunk_seeds():
+    messages = chatbot.make_sample_messages(250, seed=3)
+    expected = []
+    for index, start in enumerate(range(0, len(messages), 40)):
+        rng = chatbot.random.Random(chatbot.chunk_seed(5, index))
+        expected += [chatbot.get_bot_response(message, rng) for message in messages[start:start + 40]]
+    for workers in (1, 2, 4):
+        assert list(chatbot.respond_parallel(messages, seed=5, workers=workers, chunk_size=40)) == expected
+    # Another seed (or chunk size) deals the responses differently
+    assert list(chatbot.respond_parallel(messages, seed=6, chunk_size=40)) != expected
+    assert chatbot.chunk_seed(None, 3) is None
+
+def test_workers_use_rules_built_in_memory(monkeypatch):
+    document = chatbot.make_sample_rules(20, seed=4)
+    monkeypatch.setattr(chatbot, "RULES", None)
+    chatbot.use_rules(chatbot.compile_rules(document))
+    messages = [intent["keywords"][0] for intent in document["intents"]] * 5
+    expected = [f"Response {j} for intent {i}" for i in range(20) for j in range(3)]
+    found = list(chatbot.respond_parallel(messages, seed=1, workers=2, chunk_size=7))
+    assert found == list(chatbot.respond_parallel(messages, seed=1, workers=1, chunk_size=7))
+    assert set(found) <= set(expected)
+    assert not chatbot.reload_rules_if_changed(force=True)
+
+async def with_server(client, store):
+    server = await chatbot.start_chat_server(port=0, seed=0, store=store)
+    port = server.sockets[0].getsockname()[1]
+    try:
+        return await client(port)
+    finally:
+        server.close()
+        await server.wait_closed()
+
+def test_concurrent_sessions_keep_their_own_state():
+    store = chatbot.SessionStore()
+
+    async def chat(port, name):
+        reader, writer = await chatbot.asyncio.open_connection("127.0.0.1", port)
+        await reader.readline()  # Welcome
+        replies = []
+        for message in (f"my name is {name}", f"{name} says hello", f"{name} asks how are you"):
+            writer.write(message.encode('utf-8') + b"\n")
+            await writer.drain()
+            replies.append(await reader.readline())
+            await chatbot.asyncio.sleep(0)  # Let the other client interleave
+        writer.close()
+        await writer.wait_closed()
+        return replies
+
+    async def clients(port):
+        return await chatbot.asyncio.gather(*(chat(port, name) for name in ("Alice", "Bob", "Cleo")))
+
+    results = chatbot.asyncio.run(with_server(clients, store))
+    assert all(len(replies) == 3 and all(reply.startswith(b"ChatBot: ") for reply in replies)
+               for replies in results)
+    assert len(store) == 3
+    for user_id in list(store.sessions):
+        record = store.peek(user_id)
+        assert record.message_count == 3
+        # Every turn in a session came from the same client, who gave their own name
+        assert {message.split()[0] for message, _ in record.recent_turns()[1:]} == {record.name}
+
+def test_server_handles_quit_and_half_closed_lines():
+    store = chatbot.SessionStore()
+
+    async def clients(port):
+        # "quit" gets a goodbye, then the server closes the connection
+        reader, writer = await chatbot.asyncio.open_connection("127.0.0.1", port)
+        await reader.readline()
+        writer.write(b"quit\n")
+        goodbye = await reader.readline()
+        closed = await reader.read()
+        writer.close()
+        await writer.wait_closed()
+
+        # A last line without a newline, then the client shuts its side
+        reader, writer = await chatbot.asyncio.open_connection("127.0.0.1", port)
+        await reader.readline()
+        writer.write(b"hello there")
+        writer.write_eof()
+        reply = await reader.readline()
+        rest = await reader.read()
+        writer.close()
+        await writer.wait_closed()
+        return goodbye, closed, reply, rest
+
+    goodbye, closed, reply, rest = chatbot.asyncio.run(with_server(clients, store))
+    assert goodbye.startswith(b"ChatBot: Thanks for chatting!") and closed == b""
+    assert reply.startswith(b"ChatBot: ") and reply.endswith(b"\n") and rest == b""
+    assert [record.recent_turns()[0][0] for record in store.sessions.values()] == ["hello there"]
@@ -0,0 +1,352 @@
+import importlib.util
+import os
+import random
+import sys
+from decimal import Decimal
+
+import pytest
+
+# The scripts have dashes in their names, so load them by path
+SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Task2-STP.py")
+spec = importlib.util.spec_from_file_location("stp", SCRIPT)
+stp = importlib.util.module_from_spec(spec)
+sys.modules["stp"] = stp  # So worker processes can unpickle its functions
+spec.loader.exec_module(stp)
+
+def random_price(rng):
+    """A price with whole cents, as the text a holdings file would hold"""
+    return f"{rng.randint(1, 100000) // 100}.{rng.randint(0, 99):02d}"
+
+@pytest.mark.parametrize("price, cents", [
+    ("0.29", 29), ("1.10", 110), ("4.35", 435), (" 12.5 ", 1250), (Decimal("19.99"), 1999),
+    (0.29, 29), (180.5, 18050), (7, 700), ("0.125", 12), ("0.135", 14), ("1e2", 10000),
+])
+def test_to_cents_parses_prices_exactly(price, cents):
+    assert stp.to_cents(price) == cents
+
+@pytest.mark.parametrize("price", ["abc", "", None, "1.2.3"])
+def test_to_cents_rejects_non_prices(price):
+    with pytest.raises(ValueError):
+        stp.to_cents(price)
+
+def test_total_matches_decimal_over_a_million_positions():
+    rng = random.Random(0)
+    portfolio = stp.Portfolio()
+    reference = Decimal(0)
+    for row in range(1_000_000):
+        quantity = rng.randint(1, 10000)
+        price = random_price(rng)
+        portfolio.add(f"S{row:07d}", quantity, price)
+        reference += quantity * Decimal(price)
+    assert portfolio.total_cents() == reference * 100
+    assert Decimal(sum(portfolio.value_cents())) == reference * 100
+
+def test_running_total_does_not_drift_over_many_price_changes():
+    rng = random.Random(1)
+    portfolio = stp.Portfolio()
+    prices = []
+    for row in range(10_000):
+        prices.append(random_price(rng))
+        portfolio.add(f"S{row:05d}", rng.randint(1, 10000), prices[-1])
+    portfolio.total_cents()
+    for _ in range(1_000_000):
+        row = rng.randrange(len(prices))
+        prices[row] = random_price(rng)
+        portfolio.set_price(row, prices[row])
+    reference = sum(quantity * Decimal(price) for quantity, price in zip(portfolio.quantities, prices))
+    assert portfolio.total_cents() == reference * 100
+    portfolio.invalidate()
+    assert portfolio.total_cents() == reference * 100
+
+@pytest.mark.parametrize("use_numpy", [True, False])
+def test_value_cents_matches_dict_valuation(monkeypatch, use_numpy):
+    if not use_numpy:
+        monkeypatch.setattr(stp, "numpy", None)
+    rng = random.Random(2)
+    holdings = {f"S{row:05d}": rng.randint(-100, 10000) for row in range(5000)}
+    prices = {symbol: random_price(rng) for symbol in holdings}
+    portfolio = stp.Portfolio.from_holdings(holdings, prices)
+    expected = {symbol: quantity * Decimal(prices[symbol]) * 100 for symbol, quantity in holdings.items()}
+    assert dict(zip(portfolio.symbols, portfolio.value_cents())) == expected
+    assert portfolio.total_cents() == sum(expected.values())
+    # Patching one price keeps both cached results exact
+    portfolio.set_price(portfolio.rows["S00042"], "1234.56")
+    expected["S00042"] = holdings["S00042"] * Decimal("123456")
+    assert dict(zip(portfolio.symbols, portfolio.value_cents())) == expected
+    assert portfolio.total_cents() == sum(expected.values())
+
+def test_valuation_falls_back_to_python_ints_near_int64_overflow():
+    portfolio = stp.Portfolio()
+    portfolio.add("BIG", 2 ** 40, "1000000.00")
+    portfolio.add("HUGE", 2 ** 40, "1000000.00")
+    assert portfolio.total_cents() == 2 * 2 ** 40 * 100000000
+    assert portfolio.value_cents() == [2 ** 40 * 100000000] * 2
+
+def test_live_portfolios_follow_ticks_through_the_reverse_index():
+    rng = random.Random(3)
+    symbols = [f"S{row:03d}" for row in range(50)]
+    prices = {symbol: random_price(rng) for symbol in symbols}
+    holdings = [{symbol: rng.randint(1, 100) for symbol in rng.sample(symbols, 10)} for _ in range(20)]
+    live = stp.LivePortfolios(stp.Portfolio.from_holdings(held, prices) for held in holdings)
+    assert sorted(number for number, _, _ in live.index["S007"]) == \
+        [number for number, held in enumerate(holdings) if "S007" in held]
+
+    for _ in range(200):
+        ticks = {symbol: random_price(rng) for symbol in rng.sample(symbols, 5)}
+        changed = live.apply_ticks(ticks)
+        prices.update(ticks)
+        assert changed == {number for number, held in enumerate(holdings) if set(held) & set(ticks)}
+    expected = [sum(quantity * Decimal(prices[symbol]) * 100 for symbol, quantity in held.items())
+                for held in holdings]
+    assert [portfolio.total_cents() for portfolio in live.portfolios] == expected
+    assert live.grand_total_cents == sum(expected)
+    # A change behind the index's back is picked up before the next read
+    symbol = next(iter(holdings[0]))
+    live.portfolios[0].add(symbol, 1, "1.00")
+    assert live.stale == {0}  # Only this portfolio gets recounted on the next read
+    expected[0] += (holdings[0][symbol] + 1) * 100 - holdings[0][symbol] * Decimal(prices[symbol]) * 100
+    assert live.grand_total_cents == sum(expected)
+    assert live.stale == set()
+
+def sample_portfolio(price=100):
+    portfolio = stp.Portfolio()
+    portfolio.add("AAPL", 10, price)
+    portfolio.add("MSFT", 5, price * 2)
+    return portfolio
+
+def test_snapshot_readable_right_after_append(tmp_path):
+    store = stp.SnapshotStore(str(tmp_path / "history.snap"))
+    try:
+        store.append(sample_portfolio(), timestamp=1000)
+        assert store.positions(0)["AAPL"] == (10, 10000, 100000)
+        store.append(sample_portfolio(150), timestamp=2000)
+        assert store.positions(1)["MSFT"] == (5, 30000, 150000)
+    finally:
+        store.close()
+
+def test_torn_writes_do_not_shift_later_snapshots(tmp_path):
+    path = str(tmp_path / "history.snap")
+    store = stp.SnapshotStore(path)
+    store.append(sample_portfolio(), timestamp=1000)
+    # A crash part-way through the next snapshot: half a record, half an index entry
+    with open(path, 'ab') as data:
+        data.write(b"\xff" * (stp.SNAPSHOT_RECORD.size // 2))
+    with open(path + ".idx", 'ab') as index:
+        index.write(b"\xff" * 5)
+    store.append(sample_portfolio(150), timestamp=2000)
+    try:
+        assert len(store) == 2
+        assert store.positions(0) == {"AAPL": (10, 10000, 100000), "MSFT": (5, 20000, 100000)}
+        assert store.positions(1) == {"AAPL": (10, 15000, 150000), "MSFT": (5, 30000, 150000)}
+        assert store.totals() == [(1000, 200000), (2000, 300000)]
+    finally:
+        store.close()
+
+@pytest.mark.parametrize("content", [b"my notes\r\n", b"x", stp.SNAPSHOT_MAGIC + b"\0" * stp.SNAPSHOT_RECORD.size])
+def test_snapshot_append_leaves_foreign_and_orphaned_files_alone(tmp_path, content):
+    path = tmp_path / "notes.txt"
+    path.write_bytes(content)
+    store = stp.SnapshotStore(str(path))
+    with pytest.raises(ValueError):
+        store.append(sample_portfolio(), timestamp=1000)
+    assert path.read_bytes() == content
+    assert not os.path.exists(str(path) + ".idx")
+
+def test_snapshot_append_starts_an_empty_file(tmp_path):
+    path = tmp_path / "history.snap"
+    path.write_bytes(b"")
+    store = stp.SnapshotStore(str(path))
+    try:
+        store.append(sample_portfolio(), timestamp=1000)
+        assert path.read_bytes().startswith(stp.SNAPSHOT_MAGIC)
+        assert store.totals() == [(1000, 200000)]
+    finally:
+        store.close()
+
+def test_incomplete_price_provider_cannot_be_created():
+    class PricesOnly(stp.PriceProvider):
+        def get_prices(self, symbols):
+            return {}
+    with pytest.raises(TypeError, match="symbols"):
+        PricesOnly()
+    with pytest.raises(TypeError):
+        stp.PriceProvider()
+
+def test_shared_price_table_keeps_any_symbol_intact():
+    prices = {"AAPL": 180.5, "BAD\nNAME": 1.25, "": 2.5, "ÉTÉ": 3.75, "MSFT": 420.3}
+    with stp.SharedPriceTable.create(prices) as table:
+        reader = stp.SharedPriceTable.attach(table.name)
+        try:
+            assert reader.get_prices(prices) == prices
+            assert reader.symbols() == list(prices)
+        finally:
+            reader.close()
+            reader.close()
+        name = table.name
+    with pytest.raises(FileNotFoundError):
+        stp.SharedPriceTable.attach(name)
+    with stp.SharedPriceTable.create({}) as empty:
+        assert empty.get_prices(["AAPL"]) == {}
+
+PRICES = {"AAPL": 180.5, "MSFT": "420.30", "TSLA": 250.75}
+
+@pytest.mark.parametrize("chunk_rows", [2, 50000])
+def test_import_merges_duplicates_and_counts_rejects(tmp_path, chunk_rows):
+    path = tmp_path / "holdings.csv"
+    path.write_text("Ticker,Note,Shares\n"
+                    "aapl,first,10\n"
+                    "MSFT,,5\n"
+                    "AAPL,again,15\n"
+                    "ZZZZ,,3\n"
+                    "TSLA,,2.5\n"
+                    "TSLA,,-4\n"
+                    "MSFT\n"
+                    "\n"
+                    " msft ,,1\n", encoding='utf-8')
+    rejects = stp.io.StringIO()
+    portfolio, report = stp.import_holdings(str(path), PRICES, chunk_rows=chunk_rows,
+                                            reject_writer=stp.csv.writer(rejects))
+    assert (report.rows, report.accepted, report.rejected) == (8, 4, 4)
+    assert report.reasons == {"unknown symbol": 1, "invalid quantity": 1,
+                              "quantity not positive": 1, "malformed row": 1}
+    assert [line for line, _, _ in report.samples] == [5, 6, 7, 8]
+    assert len(rejects.getvalue().splitlines()) == 4
+    assert portfolio.symbols == ["AAPL", "MSFT"]
+    assert (portfolio.quantity("AAPL"), portfolio.quantity("MSFT")) == (25, 6)
+    assert portfolio.total_cents() == 25 * 18050 + 6 * 42030
+
+def test_import_reads_jsonl(tmp_path):
+    path = tmp_path / "holdings.jsonl"
+    path.write_text('{"symbol": "AAPL", "quantity": 3}\n'
+                    '{"symbol": "AAPL", "quantity": 4}\n'
+                    '{"symbol": "TSLA"}\n'
+                    '{"symbol": "TSLA", "quantity": true}\n'
+                    'not json\n', encoding='utf-8')
+    portfolio, report = stp.import_holdings(str(path), PRICES)
+    assert (report.accepted, report.rejected) == (2, 3)
+    assert report.reasons == {"malformed row": 2, "invalid quantity": 1}
+    assert portfolio.quantity("AAPL") == 7
+
+class CountingSource(stp.StaticPriceProvider):
+    """A static source that remembers every batch it was asked for"""
+
+    def __init__(self, prices):
+        super().__init__(prices)
+        self.batches = []
+
+    def get_prices(self, symbols):
+        self.batches.append(sorted(symbols))
+        return super().get_prices(symbols)
+
+def test_price_cache_expires_entries_after_the_ttl():
+    source = CountingSource(PRICES)
+    cache = stp.CachedPriceProvider(source, ttl=0.2)
+    assert cache.get_prices(["AAPL", "NOPE"]) == {"AAPL": 180.5}
+    assert cache.get_prices(["AAPL", "NOPE"]) == {"AAPL": 180.5}  # Unknown symbols are cached too
+    assert source.batches == [["AAPL", "NOPE"]]
+    stats = cache.stats()
+    assert (stats["lookups"], stats["hits"], stats["misses"], stats["source_batches"]) == (4, 2, 2, 1)
+    stp.time.sleep(0.25)
+    cache.get_prices(["AAPL"])
+    assert source.batches[-1] == ["AAPL"]
+    assert cache.stats()["misses"] == 3
+
+def test_price_cache_evicts_least_recently_used():
+    source = CountingSource(PRICES)
+    cache = stp.CachedPriceProvider(source, max_entries=2)
+    cache.get_prices(["AAPL", "MSFT"])
+    cache.get_prices(["AAPL"])          # MSFT is now the least recently used
+    cache.get_prices(["TSLA"])
+    assert list(cache.entries) == ["AAPL", "TSLA"]
+    assert cache.stats()["cached_symbols"] == 2
+    cache.get_prices(["MSFT"])
+    assert source.batches == [["AAPL", "MSFT"], ["TSLA"], ["MSFT"]]
+    assert cache.stats()["hit_rate"] == 1 / 5
+
+@pytest.mark.parametrize("content", ["[1, 2]", "42", '"AAPL"'])
+def test_file_prices_reject_json_that_is_not_an_object(tmp_path, content):
+    path = tmp_path / "prices.json"
+    path.write_text(content, encoding='utf-8')
+    with pytest.raises(ValueError, match="prices.json must hold a JSON object"):
+        stp.FilePriceProvider(str(path)).get_prices(["AAPL"])
+
+def test_directory_valuation_is_the_same_with_workers(tmp_path):
+    rng = random.Random(4)
+    symbols = [f"S{row:03d}" for row in range(40)]
+    prices = {symbol: float(random_price(rng)) for symbol in symbols}
+    expected = {}
+    for number in range(6):
+        held = {symbol: rng.randint(1, 500) for symbol in rng.sample(symbols, 15)}
+        lines = [f"{symbol},{quantity}" for symbol, quantity in held.items()] + ["BAD,1"]
+        (tmp_path / f"client_{number}.csv").write_text("\n".join(lines) + "\n", encoding='utf-8')
+        for symbol, quantity in held.items():
+            expected[symbol] = expected.get(symbol, 0) + quantity
+    (tmp_path / "notes.txt").write_text("not a portfolio", encoding='utf-8')
+
+    serial = stp.value_portfolio_directory(str(tmp_path), prices, workers=1)
+    parallel = stp.value_portfolio_directory(str(tmp_path), prices, workers=3)
+    assert parallel == serial
+    results, firm = serial
+    assert [os.path.basename(path) for path, *_ in results] == [f"client_{n}.csv" for n in range(6)]
+    assert all((accepted, rejected) == (15, 1) for _, _, accepted, rejected, _ in results)
+    assert {symbol: quantity for symbol, (quantity, _) in firm.items()} == expected
+    assert sum(value for _, value in firm.values()) == sum(total for _, total, *_ in results)
+    assert all(value == quantity * stp.to_cents(prices[symbol]) for symbol, (quantity, value) in firm.items())
+
+@pytest.mark.parametrize("chunk_rows", [1, 2, 3, 4096])
+def test_formatted_rows_match_row_by_row_formatting(chunk_rows):
+    portfolio = stp.Portfolio()
+    for number in range(7):
+        portfolio.add(f"S{number}", number + 1, f"{number}.{number}5")
+    columns = (portfolio.symbols, portfolio.quantities, portfolio.prices, portfolio.values())
+    chunks = list(stp.formatted_rows("%s,%d,$%.2f,$%.2f\r\n", columns, chunk_rows))
+    assert len(chunks) == -(-7 // chunk_rows)
+    assert "".join(chunks) == "".join("%s,%d,$%.2f,$%.2f\r\n" % row for row in portfolio.positions())
+    assert list(stp.formatted_rows("%s\n", ([],))) == []
+
+@pytest.mark.parametrize("fmt, compress, extension", [
+    ("csv", False, ".csv"), ("txt", True, ".txt.gz"), ("npz", False, ".npz"),
+])
+def test_reports_get_collision_suffixes_and_leave_no_temp_files(tmp_path, fmt, compress, extension):
+    portfolio = sample_portfolio()
+    paths = [stp.write_report(portfolio, "portfolio_1", fmt, compress, str(tmp_path)) for _ in range(3)]
+    assert [os.path.basename(path) for path in paths] == \
+        [f"portfolio_1{suffix}{extension}" for suffix in ("", "_1", "_2")]
+    assert sorted(os.listdir(tmp_path)) == sorted(os.path.basename(path) for path in paths)
+
+def test_report_without_hard_links_claims_a_name_and_replaces_it(tmp_path, monkeypatch):
+    (tmp_path / "portfolio_1.csv").write_text("taken", encoding='utf-8')
+    def no_links(*args):
+        raise PermissionError("no hard links here")
+    monkeypatch.setattr(stp.os, "link", no_links)
+    path = stp.write_report(sample_portfolio(), "portfolio_1", "csv", directory=str(tmp_path))
+    assert os.path.basename(path) == "portfolio_1_1.csv"
+    assert (tmp_path / "portfolio_1.csv").read_text(encoding='utf-8') == "taken"
+    with open(path, newline='', encoding='utf-8') as file:
+        assert file.read().startswith("Stock Symbol,Shares,Price per Share,Total Value\r\nAAPL,10,$100.00,$1000.00\r\n")
+    assert sorted(os.listdir(tmp_path)) == ["portfolio_1.csv", "portfolio_1_1.csv"]
+
+def test_failed_report_leaves_no_temp_file(tmp_path, monkeypatch):
+    def broken(portfolio, stream):
+        stream.write("half a report")
+        raise OSError("disk full")
+    monkeypatch.setattr(stp, "write_csv_report", broken)
+    with pytest.raises(OSError, match="disk full"):
+        stp.write_report(sample_portfolio(), "portfolio_1", "csv", directory=str(tmp_path))
+    assert os.listdir(tmp_path) == []
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_npz_report_round_trips_through_numpy(tmp_path, compress):
+    numpy = pytest.importorskip("numpy")
+    portfolio = stp.Portfolio()
+    portfolio.add("AAPL", 10, "180.50")
+    portfolio.add("BRK.B", 3, "412.07")
+    portfolio.add("T", 2 ** 40, "17.01")
+    path = stp.write_report(portfolio, "columns", "npz", compress, str(tmp_path))
+    with numpy.load(path) as data:
+        assert sorted(data.files) == ["price", "quantity", "symbol", "value"]
+        assert data["symbol"].tolist() == ["AAPL", "BRK.B", "T"]
+        assert data["quantity"].dtype == numpy.int64
+        assert data["quantity"].tolist() == [10, 3, 2 ** 40]
+        assert data["price"].tolist() == list(portfolio.prices)
+        assert data["value"].tolist() == list(portfolio.values())
@@ -0,0 +1,319 @@
+import codecs
+import importlib.util
+import io
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+# The scripts have dashes in their names, so load them by path
+SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Task3-TAWPS.py")
+spec = importlib.util.spec_from_file_location("tawps", SCRIPT)
+tawps = importlib.util.module_from_spec(spec)
+sys.modules["tawps"] = tawps  # So worker processes can unpickle its functions
+spec.loader.exec_module(tawps)
+
+def make_duplicate_tree(tmp_path):
+    """A destination that already holds a.jpg, and a source with a copy of it plus a new file"""
+    source, dest = tmp_path / "src", tmp_path / "dest"
+    (dest / "organized_images").mkdir(parents=True)
+    source.mkdir()
+    (dest / "organized_images" / "a.jpg").write_bytes(b"same photo")
+    (source / "b.jpg").write_bytes(b"same photo")
+    (source / "c.jpg").write_bytes(b"another photo")
+    return str(source), str(dest)
+
+def test_dedup_report_moves_duplicates(tmp_path):
+    source, dest = make_duplicate_tree(tmp_path)
+    report = tawps.organize_tree(source, dict(tawps.DEFAULT_RULES), dest, duplicates="report")
+    assert (report.duplicates, report.moved) == (1, 2)
+    assert os.listdir(source) == []
+
+def test_dedup_skip_leaves_duplicates(tmp_path):
+    source, dest = make_duplicate_tree(tmp_path)
+    report = tawps.organize_tree(source, dict(tawps.DEFAULT_RULES), dest, duplicates="skip")
+    assert (report.duplicates, report.moved) == (1, 1)
+    assert os.listdir(source) == ["b.jpg"]
+
+def test_name_allocator_counts_suffixes_past_taken_names(tmp_path):
+    for name in ("a.jpg", "a_1.jpg", "a_3.jpg"):
+        (tmp_path / name).write_bytes(b"")
+    names = tawps.NameAllocator(str(tmp_path))
+    claimed = [os.path.basename(names.claim("a.jpg")) for _ in range(3)]
+    assert claimed == ["a_2.jpg", "a_4.jpg", "a_5.jpg"]
+    assert names.next_name("b.jpg") == "b.jpg"
+    assert names.next_name("b.jpg") == "b_1.jpg"
+    # A released name is free again
+    names.release(str(tmp_path / "a_4.jpg"))
+    assert os.path.basename(names.claim("a_4.jpg")) == "a_4.jpg"
+
+def test_name_allocator_skips_files_created_after_listing(tmp_path):
+    names = tawps.NameAllocator(str(tmp_path))
+    # Someone else takes the names once the directory was listed
+    (tmp_path / "a.jpg").write_bytes(b"theirs")
+    (tmp_path / "a_1.jpg").write_bytes(b"theirs")
+    assert names.claim("a.jpg") == str(tmp_path / "a_2.jpg")
+    assert (tmp_path / "a.jpg").read_bytes() == b"theirs"
+
+def test_racing_allocators_never_share_a_name(tmp_path):
+    claimed = []
+    def racer():
+        names = tawps.NameAllocator(str(tmp_path))
+        claimed.extend(names.claim("IMG_0001.jpg") for _ in range(200))
+    threads = [tawps.threading.Thread(target=racer) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(set(claimed)) == len(claimed) == 800
+    assert len(os.listdir(tmp_path)) == 800
+
+def test_move_in_renames_over_a_claimed_name(tmp_path, monkeypatch):
+    source, dest = tmp_path / "src", tmp_path / "dest"
+    source.mkdir()
+    dest.mkdir()
+    (source / "a.jpg").write_bytes(b"photo")
+    (dest / "a.jpg").write_bytes(b"older photo")
+    names = tawps.NameAllocator(str(dest))
+    assert names.move_in(str(source / "a.jpg"), "a.jpg") == str(dest / "a_1.jpg")
+    assert (dest / "a_1.jpg").read_bytes() == b"photo"
+    assert os.listdir(source) == []
+
+    # A failed rename leaves the file where it was and frees the placeholder
+    (source / "b.jpg").write_bytes(b"photo")
+    def refuse(*args):
+        raise PermissionError("read-only source")
+    monkeypatch.setattr(tawps.os, "replace", refuse)
+    with pytest.raises(PermissionError):
+        names.move_in(str(source / "b.jpg"), "b.jpg")
+    assert os.listdir(source) == ["b.jpg"]
+    assert sorted(os.listdir(dest)) == ["a.jpg", "a_1.jpg"]
+
+def test_locked_folder_renames_without_placeholders(tmp_path, monkeypatch):
+    source, dest = tmp_path / "src", tmp_path / "dest"
+    source.mkdir()
+    dest.mkdir()
+    names = tawps.NameAllocator(str(dest))
+    # Added after the listing but before the lock, e.g. by a run that just finished
+    (dest / "a.jpg").write_bytes(b"older photo")
+    assert names.lock_folder()
+    def no_claims(name):
+        raise AssertionError("claimed a name while holding the folder")
+    monkeypatch.setattr(names, "claim", no_claims)
+    try:
+        for name in ("a.jpg", "b.jpg"):
+            (source / name).write_bytes(b"photo")
+        assert names.move_in(str(source / "a.jpg"), "a.jpg") == str(dest / "a_1.jpg")
+        assert names.move_in(str(source / "b.jpg"), "b.jpg") == str(dest / "b.jpg")
+    finally:
+        names.unlock_folder()
+    assert (dest / "a.jpg").read_bytes() == b"older photo"
+    assert sorted(os.listdir(dest)) == ["a.jpg", "a_1.jpg", "b.jpg"]
+    assert os.listdir(source) == []
+
+@pytest.mark.skipif(tawps.fcntl is None, reason="no flock")
+def test_overlapping_runs_wait_and_claim_names(tmp_path):
+    first = tawps.NameAllocator(str(tmp_path))
+    assert first.lock_folder()
+    second = tawps.NameAllocator(str(tmp_path))
+    waiter = tawps.threading.Thread(target=second.lock_folder)
+    waiter.start()
+    waiter.join(0.2)
+    assert waiter.is_alive()  # Waits for the exclusive run
+    first.unlock_folder()
+    waiter.join()
+    third = tawps.NameAllocator(str(tmp_path))
+    try:
+        assert not second.exclusive
+        assert not third.lock_folder()  # Shares the lock with the second run
+        source = tmp_path / "a.jpg.part"
+        source.write_bytes(b"photo")
+        assert third.move_in(str(source), "a.jpg") == str(tmp_path / "a.jpg")
+    finally:
+        second.unlock_folder()
+        third.unlock_folder()
+
+@pytest.mark.parametrize("chunk_size", range(1, 40))
+def test_chunks_find_addresses_across_boundaries(chunk_size):
+    data = b"to: alice.smith@example.com, cc bob@mail.example.org\n@x.com carol@example.net"
+    found = list(tawps.scan_email_chunks(io.BytesIO(data), chunk_size))
+    assert [email for chunk in found for email in chunk] == tawps.EMAIL_PATTERN.findall(data)
+    # The address at the very end only comes out with the final, carried tail
+    assert found[-1] == [b"carol@example.net"]
+
+def test_overlong_runs_keep_a_bounded_tail(monkeypatch):
+    monkeypatch.setattr(tawps, "MAX_CARRY", 16)
+    data = b"a" * 100 + b" dave@example.com"
+    found = list(tawps.scan_email_chunks(io.BytesIO(data), 10))
+    assert [email for chunk in found for email in chunk] == [b"dave@example.com"]
+
+def test_split_ranges_end_after_newlines(tmp_path, monkeypatch):
+    monkeypatch.setattr(tawps, "SPLIT_SCAN_BLOCK", 7)
+    path = tmp_path / "mail.log"
+    path.write_bytes(b"a@example.com x\n" * 50 + b"y" * 300 + b"\nb@example.com")
+    size = path.stat().st_size
+    ranges = tawps.split_ranges(str(path), size, split_size=100)
+    assert ranges[0][0] == 0 and ranges[-1][1] == size
+    assert all(end == next_start for (_, end), (next_start, _) in zip(ranges, ranges[1:]))
+    data = path.read_bytes()
+    assert all(data[end - 1:end] == b"\n" for _, end in ranges[:-1])
+    # A file with no newline at all stays one range, read a block at a time
+    path.write_bytes(b"z" * 1000)
+    assert tawps.split_ranges(str(path), 1000, split_size=100) == [(0, 1000)]
+
+def test_parallel_extraction_matches_sequential(tmp_path):
+    for number in range(6):
+        tawps.write_sample_mail_log(str(tmp_path / f"mail_{number}.log"), 20000, seed=number, unique=300)
+    expected = tawps.extract_emails_parallel([str(tmp_path)], workers=1, split_size=4096)
+    found = tawps.extract_emails_parallel([str(tmp_path)], workers=2, split_size=4096)
+    assert list(found[0]) == list(expected[0])
+    assert found[1] == expected[1]
+
+def sample_matches(count, seed=0):
+    """Addresses with a few busy senders and a long tail, so many repeat"""
+    rng = tawps.random.Random(seed)
+    return [f"user{int(rng.paretovariate(0.5)) % 5000}@mail{rng.randrange(5)}.example.com".encode('ascii')
+            for _ in range(count)]
+
+def test_disk_set_keeps_first_seen_order_across_spills(tmp_path):
+    matches = sample_matches(50_000)
+    expected = tawps.MemoryEmailSet()
+    unique = tawps.DiskEmailSet(str(tmp_path / "emails.sqlite"), memory_limit=64 << 10, expected_items=5000)
+    try:
+        for start in range(0, len(matches), 1000):
+            batch = matches[start:start + 1000]
+            assert unique.add_many(batch) == expected.add_many(batch)
+        assert unique.disk_lookups > 0  # Repeats really were looked up on disk
+        assert len(unique) == len(expected)
+        assert list(unique) == list(expected)
+    finally:
+        unique.close()
+    # Reopening the store still knows every address
+    unique = tawps.DiskEmailSet(str(tmp_path / "emails.sqlite"), memory_limit=64 << 10, expected_items=5000)
+    try:
+        assert unique.add_many(matches[:1000]) == 0
+        assert len(unique) == len(expected)
+    finally:
+        unique.close()
+
+def test_disk_set_stays_inside_its_memory_budget():
+    batches = [sample_matches(10_000, seed) for seed in range(20)]
+    limit = 1 << 20
+    unique = tawps.DiskEmailSet(memory_limit=limit, expected_items=200_000)
+    try:
+        tawps.tracemalloc.start()
+        for batch in batches:
+            unique.add_many(batch)
+        peak = tawps.tracemalloc.get_traced_memory()[1]
+    finally:
+        tawps.tracemalloc.stop()
+        unique.close()
+    # tracemalloc only sees the Python side: the rest was left to sqlite
+    assert peak <= limit - unique.cache_budget - unique.SQLITE_RESERVE
+
+def test_bloom_filter_is_the_same_in_every_process():
+    bloom = tawps.BloomFilter(64, 10)
+    bloom.add(b"alice@example.com")
+    digest = tawps.hashlib.blake2b(bytes(bloom.bits)).hexdigest()
+    code = (f"import importlib.util; spec = importlib.util.spec_from_file_location('t', {SCRIPT!r}); "
+            "m = importlib.util.module_from_spec(spec); spec.loader.exec_module(m); "
+            "b = m.BloomFilter(64, 10); b.add(b'alice@example.com'); "
+            "print(m.hashlib.blake2b(bytes(b.bits)).hexdigest())")
+    for seed in ("1", "2"):
+        output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                                env=dict(os.environ, PYTHONHASHSEED=seed)).stdout
+        assert output.strip() == digest
+
+@pytest.fixture
+def stub_server():
+    server = tawps.start_stub_server()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def quick_retries(monkeypatch):
+    monkeypatch.setattr(tawps, "RETRY_BACKOFF", 0.01)
+
+def test_scrape_retries_503(stub_server, quick_retries):
+    result, = tawps.scrape_titles([f"{stub_server.url}/flaky/1"], workers=1, rate=0)
+    assert result["title"] == "Stub page /flaky/1 – local"
+    assert (result["status"], result["attempts"]) == (200, 2)
+
+def test_scrape_does_not_retry_404(stub_server, quick_retries):
+    result, = tawps.scrape_titles([f"{stub_server.url}/missing"], workers=1, rate=0)
+    assert result["title"] is None
+    assert (result["status"], result["attempts"]) == (404, 1)
+    assert stub_server.requests == 1
+
+def test_scrape_gives_up_after_timeouts(quick_retries):
+    server = tawps.start_stub_server(delay=1.0)
+    try:
+        result, = tawps.scrape_titles([f"{server.url}/page/1"], workers=1, rate=0, timeout=0.1, retries=1)
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert result["title"] is None
+    assert result["attempts"] == 2
+    assert "timed out" in result["error"].lower()
+
+def test_scrape_rate_limit_is_per_host(stub_server):
+    other = tawps.start_stub_server()
+    try:
+        # 4 requests per host at 10/s: the last one waits 0.3 s. Hosts don't
+        # share a limit, so both hosts together still take about 0.3 s
+        urls = [f"{server.url}/page/{number}" for number in range(4) for server in (stub_server, other)]
+        start = time.monotonic()
+        results = tawps.scrape_titles(urls, workers=8, rate=10)
+        seconds = time.monotonic() - start
+    finally:
+        other.shutdown()
+        other.server_close()
+    assert all(result["title"] for result in results)
+    assert 0.3 <= seconds < 0.6
+
+# (page bytes, Content-Type charset, expected title)
+TITLE_FIXTURES = [
+    (b'<html><head><TITLE lang="fr">Caf&eacute; &amp;\n  Bar</TITLE></head><body>', None, "Café & Bar"),
+    ('<head><meta charset="iso-8859-1"><title>Café</title></head>'.encode('latin-1'), None, "Café"),
+    (b'<head><title>Caf\xe9</title><meta http-equiv="Content-Type" content="text/html; charset=windows-1252">',
+     None, "Café"),
+    (codecs.BOM_UTF8 + '<title>Ünïcode</title>'.encode('utf-8'), None, "Ünïcode"),
+    ('<title>Ünïcode</title>'.encode('latin-1'), 'ISO-8859-1', "Ünïcode"),
+    ('<title>été &#8211; &#x2603;</title>'.encode('utf-8'), None, "été – ☃"),
+    (b'<head><titlebar>no</titlebar><title>yes</title></head>', None, "yes"),
+    (b'<head><meta name="x"></head><body><title>not in the head</title>', None, None),
+    # The BOM beats the header, the header beats <meta>
+    (codecs.BOM_UTF8 + '<title>Ünïcode</title>'.encode('utf-8'), 'ISO-8859-1', "Ünïcode"),
+    ('<meta charset="utf-8"><title>Café</title>'.encode('latin-1'), 'ISO-8859-1', "Café"),
+    # UTF-16 pages, found by their BOM or named in the header
+    ('\ufeff<html><head><title>Grüße</title></head>'.encode('utf-16-le'), None, "Grüße"),
+    ('\ufeff<html><head><TITLE>Grüße</TITLE></head>'.encode('utf-16-be'), None, "Grüße"),
+    ('<html><head><title>Grüße</title></head>'.encode('utf-16-le'), 'utf-16-le', "Grüße"),
+    # A byte-readable page can't really be UTF-16, whatever its <meta> says
+    ('<meta charset="utf-16"><title>Grüße</title>'.encode('utf-8'), None, "Grüße"),
+]
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 4096])
+@pytest.mark.parametrize("page, charset, expected", TITLE_FIXTURES)
+def test_title_parser(page, charset, expected, chunk_size):
+    parser = tawps.TitleParser(charset)
+    for start in range(0, len(page), chunk_size):
+        if parser.feed(page[start:start + chunk_size]):
+            break
+    assert parser.title() == expected
+
+def test_streamed_title_stops_early():
+    server = tawps.start_stub_server(body_size=4 << 20)
+    session = tawps.make_session(1)
+    try:
+        response = session.get(f"{server.url}/page/1", stream=True)
+        title, size = tawps.read_title(response)
+    finally:
+        session.close()
+        server.shutdown()
+        server.server_close()
+    assert title == "Stub page /page/1 – local"
+    assert size <= tawps.STREAM_CHUNK